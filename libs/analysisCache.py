@@ -0,0 +1,193 @@
+import sqlite3
+import threading
+import time
+
+# zobrist keys are unsigned 64 bit integers, SQLite stores signed ones
+_SIGN_BIT = 1 << 63
+
+
+def _to_signed(key):
+    """Returns the zobrist key as the signed 64 bit integer stored in the database"""
+    return key - (1 << 64) if key & _SIGN_BIT else key
+
+
+class AnalysisCache:
+    """
+        This is a cache of search results kept in an SQLite database on
+        disk, so the positions analysed in an earlier run are not
+        searched again. A result is found for a position and a depth if
+        the position was searched at least that deep. The database is in
+        write-ahead-log mode, so every process can open it and read while
+        another one writes
+
+        Attributes
+        ----------
+
+        path : str
+
+            file of the database, the "Analysis Cache" option
+
+        max_entries : int
+
+            number of results kept, the least recently used results are
+            dropped first
+
+        pending : dict
+
+            results not written yet, by key and depth, they are written
+            together once there are batch_size of them or when the
+            search flushes the cache after every move it found
+
+        count : int
+
+            number of results in the database, counted once when it is
+            opened and then kept up to date with the rows written and
+            dropped by this process
+
+        used : dict
+
+            time the stored results were last found, by key and depth,
+            written together with the pending results
+
+        hits : int
+
+            number of lookups that found a result
+
+        misses : int
+
+            number of lookups that did not find a result
+        """
+
+    # number of results and lookups collected before they are written
+    BATCH_SIZE = 256
+
+    # seconds a process waits for the database locked by another one
+    TIMEOUT = 30
+
+    def __init__(self, path, max_entries=1000000, batch_size=BATCH_SIZE):
+        """
+        Opens the database, it is created if it does not exist
+
+        Parameters
+        ----------
+
+            path (str):
+
+                file of the database
+
+            max_entries (int):
+
+                number of results kept, the "Analysis Cache Size" option
+
+            batch_size (int):
+
+                number of results and lookups collected before they are written
+        """
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.batch_size = max(1, batch_size)
+        self.pending = dict()
+        self.used = dict()
+        self.hits = 0
+        self.misses = 0
+        # the engine writes from the search thread
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=self.TIMEOUT, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS results (key INTEGER, depth INTEGER, move INTEGER, "
+                                    "score INTEGER, nodes INTEGER, used REAL, PRIMARY KEY (key, depth)) "
+                                    "WITHOUT ROWID")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        self.count = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key, depth):
+        """
+        Returns the deepest result of the position searched at least to
+        the given depth
+
+            Parameters:
+
+                key (int): zobrist key of the position
+
+                depth (int): depth the position has to be searched to
+
+            Returns:
+
+                (tuple): (depth, move, score, nodes) or None if the
+                position was not searched that deep
+        """
+        key = _to_signed(key)
+        with self.lock:
+            pending = [(entry_depth, ) + result for (entry_key, entry_depth), result in self.pending.items()
+                       if entry_key == key and entry_depth >= depth]
+            row = self.connection.execute("SELECT depth, move, score, nodes FROM results "
+                                          "WHERE key = ? AND depth >= ? ORDER BY depth DESC LIMIT 1",
+                                          (key, depth)).fetchone()
+            found = max(pending + ([row] if row is not None else []), default=None)
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.used[key, found[0]] = time.time()
+            self.__flush_if_full()
+            return found
+
+    def store(self, key, depth, move, score, nodes):
+        """
+        Stores the result of a search, it is written with the next batch
+
+            Parameters:
+
+                key (int): zobrist key of the position
+
+                depth (int): depth of the last completed iteration
+
+                move (int): best move, see libs.moves
+
+                score (int): utility of the move for the player on turn
+
+                nodes (int): number of nodes searched
+        """
+        with self.lock:
+            self.pending[_to_signed(key), depth] = (move, int(score), nodes)
+            self.__flush_if_full()
+
+    def flush(self):
+        """Writes the pending results and lookups and drops the least recently used results"""
+        with self.lock:
+            self.__flush()
+
+    def close(self):
+        """Writes the pending results and closes the database"""
+        with self.lock:
+            self.__flush()
+            self.connection.close()
+
+    def __flush_if_full(self):
+        """Writes the batch once it is full, the lock is held"""
+        if len(self.pending) + len(self.used) >= self.batch_size:
+            self.__flush()
+
+    def __flush(self):
+        """Writes the batch, the lock is held"""
+        if not self.pending and not self.used:
+            return
+        now = time.time()
+        with self.connection:
+            # the rows already stored are updated, so only the new rows are counted
+            self.connection.executemany("UPDATE results SET move = ?, score = ?, nodes = ?, used = ? "
+                                        "WHERE key = ? AND depth = ?",
+                                        [result + (now, ) + key for key, result in self.pending.items()])
+            self.count += self.connection.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                                                      [key + result + (now, )
+                                                       for key, result in self.pending.items()]).rowcount
+            self.connection.executemany("UPDATE results SET used = ? WHERE key = ? AND depth = ?",
+                                        [(used, ) + key for key, used in self.used.items()])
+            if self.count > self.max_entries:
+                self.count -= self.connection.execute("DELETE FROM results WHERE (key, depth) IN "
+                                                      "(SELECT key, depth FROM results ORDER BY used LIMIT ?)",
+                                                      (self.count - self.max_entries, )).rowcount
+        self.pending.clear()
+        self.used.clear()
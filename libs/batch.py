@@ -0,0 +1,228 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import multiprocessing.util
+import os
+import sys
+import time
+from libs.analysisCache import AnalysisCache
+from libs.chessboard import ChessBoard
+from libs.exceptions import InvalidFenException
+from libs.moves import move_to_uci
+from libs.timeManager import TimeManager
+from libs.transpositionTable import TranspositionTable
+
+# positions waiting for or being searched by every worker process, the
+# rest of the file is only read when a result is written
+PENDING_PER_WORKER = 4
+
+# state of a worker process, set up by _init_worker
+_board = None
+
+
+def _init_worker(hash_size, cache_path=None, cache_size=1000000):
+    """Sets up the board every worker process reuses for its positions"""
+    global _board
+    _board = ChessBoard()
+    _board.transposition_table = TranspositionTable(hash_size)
+    if cache_path is not None:
+        _board.analysis_cache = AnalysisCache(cache_path, cache_size)
+        # the last batch of results is written when the process exits
+        multiprocessing.util.Finalize(_board.analysis_cache, _board.analysis_cache.close, exitpriority=10)
+
+
+def read_positions(lines):
+    """
+    Returns the positions of an EPD or FEN file one by one, empty lines
+    and lines starting with # are skipped
+
+        Parameters:
+
+            lines (iterable): lines of the file
+
+        Returns:
+
+            (generator): tuples of the number of the position, the fen
+            and the id operation of the EPD, None if there is none
+    """
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split(None, 4)
+        fen = " ".join(fields[:4])
+        operations = fields[4] if len(fields) > 4 else ""
+        position_id = None
+        for operation in operations.split(";"):
+            name, _, value = operation.strip().partition(" ")
+            if name == "id":
+                position_id = value.strip().strip('"')
+        yield index, fen, position_id
+        index += 1
+
+
+def analyse(task):
+    """
+    Searches one position in a worker process
+
+        Parameters:
+
+            task (tuple): (index, fen, id, go), go is the command
+            limiting the search, example: go depth 6
+
+        Returns:
+
+            (dict): the result written as one line of the output
+    """
+    index, fen, position_id, go = task
+    result = {"index": index, "fen": fen}
+    if position_id is not None:
+        result["id"] = position_id
+    try:
+        _board.set_fen(fen)
+    except (InvalidFenException, ValueError, IndexError):
+        result["error"] = "invalid fen"
+        return result
+
+    _board.transposition_table.clear()
+    start = time.perf_counter()
+    move = _board.get_minmax_move(TimeManager(go, _board.turn))
+    result["bestmove"] = move_to_uci(move) if move is not None else None
+    result["score"] = int(_board.score) if _board.score is not None else None
+    result["nodes"] = _board.nodes
+    result["time"] = int((time.perf_counter() - start) * 1000)
+    return result
+
+
+def count_results(path):
+    """
+    Returns the number of results already written to the output and
+    cuts off the last line if it was not written completely, so an
+    interrupted run goes on with the next position
+
+        Parameters:
+
+            path (str): output file
+
+        Returns:
+
+            (int): number of complete results
+    """
+    if not os.path.exists(path):
+        return 0
+    count, end = 0, 0
+    with open(path, "rb+") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            count += 1
+            end += len(line)
+        file.truncate(end)
+    return count
+
+
+def run(input_path, output_path, go="go depth 4", workers=1, hash_size=16, cache_path=None, cache_size=1000000):
+    """
+    Analyses every position of the input and writes the results as JSON
+    lines in the order of the input. The results already in the output
+    are kept and their positions are not searched again. At most
+    PENDING_PER_WORKER positions per worker are held in memory. With an
+    analysis cache, the positions searched to the depth before, in this
+    or in another run, are taken from the cache
+
+        Parameters:
+
+            input_path (str): EPD or FEN file, one position per line
+
+            output_path (str): JSON lines file the results are appended to
+
+            go (str): command limiting the search of every position
+
+            workers (int): number of worker processes
+
+            hash_size (int): size of the transposition table of every
+            worker in megabytes
+
+            cache_path (str): database of the analysis cache shared by
+            the workers, None to search every position
+
+            cache_size (int): number of results kept in the analysis cache
+
+        Returns:
+
+            (int): number of positions analysed by this run
+    """
+    done = count_results(output_path)
+    analysed = 0
+    with open(input_path) as positions, open(output_path, "a") as output:
+        tasks = ((index, fen, position_id, go) for index, fen, position_id in read_positions(positions)
+                 if index >= done)
+
+        def write(result):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+        if workers <= 1:
+            _init_worker(hash_size, cache_path, cache_size)
+            for task in tasks:
+                write(analyse(task))
+                analysed += 1
+            if _board.analysis_cache is not None:
+                _board.analysis_cache.close()
+            return analysed
+
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(hash_size, cache_path, cache_size))
+        try:
+            pending = collections.deque()
+            for task in tasks:
+                pending.append(pool.apply_async(analyse, (task,)))
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    write(pending.popleft().get())
+                    analysed += 1
+            while pending:
+                write(pending.popleft().get())
+                analysed += 1
+            # the workers exit on their own, so they write their cached results
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return analysed
+
+
+def get_go_command(arguments):
+    """Returns the go command of the search limits given on the command line"""
+    if arguments.movetime is not None:
+        return "go movetime %d" % arguments.movetime
+    if arguments.nodes is not None:
+        return "go nodes %d" % arguments.nodes
+    return "go depth %d" % arguments.depth
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyses the positions of an EPD or FEN file")
+    parser.add_argument("input", help="EPD or FEN file, one position per line")
+    parser.add_argument("output", help="JSON lines file, an interrupted run is resumed")
+    parser.add_argument("--depth", type=int, default=4, help="depth of every search")
+    parser.add_argument("--nodes", type=int, help="nodes of every search")
+    parser.add_argument("--movetime", type=int, help="milliseconds of every search")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes")
+    parser.add_argument("--hash", type=int, default=16, help="megabytes of the table of every process")
+    parser.add_argument("--cache", help="SQLite analysis cache shared between the runs")
+    parser.add_argument("--cache-size", type=int, default=1000000, help="number of results kept in the cache")
+    arguments = parser.parse_args(argv)
+    analysed = run(arguments.input, arguments.output, get_go_command(arguments), arguments.workers,
+                   arguments.hash, arguments.cache, arguments.cache_size)
+    sys.stderr.write("analysed %d positions\n" % analysed)
+
+
+if __name__ == "__main__":
+    main()
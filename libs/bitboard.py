@@ -0,0 +1,176 @@
+# Bitboard tables and helpers. A bitboard is an integer with one bit for
+# every square, the bit index is row * 8 + column, the same as the index
+# of the square in ChessBoard.board
+
+
+def _jump_table(vectors):
+    """Returns for every square the bitboard of squares reachable with one of the vectors"""
+    table = []
+    for square in range(64):
+        x, y = divmod(square, 8)
+        bitboard = 0
+        for dx, dy in vectors:
+            if 0 <= x + dx <= 7 and 0 <= y + dy <= 7:
+                bitboard |= 1 << ((x + dx) * 8 + y + dy)
+        table.append(bitboard)
+    return table
+
+
+def _ray_table(dx, dy):
+    """Returns for every square the bitboard of squares on the ray in the direction"""
+    table = []
+    for square in range(64):
+        x, y = divmod(square, 8)
+        bitboard = 0
+        x, y = x + dx, y + dy
+        while 0 <= x <= 7 and 0 <= y <= 7:
+            bitboard |= 1 << (x * 8 + y)
+            x, y = x + dx, y + dy
+        table.append(bitboard)
+    return table
+
+
+KNIGHT_ATTACKS = _jump_table([(1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (-2, 1), (2, -1), (-2, -1)])
+KING_ATTACKS = _jump_table([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)])
+
+# squares attacked by a pawn of the color (Figure.Color) standing on the square
+PAWN_ATTACKS = [_jump_table([(1, 1), (1, -1)]), _jump_table([(-1, 1), (-1, -1)])]
+
+# rays going towards higher square indexes, the nearest blocker is the lowest bit
+NORTH_RAYS = _ray_table(1, 0)
+EAST_RAYS = _ray_table(0, 1)
+NORTH_EAST_RAYS = _ray_table(1, 1)
+NORTH_WEST_RAYS = _ray_table(1, -1)
+
+# rays going towards lower square indexes, the nearest blocker is the highest bit
+SOUTH_RAYS = _ray_table(-1, 0)
+WEST_RAYS = _ray_table(0, -1)
+SOUTH_EAST_RAYS = _ray_table(-1, 1)
+SOUTH_WEST_RAYS = _ray_table(-1, -1)
+
+def _between_table():
+    """Returns for every pair of squares on one line the bitboard of the squares between them"""
+    opposite_rays = [(NORTH_RAYS, SOUTH_RAYS), (EAST_RAYS, WEST_RAYS),
+                     (NORTH_EAST_RAYS, SOUTH_WEST_RAYS), (NORTH_WEST_RAYS, SOUTH_EAST_RAYS)]
+    table = [[0] * 64 for square in range(64)]
+    for first in range(64):
+        for second in range(64):
+            for ray, opposite in opposite_rays:
+                if ray[first] >> second & 1:
+                    table[first][second] = table[second][first] = ray[first] & opposite[second]
+    return table
+
+
+# squares strictly between two squares on a rank, file or diagonal, 0 for other pairs
+BETWEEN = _between_table()
+
+
+def _direction_table():
+    """Returns for every pair of squares on one line the square offset of one step from the first to the second"""
+    table = [[0] * 64 for square in range(64)]
+    for first in range(64):
+        x, y = divmod(first, 8)
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)]:
+            nx, ny = x + dx, y + dy
+            while 0 <= nx <= 7 and 0 <= ny <= 7:
+                table[first][nx * 8 + ny] = dx * 8 + dy
+                nx, ny = nx + dx, ny + dy
+    return table
+
+
+# offset added to a square to step towards the other square on the same rank, file or diagonal, 0 for other pairs
+DIRECTIONS = _direction_table()
+
+
+def rook_attacks(square, occupancy):
+    """
+    Returns the squares attacked by a rook
+
+        Parameters:
+
+            square (int): square of the rook
+
+            occupancy (int): bitboard of all occupied squares
+
+        Returns:
+
+            (int): bitboard of the attacked squares, including the
+            first occupied square in every direction
+    """
+    attacks = 0
+
+    ray = NORTH_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= NORTH_RAYS[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+
+    ray = EAST_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= EAST_RAYS[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+
+    ray = SOUTH_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= SOUTH_RAYS[blockers.bit_length() - 1]
+    attacks |= ray
+
+    ray = WEST_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= WEST_RAYS[blockers.bit_length() - 1]
+    return attacks | ray
+
+
+def bishop_attacks(square, occupancy):
+    """
+    Returns the squares attacked by a bishop
+
+        Parameters:
+
+            square (int): square of the bishop
+
+            occupancy (int): bitboard of all occupied squares
+
+        Returns:
+
+            (int): bitboard of the attacked squares, including the
+            first occupied square in every direction
+    """
+    attacks = 0
+
+    ray = NORTH_EAST_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= NORTH_EAST_RAYS[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+
+    ray = NORTH_WEST_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= NORTH_WEST_RAYS[(blockers & -blockers).bit_length() - 1]
+    attacks |= ray
+
+    ray = SOUTH_EAST_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= SOUTH_EAST_RAYS[blockers.bit_length() - 1]
+    attacks |= ray
+
+    ray = SOUTH_WEST_RAYS[square]
+    blockers = ray & occupancy
+    if blockers:
+        ray ^= SOUTH_WEST_RAYS[blockers.bit_length() - 1]
+    return attacks | ray
+
+
+def queen_attacks(square, occupancy):
+    """Returns the squares attacked by a queen, see rook_attacks"""
+    return rook_attacks(square, occupancy) | bishop_attacks(square, occupancy)
+
+
+def popcount(bitboard):
+    """Returns the number of squares set in the bitboard"""
+    return bin(bitboard).count("1")
@@ -1,10 +1,107 @@
 import random
 import copy
-from libs.exceptions import InvalidMoveException, CheckMateException, StalemateException
-from libs.utils import Vector2
+from libs.exceptions import (
+    InvalidMoveException, CheckMateException, StalemateException, SearchStoppedException, InvalidFenException
+)
 from libs.figures import (
     Figure, Pawn, Knight, Bishop, Rook, Queen, King
 )
+from libs.transpositionTable import TranspositionTable
+from libs.timeManager import TimeManager
+from libs.zobrist import PIECE_KEYS, TURN_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, hash_board
+from libs.bitboard import (
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, rook_attacks, bishop_attacks, queen_attacks
+)
+from libs.moves import NORMAL, PROMOTION, EN_PASSANT, CASTLING, FLAGS, PROMOTION_LETTERS, new_move_list
+from libs.uciOutput import format_info
+
+# deepest iteration of a search that is limited by time or nodes only
+MAX_DEPTH = 64
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# promotion bits of the moves (see libs.moves) in the order they are generated, the queen first
+PROMOTIONS = (3 << 12, 2 << 12, 1 << 12, 0)
+
+# bitboard of the rows a pawn is promoted on
+LAST_ROWS = 0xFF | 0xFF << 56
+
+# figure classes of the promotion bits
+PROMOTION_FIGURES = (Knight, Bishop, Rook, Queen)
+
+# figure classes of the Forsyth-Edwards Notation letters
+FEN_FIGURES = {"p": Pawn, "n": Knight, "b": Bishop, "r": Rook, "q": Queen, "k": King}
+
+# castling rights bits
+WHITE_SHORT_CASTLING = 1
+WHITE_LONG_CASTLING = 2
+BLACK_SHORT_CASTLING = 4
+BLACK_LONG_CASTLING = 8
+
+# castling rights that are kept when a figure moves from or to the square
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[0] = 15 & ~WHITE_LONG_CASTLING
+CASTLING_MASKS[4] = 15 & ~(WHITE_SHORT_CASTLING | WHITE_LONG_CASTLING)
+CASTLING_MASKS[7] = 15 & ~WHITE_SHORT_CASTLING
+CASTLING_MASKS[56] = 15 & ~BLACK_LONG_CASTLING
+CASTLING_MASKS[60] = 15 & ~(BLACK_SHORT_CASTLING | BLACK_LONG_CASTLING)
+CASTLING_MASKS[63] = 15 & ~BLACK_SHORT_CASTLING
+
+# material value of Pawn, Knight, Bishop, Rook, Queen, King
+FIGURE_VALUES = [100, 330, 330, 500, 900, 20000]
+
+# move ordering scores, the move of the transposition table or the
+# principal variation comes first, then captures and promotions, then
+# the killer moves and the quiet moves ordered by the history table
+HASH_MOVE_SCORE = 1 << 40
+CAPTURE_SCORE = 1 << 32
+KILLER_SCORE = 1 << 31
+
+# most valuable victim first, least valuable attacker first among equal victims
+MVV_LVA = [[victim * 8 + 5 - attacker for attacker in range(6)] for victim in range(6)]
+
+# number of killer moves remembered for every ply
+KILLER_SLOTS = 2
+
+# half width of the first aspiration window around the score of the previous iteration
+ASPIRATION_WINDOW = 50
+
+# iterations from this depth on start with an aspiration window
+ASPIRATION_DEPTH = 4
+
+# utility of a position the tablebases say is won, less the plies to the mate
+TABLEBASE_WIN = 10000
+
+# utility of giving mate at the root, less the plies to the mate, the value of the king
+CHECKMATE = FIGURE_VALUES[5]
+
+# margin added to the value of a capture in the quiescence search before
+# it is skipped as unable to bring the score back to the window
+DELTA_MARGIN = 200
+
+# depth the null move is searched with is reduced by this many plies
+NULL_MOVE_REDUCTION = 2
+
+# quiet moves searched after this many moves are searched one ply shallower
+LATE_MOVE_COUNT = 3
+
+# the search is not reduced closer to the leaves than this depth
+REDUCTION_DEPTH = 3
+
+# seconds between the info lines sent while an iteration runs, the
+# search looks at the clock every INFO_NODES nodes
+INFO_INTERVAL = 1
+INFO_NODES = 4096
+
+# positional value of every figure index (see Figure.index) on every square
+SQUARE_TABLES = [figure_class.square_values[color]
+                 for color in (Figure.Color.WHITE, Figure.Color.BLACK)
+                 for figure_class in (Pawn, Knight, Bishop, Rook, Queen, King)]
+
+# contribution of every figure index on every square to evaluate_board,
+# material plus positional value, negative for white figures
+EVALUATION_TABLES = [[(value + FIGURE_VALUES[index % 6]) * (1 if index >= 6 else -1) for value in square_table]
+                     for index, square_table in enumerate(SQUARE_TABLES)]
 
 
 class ChessBoard:
@@ -20,17 +117,173 @@ class ChessBoard:
 
     dead_figures: list
 
-        list of figures that were killed
+        list of figures that were killed, read from the undo stack
+
+    white_king_pos, black_king_pos: tuple
+
+        row and column of the king, read from its bitboard
 
     number_possible_moves: int
 
-        total possible moves for the given depth
+        total number of moves generated in the nodes of the last search
 
     number_prunned_moves: int
 
         number of moves prunned as a result of alpha-beta prunning
+        in the last search
+
+    number_cutoffs: int
+
+        number of nodes of the last search that were cut off
+
+    number_first_move_cutoffs: int
+
+        number of cutoffs caused by the first move searched, the
+        share of the cutoffs shows the quality of the move ordering
+
+    killer_moves: list
+
+        for every ply the last quiet moves that caused a cutoff
+
+    history: list
+
+        for every figure index (see Figure.index) and destination
+        square the score of the quiet moves that caused cutoffs
+
+    undo_stack: list
+
+        undo entries of the moves played with play_move, the last
+        entry belongs to the last move. The zobrist keys of the entries
+        are the history of the positions checked for repetitions
+
+    halfmove_clock: int
+
+        number of moves since the last capture or pawn move, the game
+        is drawn by the fifty-move rule when it reaches 100
+
+    start_ply: int
+
+        number of plies of the game before the position set up, taken
+        from the fullmove number of the FEN
+
+    move_lists: list
+
+        for every ply an array the captures of the searched position
+        are generated into, reused by every node of the ply
+
+    quiet_move_lists: list
+
+        for every ply an array the quiet moves of the searched position
+        are generated into
+
+    pv_table: list
+
+        for every ply an array of the principal variation found below
+        the position of the ply, the first one belongs to the root
+
+    seldepth: int
+
+        deepest ply reached by the last search, quiescence included
+
+    root_ply: int
+
+        number of moves of the undo stack played before the root of
+        the last search
+
+    castling_rights: int
+
+        mask of the castling rights that are still available
+
+    en_passant: tuple
+
+        square a pawn can capture en passant on, None if there is none
+
+    hash: int
+
+        zobrist key of the position, updated with every change
+
+    bitboards: list
+
+        bitboard of the squares occupied by every figure index
+        (see Figure.index)
+
+    occupancy: list
+
+        bitboard of the squares occupied by the white and by the
+        black figures
+
+    transposition_table: TranspositionTable
+
+        table of the positions already searched, shared with the copies
+        of the chessboard
+
+    evaluation: int
+
+        value of evaluate_board, updated with every change
+
+    nodes: int
+
+        number of nodes visited by the last search
+
+    best_move: int
+
+        best move of the last completed iteration of the search, packed
+        as described in libs.moves
+
+    completed_depth: int
+
+        depth of the last completed iteration of the search, 0 if the
+        move was taken from the tablebases or the analysis cache
+
+    score: int
+
+        utility of best_move for the player on turn, None before the
+        first iteration completed
+
+    null_move_pruning: bool
+
+        if true the search passes the turn to find positions that are
+        good enough without searching any move, the "Null Move
+        Pruning" option
+
+    late_move_reductions: bool
+
+        if true quiet moves ordered late are searched with less depth
+        first, the "Late Move Reductions" option
+
+    tablebases: Tablebases
+
+        endgame tables probed by the search, None if there are none
+
+    analysis_cache: AnalysisCache
+
+        results of earlier searches stored on disk, looked up before
+        searching, None if there is none
+
+    send_info: function
+
+        receives the info lines of the search (see libs.uciOutput),
+        None if they are not sent
+
+    display_current_move: bool
+
+        if true the root move searched is sent once the search ran
+        for INFO_INTERVAL, the "Display Current Move" option
+
+    display_pv_tips: bool
+
+        if true the principal variation is sent whenever the best root
+        move changes or the score leaves the aspiration window, the
+        "Display PV Tips" option
+
+    debug_evaluation: bool
+
+        if true evaluate_board checks the updated evaluation against
+        the evaluation computed from scratch
     """
 
+    debug_evaluation = False
+
     def __init__(self, chessboard=None):
         """
         Constructs a new chessboard of chessboard parameter is none
@@ -46,19 +299,108 @@ class ChessBoard:
         # current turn
         self.turn = Figure.Color.WHITE
 
-        self.white_king_pos = Vector2((0, 4))
-        self.black_king_pos = Vector2((7, 4))
-
         self.max_depth = 4
-        self.dead_figures = []
+        self.undo_stack = []
+        self.halfmove_clock = 0
+        self.start_ply = 0
+
+        self.nodes = 0
+        self.best_move = None
+        self.score = None
+        self.completed_depth = 0
+        self.search_depth = self.max_depth
+        self.time_manager = None
+        self.number_possible_moves = 0
+        self.number_prunned_moves = 0
+        self.number_cutoffs = 0
+        self.number_first_move_cutoffs = 0
+        self.__setup_search_tables()
+        self.seldepth = 0
+        self.root_ply = 0
+        self.next_info_time = 0
+        self.null_move_pruning = True
+        self.late_move_reductions = True
+        self.tablebases = None
+        self.analysis_cache = None
+        self.send_info = None
+        self.display_current_move = False
+        self.display_pv_tips = False
+
+        self.castling_rights = WHITE_SHORT_CASTLING | WHITE_LONG_CASTLING | BLACK_SHORT_CASTLING | BLACK_LONG_CASTLING
+        self.en_passant = None
 
         if chessboard is not None:
             self.board = copy.copy(chessboard.board)
             self.turn = chessboard.turn
-            self.white_king_pos = chessboard.white_king_pos
-            self.black_king_pos = chessboard.black_king_pos
+            self.castling_rights = chessboard.castling_rights
+            self.en_passant = chessboard.en_passant
+            self.halfmove_clock = chessboard.halfmove_clock
+            self.start_ply = chessboard.get_game_ply()
+            self.hash = chessboard.hash
+            self.bitboards = list(chessboard.bitboards)
+            self.occupancy = list(chessboard.occupancy)
+            self.evaluation = chessboard.evaluation
+            self.transposition_table = chessboard.transposition_table
+            self.null_move_pruning = chessboard.null_move_pruning
+            self.late_move_reductions = chessboard.late_move_reductions
+            self.tablebases = chessboard.tablebases
+            self.analysis_cache = chessboard.analysis_cache
         else:
             self.__setup_initial_board()
+            self.hash = hash_board(self)
+            self.__setup_bitboards()
+            self.evaluation = self.compute_evaluation()
+            self.transposition_table = TranspositionTable()
+
+    def get_game_ply(self):
+        """Returns the number of plies played in the game, the ones before the FEN included"""
+        return self.start_ply + len(self.undo_stack)
+
+    @property
+    def white_king_pos(self):
+        """Row and column of the white king, None if it is not on the board"""
+        king = self.bitboards[King.kind]
+        return divmod(king.bit_length() - 1, 8) if king else None
+
+    @property
+    def black_king_pos(self):
+        """Row and column of the black king, None if it is not on the board"""
+        king = self.bitboards[King.kind + 6]
+        return divmod(king.bit_length() - 1, 8) if king else None
+
+    @property
+    def dead_figures(self):
+        """Figures captured since the position was set up, in the order they were captured"""
+        return [entry[2] for entry in self.undo_stack if entry[2] is not None]
+
+    def __getstate__(self):
+        """
+        Pickles the position only, the transposition table, the
+        tablebases, the analysis cache, the search limits, the output
+        and the tables of the search stay in the process
+        """
+        state = self.__dict__.copy()
+        state["transposition_table"] = None
+        state["time_manager"] = None
+        state["tablebases"] = None
+        state["analysis_cache"] = None
+        state["send_info"] = None
+        for name in ("killer_moves", "history", "move_lists", "quiet_move_lists", "pv_table"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        """Unpickles the position with empty tables of the search"""
+        self.__dict__.update(state)
+        self.__setup_search_tables()
+
+    def __setup_search_tables(self):
+        """Creates the killer moves, the history, the move lists and the principal variation table"""
+        self.killer_moves = [[None] * KILLER_SLOTS for ply in range(MAX_DEPTH)]
+        self.history = [[0] * 64 for index in range(12)]
+        self.move_lists = [new_move_list() for ply in range(MAX_DEPTH)]
+        self.quiet_move_lists = [new_move_list() for ply in range(MAX_DEPTH)]
+        self.pv_table = [new_move_list() for ply in range(MAX_DEPTH)]
 
     def __setup_first_row(self, color):
         """Receives the color attribute and Sets up a list of Figures on the first row, returns the list"""
@@ -73,6 +415,84 @@ class ChessBoard:
         self.board += [Pawn(Figure.Color.BLACK) for i in range(8)]
         self.board += self.__setup_first_row(Figure.Color.BLACK)
 
+    def __setup_bitboards(self):
+        """Builds the bitboards from the figures on the board"""
+        self.bitboards = [0] * 12
+        self.occupancy = [0, 0]
+        for square, figure in enumerate(self.board):
+            if figure is not None:
+                self.bitboards[figure.index] |= 1 << square
+                self.occupancy[figure.color] |= 1 << square
+
+    def set_fen(self, fen):
+        """
+        Sets up the position described in Forsyth-Edwards Notation.
+        The board is only changed if the whole notation is valid
+
+            Parameters:
+
+                fen (str): example:
+                rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1
+
+            Raises:
+
+                InvalidFenException: if the notation is not valid or
+                a player does not have exactly one king
+        """
+        fields = fen.split()
+        rows = fields[0].split("/") if fields else []
+        if len(rows) != 8 or len(fields) < 2 or fields[1] not in ("w", "b"):
+            raise InvalidFenException(fen)
+
+        board = [None] * 64
+        for i, row in enumerate(rows):
+            x, y = 7 - i, 0
+            for char in row:
+                if char.isdigit():
+                    y += int(char)
+                elif char.lower() in FEN_FIGURES and y <= 7:
+                    color = Figure.Color.WHITE if char.isupper() else Figure.Color.BLACK
+                    board[x * 8 + y] = FEN_FIGURES[char.lower()](color)
+                    y += 1
+                else:
+                    raise InvalidFenException(fen)
+            if y != 8:
+                raise InvalidFenException(fen)
+        if fields[0].count("K") != 1 or fields[0].count("k") != 1:
+            raise InvalidFenException(fen)
+
+        turn = Figure.Color.WHITE if fields[1] == "w" else Figure.Color.BLACK
+        # the en passant square is behind the pawn the other player just moved two squares
+        en_passant = fields[3] if len(fields) > 3 else "-"
+        if en_passant != "-" and (len(en_passant) != 2 or en_passant[0] not in "abcdefgh"
+                                  or en_passant[1] != ("6" if turn == Figure.Color.WHITE else "3")):
+            raise InvalidFenException(fen)
+
+        self.board = board
+        self.turn = turn
+        castling = fields[2] if len(fields) > 2 else "-"
+        self.castling_rights = 0
+        for char, right in (("K", WHITE_SHORT_CASTLING), ("Q", WHITE_LONG_CASTLING),
+                            ("k", BLACK_SHORT_CASTLING), ("q", BLACK_LONG_CASTLING)):
+            if char in castling:
+                self.castling_rights |= right
+
+        self.undo_stack = []
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 and fields[4].isdigit() else 0
+        fullmove = int(fields[5]) if len(fields) > 5 and fields[5].isdigit() else 1
+        self.start_ply = 2 * (max(fullmove, 1) - 1) + turn
+        self.__setup_bitboards()
+
+        # the en passant square is only kept if a pawn can capture on it
+        self.en_passant = None
+        if en_passant != "-":
+            square = (int(en_passant[1]) - 1) * 8 + ord(en_passant[0]) - ord('a')
+            if PAWN_ATTACKS[1 - self.turn][square] & self.bitboards[Pawn.kind + 6 * self.turn]:
+                self.en_passant = divmod(square, 8)
+
+        self.hash = hash_board(self)
+        self.evaluation = self.compute_evaluation()
+
     def get_piece_at(self, coordinates):
         """
         Get piece on given coordinates. If the coordinates is empty
@@ -91,102 +511,689 @@ class ChessBoard:
         return self.board[x * 8 + y]
 
     def set_piece_at(self, coordinates, value):
+        """
+        Puts the figure (or None) on the given coordinates and updates
+        the zobrist key, the bitboards and the evaluation of the position
+        """
         x, y = coordinates
-        self.board[x * 8 + y] = value
+        self.__set_square(x * 8 + y, value)
 
-    def get_minmax_move(self):
+    def __set_square(self, square, value):
+        """
+        Puts the figure (or None) on the square index, row * 8 + column,
+        see set_piece_at
         """
-        Returns next move calculated with minmax algorithm
+        mask = 1 << square
+        figure = self.board[square]
+        if figure is not None:
+            self.hash ^= PIECE_KEYS[figure.index][square]
+            self.bitboards[figure.index] ^= mask
+            self.occupancy[figure.color] ^= mask
+            self.evaluation -= EVALUATION_TABLES[figure.index][square]
+        if value is not None:
+            self.hash ^= PIECE_KEYS[value.index][square]
+            self.bitboards[value.index] ^= mask
+            self.occupancy[value.color] ^= mask
+            self.evaluation += EVALUATION_TABLES[value.index][square]
+        self.board[square] = value
+
+    def get_minmax_move(self, time_manager=None):
+        """
+        Returns next move calculated with minmax algorithm. The search
+        goes one ply deeper on every iteration until a limit of the
+        time manager is reached
+
+            Parameters:
+
+                time_manager (TimeManager): limits of the search, the
+                search goes to max_depth if not given
 
             Returns:
 
-                str: move in long algebraic notation. Example: C7C2
+                move (int): best move, see libs.moves
         """
-        utility, move = self.maximize(float("-inf"), float("inf"), self, self.max_depth, self)
-        fro, to = move
-        # print(self.draw_board())
-        print(chr(ord('a') + fro[1]) + str(int(fro[0]) + 1) + chr(ord('a') + to[1]) + str(int(to[0]) + 1))
-        return chr(ord('a') + fro[1]) + str(int(fro[0]) + 1) + chr(ord('a') + to[1]) + str(int(to[0]) + 1)
+        if time_manager is None:
+            time_manager = TimeManager()
+        depth_limit = time_manager.depth
+        limited = depth_limit is None and time_manager.is_limited()
+        if depth_limit is None:
+            depth_limit = MAX_DEPTH if limited else self.max_depth
+
+        self.transposition_table.new_search()
+        self.time_manager = time_manager
+        self.nodes = 0
+        self.best_move = None
+        self.score = None
+        self.clear_move_ordering()
+        moves_played = len(self.undo_stack)
+        self.root_ply = moves_played
+        self.seldepth = 0
+        self.next_info_time = INFO_INTERVAL
+        self.completed_depth = 0
+        # a position found in the tablebases is not searched, a result of
+        # the analysis cache is taken as the completed iterations, a search
+        # limited by time goes on deeper from any result found there
+        if self.get_tablebase_move() is not None:
+            depth_limit = 0
+        elif self.get_cached_move(1 if limited else depth_limit) is not None:
+            del self.pv_table[0][:]
+            self.pv_table[0].append(self.best_move)
+            self.__send_pv(self.completed_depth)
+        cached_depth = self.completed_depth
+
+        for depth in range(cached_depth + 1, depth_limit + 1):
+            self.search_depth = depth
+            try:
+                move = self.__search_root(depth)
+            except SearchStoppedException:
+                # take back the moves of the aborted iteration
+                while len(self.undo_stack) > moves_played:
+                    self.unmake_move()
+                break
+            if move is None:
+                break
+            self.best_move = move
+            self.completed_depth = depth
+            self.__send_pv(depth)
+            if not time_manager.can_start_iteration():
+                break
+
+        if self.analysis_cache is not None:
+            if self.completed_depth > cached_depth:
+                self.analysis_cache.store(self.hash, self.completed_depth, self.best_move, self.score, self.nodes)
+            # the result is committed at once, an engine killed by the GUI keeps its analysis
+            self.analysis_cache.flush()
+        return self.best_move
+
+    def __send_pv(self, depth, score=None, bound=""):
+        """
+        Sends the info line of the principal variation, of the completed
+        iteration if the score is not given
+
+            Parameters:
+
+                depth (int): depth of the iteration
+
+                score (int): utility of the root move, score if not given
 
-    def __get_all_legal_moves(self):
+                bound (str): "lowerbound" or "upperbound" if the score is
+                outside of the search window
         """
-        Returns all legal moves as a list of tuples for the current
-        position
+        if self.send_info is None:
+            return
+        pv, score = self.get_legal_pv(self.pv_table[0], self.score if score is None else score)
+        self.send_info(format_info(depth, self.seldepth, score, bound, self.nodes, self.time_manager.elapsed(),
+                                   self.transposition_table.get_hashfull(), pv))
+
+    def get_legal_pv(self, pv, score):
+        """
+        Returns the principal variation and its score as they are sent
+        to the GUI. The search plays pseudo legal moves and wins by
+        capturing the king, so the variation ends before the first move
+        that is not legal. A score above TABLEBASE_WIN is only reached by
+        a mate, it is sent as the mate the variation ends in, scored
+        like a tablebase win
+
+            Parameters:
+
+                pv (iterable): packed moves of the principal variation
+
+                score (int): utility of the first move for the player on turn
 
             Returns:
 
-                moves (list): list of tuples containing 2 integers
-                each. Example: [((0, 1),(0, 2)),((0, 4),(0, 6))]
+                pv (list): the legal moves of the variation
+
+                score (int): utility sent for the variation
         """
-        moves = []
-        for x, y, figure in self.get_all_figures():
-            if figure is not None and figure.color == self.turn:
-                moves += self.__get_figure_legal_moves(figure, (x, y))
-        moves += self.__get_all_special_moves()
-        return moves
+        legal = []
+        for move in pv:
+            if move not in self.get_all_legal_moves():
+                break
+            self.play_move(move)
+            legal.append(move)
+        if abs(score) > TABLEBASE_WIN:
+            # the variation may end before the mate, the moves to it are in the transposition table
+            moves = self.get_all_legal_moves()
+            while moves and len(legal) < MAX_DEPTH:
+                entry = self.transposition_table.probe(self.hash)
+                if entry is None or entry[4] not in moves:
+                    break
+                self.play_move(entry[4])
+                legal.append(entry[4])
+                moves = self.get_all_legal_moves()
+            plies = len(legal)
+            if moves or not self.is_player_in_check():
+                # the mate is not on the board, it is sent as the first one possible after the variation
+                plies += 1 if plies % 2 != (score > 0) else 2
+            if plies % 2:
+                score = TABLEBASE_WIN - plies
+            else:
+                score = plies - TABLEBASE_WIN
+        for _ in legal:
+            self.unmake_move()
+        return legal, score
+
+    def __send_progress(self):
+        """Sends the nodes searched so far and the root move, at most once every INFO_INTERVAL"""
+        elapsed = self.time_manager.elapsed()
+        if elapsed < self.next_info_time:
+            return
+        self.next_info_time = elapsed + INFO_INTERVAL
+        self.send_info(format_info(self.search_depth, self.seldepth, nodes=self.nodes, elapsed=elapsed,
+                                   hashfull=self.transposition_table.get_hashfull()))
 
-    def get_all_figures(self):
-        for k, figure in enumerate(self.board):
-            x = k // 8
-            y = k % 8
-            yield x, y, figure
+    def __search_root(self, depth):
+        """
+        Searches the position to the given depth. From ASPIRATION_DEPTH
+        on the search starts with a narrow window around the score of
+        the previous iteration, the window is widened on the side the
+        score falls out of and the position is searched again
 
-    def get_all_legal_moves(self):
+            Parameters:
 
-        moves = self.__get_all_legal_moves()
-        valid_moves = []
-        for move in moves:
-            board_copy = ChessBoard(self)
-            board_copy.move(move[0], move[1])
-            if not board_copy.is_opponent_in_check():
-                valid_moves.append(move)
-        return valid_moves
+                depth (int): depth of the iteration
+
+            Returns:
 
-    def __get_figure_legal_moves(self, figure, pos):
+                move (int): best move found, None if there is no move
         """
-        Returns all legal moves for a given figure in a given
-        position
+        window = ASPIRATION_WINDOW
+        if depth >= ASPIRATION_DEPTH and self.score is not None:
+            alpha, beta = self.score - window, self.score + window
+        else:
+            alpha, beta = float("-inf"), float("inf")
+        while True:
+            utility, move = self.negamax(alpha, beta, depth)
+            if move is None:
+                return None
+            window *= 4
+            if self.display_pv_tips and not alpha < utility < beta:
+                self.__send_pv(depth, utility, "upperbound" if utility <= alpha else "lowerbound")
+            if utility <= alpha:
+                alpha = float("-inf") if window > FIGURE_VALUES[Queen.kind] else utility - window
+            elif utility >= beta:
+                # the move beat the window, it is at least as good as the last best move
+                self.best_move = move
+                beta = float("inf") if window > FIGURE_VALUES[Queen.kind] else utility + window
+            else:
+                self.score = utility
+                return move
+
+    def get_tablebase_move(self):
+        """
+        Looks the position up in the tablebases and sets best_move and
+        score to the best move found there
+
+            Returns:
+
+                move (int): best move of the tablebases, None if the
+                position is not in the tablebases
+        """
+        if self.tablebases is None or not self.tablebases.can_probe(self):
+            return None
+        result = self.tablebases.get_best_move(self)
+        if result is None:
+            return None
+        self.best_move = result[0]
+        self.score = self.__get_tablebase_utility(result[1:])
+        return self.best_move
+
+    def get_cached_move(self, depth):
+        """
+        Looks the position up in the analysis cache and sets best_move,
+        score and completed_depth to the deepest result stored there
 
             Parameters:
 
-                figure (Figure): object of type Figure
+                depth (int): depth the position has to be searched to
 
-                pos (tuple): tuple of two integers
+            Returns:
+
+                move (int): best move of the cache, None if the position
+                was not searched that deep or the move is not legal
+        """
+        if self.analysis_cache is None:
+            return None
+        result = self.analysis_cache.get(self.hash, depth)
+        # a move of another position with the same key is not played
+        if result is None or result[1] not in self.get_all_legal_moves():
+            return None
+        self.completed_depth, self.best_move, self.score = result[:3]
+        return self.best_move
+
+    @staticmethod
+    def __get_tablebase_utility(result):
+        """Returns the utility of a tablebase result and distance to mate for the player on turn"""
+        outcome, distance = result
+        if outcome > 0:
+            return TABLEBASE_WIN - distance
+        if outcome < 0:
+            return distance - TABLEBASE_WIN
+        return 0
+
+    def get_ponder_move(self, reply=None):
+        """
+        Returns the reply expected to the best move of the last search,
+        taken from the transposition table if it is not given
+
+            Parameters:
+
+                reply (int): expected reply found by the search
 
             Returns:
 
-                moves (list): list of two tuples each with two
-                integers
+                move (int): the reply or None if it is not known or
+                not legal
         """
-        moves = []
+        if self.best_move is None:
+            return None
+        self.play_move(self.best_move)
+        if reply is None:
+            entry = self.transposition_table.probe(self.hash)
+            reply = entry[4] if entry is not None else None
+        if reply is not None and reply not in self.get_all_legal_moves():
+            reply = None
+        self.unmake_move()
+        return reply
+
+    def clear_move_ordering(self):
+        """Forgets the killer moves and the history and resets the cutoff statistics"""
+        self.number_possible_moves = 0
+        self.number_prunned_moves = 0
+        self.number_cutoffs = 0
+        self.number_first_move_cutoffs = 0
+        for killers in self.killer_moves:
+            killers[:] = [None] * KILLER_SLOTS
+        for history in self.history:
+            history[:] = [0] * 64
+
+    def __order_moves(self, moves, hash_move, ply):
+        """
+        Returns the moves sorted so the moves most likely to cause
+        a cutoff are searched first
 
-        for move_list in figure.get_all_moves(pos):
-            for x, y in move_list:
-                if self.get_piece_at((x, y)) is None:
-                    if not (str(figure).endswith("Pawn") and pos[1] != y):
-                        # if square is empty add to possible moves
-                        moves.append((pos, (x, y)))
-                    if str(figure).endswith("Pawn") and (pos[0] - x) % 2 == 0:
-                        for square in figure.path(Vector2(pos), Vector2((x, y))):
-                            if self.get_piece_at((square[0], square[1])) is not None:
-                                moves.pop()
-                elif self.get_piece_at((x, y)).color != figure.color:
-                    if not (str(figure).endswith("Pawn") and pos[1] == y):
-                        # make kill
-                        moves.append((pos, (x, y)))
-                        break
-                else:
-                    if not str(figure).endswith("Pawn"):
-                        break
+            Parameters:
+
+                moves (array): moves of the position
+
+                hash_move (int): best move stored in the transposition
+                table or found by the previous iteration, can be None
+
+                ply (int): distance of the position from the root
+
+            Returns:
+
+                moves (list): the moves, best first
+        """
+        board = self.board
+        killers = self.killer_moves[ply]
+        history = self.history
+
+        def score(move):
+            if move == hash_move:
+                return HASH_MOVE_SCORE
+            figure = board[move & 63]
+            captured = board[move >> 6 & 63]
+            if captured is not None:
+                return CAPTURE_SCORE + MVV_LVA[captured.kind][figure.kind]
+            flag = move & FLAGS
+            if flag == PROMOTION:
+                return CAPTURE_SCORE + MVV_LVA[(move >> 12 & 3) + 1][Pawn.kind]
+            if flag == EN_PASSANT:
+                return CAPTURE_SCORE + MVV_LVA[Pawn.kind][Pawn.kind]
+            if move in killers:
+                return KILLER_SCORE + KILLER_SLOTS - killers.index(move)
+            return history[figure.index][move >> 6 & 63]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def __pick_moves(self, hash_move, ply):
+        """
+        Yields the pseudo legal moves of the position in stages: the
+        hash move, the winning captures and the queen promotions, the
+        killer moves, the quiet moves and the losing captures. A stage
+        is generated only when no move before it caused a cutoff, the
+        generated moves are kept in move_lists and quiet_move_lists
+
+            Parameters:
+
+                hash_move (int): best move stored in the transposition
+                table, can be None
+
+                ply (int): distance of the position from the root
+
+            Yields:
+
+                move (int): packed move, see libs.moves
+        """
+        captures = self.move_lists[ply]
+        quiets = self.quiet_move_lists[ply]
+        del captures[:]
+        del quiets[:]
+        if hash_move is not None and self.__is_pseudo_legal(hash_move):
+            yield hash_move
+        else:
+            hash_move = None
+
+        self.__get_all_legal_moves(captures_only=True, moves=captures)
+        winning, losing = [], []
+        for move in captures:
+            if move != hash_move:
+                (losing if self.__is_losing_capture(move) else winning).append(move)
+        winning.sort(key=self.__get_capture_score, reverse=True)
+        yield from winning
+
+        killers = [killer for killer in self.killer_moves[ply]
+                   if killer is not None and killer != hash_move and killer not in captures
+                   and self.__is_pseudo_legal(killer)]
+        yield from killers
+
+        self.__get_all_legal_moves(moves=quiets, quiets_only=True)
+        board = self.board
+        history = self.history
+        yield from sorted((move for move in quiets if move != hash_move and move not in killers),
+                          key=lambda move: history[board[move & 63].index][move >> 6 & 63], reverse=True)
+
+        losing.sort(key=self.__get_capture_score, reverse=True)
+        yield from losing
+
+    def __get_capture_score(self, move):
+        """Returns the most valuable victim, least valuable attacker order of a capture or promotion"""
+        flag = move & FLAGS
+        captured = self.board[move >> 6 & 63]
+        if captured is not None:
+            return MVV_LVA[captured.kind][self.board[move & 63].kind]
+        if flag == PROMOTION:
+            return MVV_LVA[(move >> 12 & 3) + 1][Pawn.kind]
+        return MVV_LVA[Pawn.kind][Pawn.kind]
+
+    def __is_losing_capture(self, move):
+        """
+        Returns true if the capture takes a figure worth less than the
+        capturing figure on a square the opponent defends, so the
+        capturing figure can be taken back with a loss
+        """
+        if move & FLAGS != NORMAL:
+            return False
+        fro, to = move & 63, move >> 6 & 63
+        attacker = self.board[fro].kind
+        if FIGURE_VALUES[self.board[to].kind] >= FIGURE_VALUES[attacker]:
+            return False
+        occupied = (self.occupancy[0] | self.occupancy[1]) ^ (1 << fro)
+        return bool(self.__get_attackers(to, 1 - self.turn, occupied))
+
+    def __is_pseudo_legal(self, move):
+        """
+        Returns true if the move, taken from the transposition table or
+        the killer moves of another position, is one of the pseudo legal
+        moves of the position
+        """
+        fro, to, flag = move & 63, move >> 6 & 63, move & FLAGS
+        figure = self.board[fro]
+        if figure is None or figure.color != self.turn:
+            return False
+        if flag == CASTLING:
+            return move in self.__check_castling()
+        own = self.occupancy[self.turn]
+        if own >> to & 1:
+            return False
+        occupied = own | self.occupancy[1 - self.turn]
+        kind = figure.kind
+        if kind == Pawn.kind:
+            if not self.__get_pawn_targets(fro, occupied) >> to & 1:
+                return False
+            if (1 << to) & LAST_ROWS:
+                return flag == PROMOTION
+            en_passant = self.en_passant is not None and to == self.en_passant[0] * 8 + self.en_passant[1]
+            return flag == (EN_PASSANT if en_passant else NORMAL)
+        if flag != NORMAL:
+            return False
+        if kind == Knight.kind:
+            targets = KNIGHT_ATTACKS[fro]
+        elif kind == Bishop.kind:
+            targets = bishop_attacks(fro, occupied)
+        elif kind == Rook.kind:
+            targets = rook_attacks(fro, occupied)
+        elif kind == Queen.kind:
+            targets = queen_attacks(fro, occupied)
+        else:
+            targets = KING_ATTACKS[fro]
+        return bool(targets >> to & 1)
+
+    def __record_cutoff(self, move, depth, ply, searched, moves):
+        """
+        Updates the statistics, the killer moves and the history with
+        the move that caused a cutoff
+
+            Parameters:
+
+                move (int): move that caused the cutoff
+
+                depth (int): remaining depth of the position
+
+                ply (int): distance of the position from the root
+
+                searched (int): number of moves searched including move
+
+                moves (int): number of moves of the position
+        """
+        self.number_cutoffs += 1
+        self.number_prunned_moves += moves - searched
+        if searched == 1:
+            self.number_first_move_cutoffs += 1
+        to = move >> 6 & 63
+        # captures and promotions are ordered well enough without the heuristics
+        if move & FLAGS in (PROMOTION, EN_PASSANT) or self.board[to] is not None:
+            return
+        killers = self.killer_moves[ply]
+        if killers[0] != move:
+            killers[1:] = killers[:-1]
+            killers[0] = move
+        self.history[self.board[move & 63].index][to] += depth * depth
+
+    def __count_node(self):
+        """
+        Counts the visited node and aborts the search by raising
+        SearchStoppedException once the time manager says so. The
+        first iteration is never aborted, so there always is a move.
+        The deepest ply is kept as seldepth for the info lines
+        """
+        self.nodes += 1
+        ply = len(self.undo_stack) - self.root_ply
+        if ply > self.seldepth:
+            self.seldepth = ply
+        if not self.nodes & 255:
+            if self.best_move is not None and self.time_manager.should_stop(self.nodes):
+                raise SearchStoppedException()
+            if not self.nodes & INFO_NODES - 1 and self.send_info is not None:
+                self.__send_progress()
+
+    def __get_all_legal_moves(self, captures_only=False, moves=None, quiets_only=False):
+        """
+        Returns all pseudo legal moves (the king may be left in check)
+        of the current position
+
+            Parameters:
+
+                captures_only (bool): if true only captures and queen
+                promotions are returned, for the quiescence search
+
+                moves (array): array the moves are generated into, its
+                content is replaced, a new array is used if not given
+
+                quiets_only (bool): if true only the other moves are
+                returned, the moves to empty squares, the promotions to
+                other figures than the queen and castling
+
+            Returns:
+
+                moves (array): the moves packed as described in libs.moves
+        """
+        if moves is None:
+            moves = new_move_list()
+        else:
+            del moves[:]
+        append = moves.append
+        en_passant = -1 if self.en_passant is None else self.en_passant[0] * 8 + self.en_passant[1]
+        own = self.occupancy[self.turn]
+        occupied = own | self.occupancy[1 - self.turn]
+        if captures_only:
+            not_own, promotions = self.occupancy[1 - self.turn], PROMOTIONS[:1]
+        elif quiets_only:
+            not_own, promotions = ~occupied, PROMOTIONS[1:]
+        else:
+            not_own, promotions = ~own, PROMOTIONS
+        promotion_row = 6 if self.turn == Figure.Color.WHITE else 1
+
+        figures = own
+        while figures:
+            low = figures & -figures
+            figures ^= low
+            square = low.bit_length() - 1
+            kind = self.board[square].kind
+
+            if kind == Pawn.kind:
+                targets = self.__get_pawn_targets(square, occupied)
+                # every move from the row before the last one is a promotion
+                if captures_only and square >> 3 != promotion_row:
+                    targets &= PAWN_ATTACKS[self.turn][square]
+                elif quiets_only and square >> 3 != promotion_row:
+                    targets &= ~PAWN_ATTACKS[self.turn][square]
+            elif kind == Knight.kind:
+                targets = KNIGHT_ATTACKS[square] & not_own
+            elif kind == Bishop.kind:
+                targets = bishop_attacks(square, occupied) & not_own
+            elif kind == Rook.kind:
+                targets = rook_attacks(square, occupied) & not_own
+            elif kind == Queen.kind:
+                targets = queen_attacks(square, occupied) & not_own
+            else:
+                targets = KING_ATTACKS[square] & not_own
+
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                move = square | (low.bit_length() - 1) << 6
+                if kind == Pawn.kind:
+                    if low & LAST_ROWS:
+                        for promotion in promotions:
+                            append(move | PROMOTION | promotion)
+                        continue
+                    if move >> 6 == en_passant:
+                        move |= EN_PASSANT
+                append(move)
+
+        if not captures_only:
+            moves.extend(self.__get_all_special_moves())
         return moves
 
+    def __get_pawn_targets(self, square, occupied):
+        """
+        Returns the squares the pawn of the player on turn can move to
+
+            Parameters:
+
+                square (int): square index of the pawn
+
+                occupied (int): bitboard of all occupied squares
+
+            Returns:
+
+                targets (int): bitboard of the target squares
+        """
+        row = square >> 3
+        if self.turn == Figure.Color.WHITE:
+            if row == 7:
+                return 0
+            forward, start_row = 8, 1
+        else:
+            if row == 0:
+                return 0
+            forward, start_row = -8, 6
+
+        captures = self.occupancy[1 - self.turn]
+        if self.en_passant is not None:
+            captures |= 1 << (self.en_passant[0] * 8 + self.en_passant[1])
+        targets = PAWN_ATTACKS[self.turn][square] & captures
+        one_step = square + forward
+        if not (occupied >> one_step) & 1:
+            targets |= 1 << one_step
+            if row == start_row and not (occupied >> (one_step + forward)) & 1:
+                targets |= 1 << (one_step + forward)
+        return targets
+
+    def get_all_figures(self):
+        for k, figure in enumerate(self.board):
+            x = k // 8
+            y = k % 8
+            yield x, y, figure
+
+    def get_all_legal_moves(self):
+        """
+        Returns all legal moves of the current position. The pseudo
+        legal moves are filtered with the checkers and the pinned
+        figures computed once for the position, only king moves and
+        en passant captures are tested square by square
+
+            Returns:
+
+                moves (array): see __get_all_legal_moves
+        """
+        moves = self.__get_all_legal_moves()
+        us, them = self.turn, 1 - self.turn
+        king_bitboard = self.bitboards[King.kind + 6 * us]
+        if not king_bitboard:
+            return moves
+        king = king_bitboard.bit_length() - 1
+        occupied = self.occupancy[0] | self.occupancy[1]
+
+        checkers = self.__get_attackers(king, them, occupied)
+        # the squares a figure other than the king has to move to, to get out of check
+        evasions = -1
+        if checkers:
+            checker = checkers.bit_length() - 1
+            evasions = 0 if checkers & (checkers - 1) else checkers | BETWEEN[king][checker]
+
+        # a figure pinned to the king can only move between the king and the pinning figure
+        pins = dict()
+        bitboards = self.bitboards
+        queens = bitboards[Queen.kind + 6 * them]
+        snipers = rook_attacks(king, self.occupancy[them]) & (bitboards[Rook.kind + 6 * them] | queens)
+        snipers |= bishop_attacks(king, self.occupancy[them]) & (bitboards[Bishop.kind + 6 * them] | queens)
+        while snipers:
+            low = snipers & -snipers
+            snipers ^= low
+            between = BETWEEN[king][low.bit_length() - 1]
+            blockers = between & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & self.occupancy[us]:
+                pins[blockers.bit_length() - 1] = between | low
+
+        occupied_without_king = occupied ^ king_bitboard
+        valid_moves = new_move_list()
+        for move in moves:
+            square = move & 63
+            target = move >> 6 & 63
+            if square == king:
+                if not self.__get_attackers(target, them, occupied_without_king):
+                    valid_moves.append(move)
+            elif move & FLAGS == EN_PASSANT:
+                # the captured pawn leaves the row too, which can uncover a check
+                self.play_move(move)
+                if not self.is_opponent_in_check():
+                    valid_moves.append(move)
+                self.unmake_move()
+            elif evasions & (1 << target) and (square not in pins or pins[square] >> target & 1):
+                valid_moves.append(move)
+        return valid_moves
+
     def __get_all_special_moves(self):
         """
         Returns special type of moves like castling or impassant
 
             Returns:
 
-                moves (list): list of two tuples each with two integers
+                moves (list): packed moves
         """
         moves = []
         # castling
@@ -200,39 +1207,44 @@ class ChessBoard:
 
             Returns:
 
-                moves (list): list of two tuples each with two integers
+                moves (list): packed moves
         """
         # check special moves
         moves = []
         if self.turn == Figure.Color.WHITE:
-            if str(self.get_piece_at((0, 4))) == "White King" and not self.get_piece_at((0, 4)).been_moved:
-                if str(self.get_piece_at((0, 0))) == "White Rook" and not self.get_piece_at((0, 0)).been_moved:
-                    if not any(self.get_piece_at((0, slice(1, 4)))):
-                        moves.append(((0, 4), (0, 2)))
-                if str(self.get_piece_at((0, 7))) == "White Rook" and not self.get_piece_at((0, 7)).been_moved:
-                    if not any(self.get_piece_at((0, slice(5, 7)))):
-                        moves.append(((0, 4), (0, 6)))
+            row, short, long = 0, WHITE_SHORT_CASTLING, WHITE_LONG_CASTLING
         else:
-            if str(self.get_piece_at((7, 4))) == "Black King" and not self.get_piece_at((7, 4)).been_moved:
-                if str(self.get_piece_at((7, 0))) == "Black Rook" and not self.get_piece_at((7, 0)).been_moved:
-                    if not any(self.get_piece_at((7, slice(1, 4)))):
-                        moves.append(((7, 4), (7, 2)))
-                if str(self.get_piece_at((7, 7))) == "Black Rook" and not self.get_piece_at((7, 7)).been_moved:
-                    if not any(self.get_piece_at((7, slice(5, 7)))):
-                        moves.append(((7, 4), (7, 6)))
+            row, short, long = 7, BLACK_SHORT_CASTLING, BLACK_LONG_CASTLING
+
+        first = row * 8
+        occupied = self.occupancy[0] | self.occupancy[1]
+        rooks = self.bitboards[Rook.kind + 6 * self.turn]
+        if not (self.bitboards[King.kind + 6 * self.turn] >> (first + 4)) & 1:
+            return moves
+        if not self.castling_rights & (short | long) or self.is_square_attacked(first + 4, 1 - self.turn):
+            return moves
+        # the king may not pass an attacked square, the destination is checked with the other moves
+        if (self.castling_rights & long and (rooks >> first) & 1 and not occupied & (0b1110 << first)
+                and not self.is_square_attacked(first + 3, 1 - self.turn)):
+            moves.append(first + 4 | (first + 2) << 6 | CASTLING)
+        if (self.castling_rights & short and (rooks >> (first + 7)) & 1 and not occupied & (0b1100000 << first)
+                and not self.is_square_attacked(first + 5, 1 - self.turn)):
+            moves.append(first + 4 | (first + 6) << 6 | CASTLING)
         return moves
 
-    def move(self, _from, to):
+    def move(self, _from, to, promotion="q"):
         """
         Move piece from "_from" coordinates to "to"
         """
         # print("moving")
         # check coordinate sanity
-        for coordinate in list(_from) + list(to):
-            if 0 > coordinate > 7:
+        for coordinate in tuple(_from) + tuple(to):
+            if not 0 <= coordinate <= 7:
                 raise InvalidMoveException()
 
-        figure = self.get_piece_at(_from)
+        fro = _from[0] * 8 + _from[1]
+        target = to[0] * 8 + to[1]
+        figure = self.board[fro]
 
         # figure is on right position
         if figure is None:
@@ -242,60 +1254,272 @@ class ChessBoard:
         if figure.color != self.turn:
             raise InvalidMoveException("Not your turn")
 
-        if str(figure) == "White King" and _from == (0, 4):
-            if to == (0, 2):
-                self.__apply_castling(figure, _from, to, "long")
-                return
-            if to == (0, 6):
-                self.__apply_castling(figure, _from, to, "short")
-                return
-        if str(figure) == "Black King" and _from == (7, 4):
-            if to == (7, 2):
-                self.__apply_castling(figure, _from, to, "long")
-                return
-            if to == (7, 6):
-                self.__apply_castling(figure, _from, to, "short")
-                return
+        if self.__get_castling_type(figure, fro, target) is not None:
+            self.make_move(_from, to)
+            return
 
         # check for pawn promotion
 
         if isinstance(figure, Pawn) and to[0] in (0, 7):
-            self.__apply_pawn_promotion(figure, _from, to, "q")
+            self.make_move(_from, to, promotion)
             return
 
-        # Change coordinates to vector
-        _from = Vector2(_from)
-        to = Vector2(to)
-        diff = to - _from
-
         # handle the path
-        for square in figure.path(_from, to):
+        for square in figure.path(fro, target):
 
             # if something stands in the path raise Exception
-            if self.get_piece_at(square) is not None:
+            if self.board[square] is not None:
                 raise InvalidMoveException()
 
-        # handle destination square
-        dest = self.get_piece_at(to)
+        # handle destination square, a pawn captures only diagonally
+        dest = self.board[target]
+        diagonal = fro & 7 != target & 7
         if dest is not None:
-            if dest.color == figure.color:
+            if dest.color == figure.color or (figure.kind == Pawn.kind and not diagonal):
                 raise InvalidMoveException()
-            else:
-                self.__kill(_from, to)
-        elif str(figure).endswith("Pawn") and (abs(diff.x) == abs(diff.y) == 1):
+        elif figure.kind == Pawn.kind and diagonal and tuple(to) != self.en_passant:
             raise InvalidMoveException()
+
+        self.make_move(tuple(_from), tuple(to))
+        # print(self.draw_board())
+
+    def make_move(self, _from, to, promotion="q"):
+        """
+        Plays the move on the board in place, without validating it,
+        see play_move
+
+            Parameters:
+
+                _from (tuple): tuple of two integers describing
+                from which place the piece is being moved
+
+                to (tuple): tuple of two integers describing to
+                which place the piece is being moved
+
+                promotion (str): "q", "r", "b" or "n", the figure
+                a pawn reaching the last row is promoted to
+        """
+        self.play_move(self.encode_move(_from, to, promotion))
+
+    def encode_move(self, _from, to, promotion="q"):
+        """
+        Returns the packed move (see libs.moves) of the figure standing
+        on _from to the square to, the kind of the move is decided by
+        the position
+
+            Parameters:
+
+                _from (tuple): tuple of two integers
+
+                to (tuple): tuple of two integers
+
+                promotion (str): "q", "r", "b" or "n", the figure
+                a pawn reaching the last row is promoted to
+
+            Returns:
+
+                move (int): the packed move
+        """
+        fro = _from[0] * 8 + _from[1]
+        target = to[0] * 8 + to[1]
+        figure = self.board[fro]
+        move = fro | target << 6
+        if figure is None:
+            return move
+        if self.__get_castling_type(figure, fro, target) is not None:
+            return move | CASTLING
+        if figure.kind == Pawn.kind and target >> 3 in (0, 7):
+            return move | PROMOTION | PROMOTION_LETTERS.index(promotion or "q") << 12
+        if figure.kind == Pawn.kind and tuple(to) == self.en_passant:
+            return move | EN_PASSANT
+        return move | NORMAL
+
+    def play_move(self, move):
+        """
+        Plays the packed move (see libs.moves) on the board in place,
+        without validating it, and pushes an undo entry so the move can
+        be taken back with unmake_move
+
+            Parameters:
+
+                move (int): packed move
+        """
+        fro = move & 63
+        target = move >> 6 & 63
+        flag = move & FLAGS
+        board = self.board
+        figure = board[fro]
+        captured = board[target]
+        if flag == EN_PASSANT:
+            captured = board[(fro >> 3) * 8 + (target & 7)]
+
+        self.undo_stack.append((move, figure, captured, self.castling_rights, self.en_passant, self.hash,
+                                self.halfmove_clock))
+        if captured is not None or figure.kind == Pawn.kind:
+            self.halfmove_clock = 0
         else:
-            self.__apply_move(figure, _from, to)
+            self.halfmove_clock += 1
+
+        self.hash ^= CASTLING_KEYS[self.castling_rights]
+        if self.en_passant is not None:
+            self.hash ^= EN_PASSANT_KEYS[self.en_passant[1]]
+            self.en_passant = None
 
-        if isinstance(figure, King):
-            if figure.color == Figure.Color.WHITE:
-                self.white_king_pos = to
+        if flag == CASTLING:
+            self.__apply_castling(figure, fro, target, "long" if target < fro else "short")
+        elif flag == PROMOTION:
+            self.__apply_pawn_promotion(figure, fro, target, PROMOTION_FIGURES[move >> 12 & 3])
+        else:
+            if flag == EN_PASSANT:
+                self.__set_square((fro >> 3) * 8 + (target & 7), None)
+                self.__apply_move(figure, fro, target)
+            elif captured is not None:
+                self.__kill(fro, target)
             else:
-                self.black_king_pos = to
+                self.__apply_move(figure, fro, target)
+
+            if figure.kind == Pawn.kind and abs(target - fro) == 16:
+                self.__set_en_passant(figure, fro, target)
+
+            # change turn
+            self.change_turn()
+
+        self.castling_rights &= CASTLING_MASKS[fro] & CASTLING_MASKS[target]
+        self.hash ^= CASTLING_KEYS[self.castling_rights]
+
+    def __set_en_passant(self, pawn, fro, to):
+        """
+        Remembers the square the pawn skipped with its double step,
+        if an opponent pawn stands next to it and could capture it
+        en passant
+
+            Parameters:
+
+                pawn (Figure): pawn that made the double step
+
+                fro (int): square index the pawn moved from
 
-        # change turn
+                to (int): square index the pawn moved to
+        """
+        square = (fro + to) // 2
+        if PAWN_ATTACKS[pawn.color][square] & self.bitboards[Pawn.kind + 6 * (1 - pawn.color)]:
+            self.en_passant = divmod(square, 8)
+            self.hash ^= EN_PASSANT_KEYS[to & 7]
+
+    def make_null_move(self):
+        """
+        Passes the turn to the opponent without moving, used by the
+        null move pruning. It is taken back with unmake_move. The
+        halfmove clock starts again, so no position before the null
+        move is taken for a repetition
+        """
+        self.undo_stack.append((None, None, None, self.castling_rights, self.en_passant, self.hash,
+                                self.halfmove_clock))
+        self.halfmove_clock = 0
+        if self.en_passant is not None:
+            self.hash ^= EN_PASSANT_KEYS[self.en_passant[1]]
+            self.en_passant = None
         self.change_turn()
-        # print(self.draw_board())
+
+    def unmake_move(self):
+        """
+        Takes back the last move played with play_move and restores
+        the captured figure (also one taken en passant), the castled
+        rook, the castling rights, the zobrist key and the halfmove clock
+        """
+        move, figure, captured, castling_rights, en_passant, key, self.halfmove_clock = self.undo_stack.pop()
+
+        self.change_turn()
+        if figure is None:
+            # null move
+            self.en_passant = en_passant
+            self.hash = key
+            return
+
+        fro = move & 63
+        to = move >> 6 & 63
+        flag = move & FLAGS
+        self.__set_square(fro, figure)
+        if flag == EN_PASSANT:
+            self.__set_square(to, None)
+            self.__set_square((fro >> 3) * 8 + (to & 7), captured)
+        else:
+            self.__set_square(to, captured)
+
+        # put the castled rook back
+        if flag == CASTLING:
+            if to < fro:
+                self.__set_square(fro - 4, self.board[fro - 1])
+                self.__set_square(fro - 1, None)
+            else:
+                self.__set_square(fro + 3, self.board[fro + 1])
+                self.__set_square(fro + 1, None)
+
+        self.castling_rights = castling_rights
+        self.en_passant = en_passant
+        self.hash = key
+
+    def is_draw(self, root_ply=None):
+        """
+        Returns true if the position is drawn by the fifty-move rule or
+        by a repetition. Only the positions since the last capture or
+        pawn move with the same player on turn can repeat. A position
+        repeated after the root of the search is a draw the first time,
+        as the search could repeat it again, a position of the game is
+        a draw the third time it is on the board
+
+            Parameters:
+
+                root_ply (int): number of moves played before the root
+                of the search, None to check the game only
+
+            Returns:
+
+                (bool)
+        """
+        # a mate given with the hundredth ply wins, the fifty-move rule does not apply
+        if self.halfmove_clock >= 100:
+            return bool(self.get_all_legal_moves()) or not self.is_player_in_check()
+        stack = self.undo_stack
+        key = self.hash
+        repetitions = 0
+        # the entries keep the key of the position before their move
+        for index in range(len(stack) - 4, max(len(stack) - self.halfmove_clock, 0) - 1, -2):
+            if stack[index][5] == key:
+                if root_ply is not None and index >= root_ply:
+                    return True
+                repetitions += 1
+                if repetitions == 2:
+                    return True
+        return False
+
+    def __get_castling_type(self, figure, fro, to):
+        """
+        Returns the type of castling the move describes
+
+            Parameters:
+
+                figure (Figure): figure that is being moved
+
+                fro (int): square index the figure moves from
+
+                to (int): square index the figure moves to
+
+            Returns:
+
+                (str): "long", "short" or None if the move is not
+                a castling
+        """
+        if figure.kind != King.kind:
+            return None
+        first = 0 if figure.color == Figure.Color.WHITE else 56
+        if fro != first + 4:
+            return None
+        if to == first + 2:
+            return "long"
+        if to == first + 6:
+            return "short"
+        return None
 
     def is_opponent_in_check(self):
         """
@@ -335,116 +1559,104 @@ class ChessBoard:
             my_color = Figure.Color.WHITE if self.turn == Figure.Color.BLACK else Figure.Color.BLACK
         else:
             my_color = self.turn
-        king_position = self.white_king_pos if my_color == Figure.Color.WHITE else self.black_king_pos
-        check = False
-
-        knight_vectors = [(1, 2), (-1, 2), (1, -2), (-1, -2), (2, 1), (-2, 1), (2, -1), (-2, -1)]
-        for vector in knight_vectors:
-            pos = king_position + Vector2(vector)
-            if (0 <= pos.x <= 7) and (0 <= pos.y <= 7):
-                fig = self.get_piece_at((pos.x, pos.y))
-                if isinstance(fig, Knight) and fig.color != my_color:
-                    return True
+        king = self.bitboards[King.kind + 6 * my_color]
 
-        for vector in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            vector = Vector2(vector)
-            for inc in range(1, 8):
-                pos = king_position + Vector2(vector * inc)
-                if (0 <= pos.x <= 7) and (0 <= pos.y <= 7):
-                    fig = self.get_piece_at((pos.x, pos.y))
-                    if fig != None and fig.color != my_color and type(fig) in [Queen, Bishop]:
-                        return True
-                    elif fig != None:
-                        break
-                else:
-                    break
+        # the king may have been captured by a pseudo legal move
+        if not king:
+            return False
+        return self.is_square_attacked(king.bit_length() - 1, 1 - my_color)
 
-        for vector in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-            vector = Vector2(vector)
-            for inc in range(1, 8):
-                pos = king_position + Vector2(vector * inc)
-                if (0 <= pos.x <= 7) and (0 <= pos.y <= 7):
-                    fig = self.get_piece_at((pos.x, pos.y))
-                    if fig != None and fig.color != my_color and type(fig) in [Queen, Rook]:
-                        return True
-                    elif fig != None:
-                        break
-                else:
-                    break
-        pawn_vectors = [(-1, 1), (-1, -1)] if my_color == Figure.Color.BLACK else [(1, 1), (1, -1)]
-
-        for vector in pawn_vectors:
-            vector = Vector2(vector)
-            pos = king_position + Vector2(vector)
-            if (0 <= pos.x <= 7) and (0 <= pos.y <= 7):
-                fig = self.get_piece_at((pos.x, pos.y))
-                if type(fig) == Pawn and fig.color != my_color:
-                    return True
+    def __get_attackers(self, square, color, occupied):
+        """
+        Returns the bitboard of the figures of the given color attacking
+        the square, the sliding figures are blocked by the occupied squares
+        """
+        bitboards = self.bitboards
+        offset = 6 * color
+        queens = bitboards[offset + Queen.kind]
+        return ((KNIGHT_ATTACKS[square] & bitboards[offset + Knight.kind])
+                | (PAWN_ATTACKS[1 - color][square] & bitboards[offset + Pawn.kind])
+                | (KING_ATTACKS[square] & bitboards[offset + King.kind])
+                | (bishop_attacks(square, occupied) & (bitboards[offset + Bishop.kind] | queens))
+                | (rook_attacks(square, occupied) & (bitboards[offset + Rook.kind] | queens)))
+
+    def is_square_attacked(self, square, color):
+        """
+        Returns true if any figure of the given color attacks the square
+
+            Parameters:
+
+                square (int): square index, row * 8 + column
+
+                color (Color): color of the attacking figures
 
-        return check
+            Returns:
 
-    def __apply_move(self, figure, _from, to):
+                attacked (bool)
+        """
+        bitboards = self.bitboards
+        offset = 6 * color
+        if KNIGHT_ATTACKS[square] & bitboards[offset + Knight.kind]:
+            return True
+        # a pawn attacks the square if it stands where a pawn of the other color would attack from it
+        if PAWN_ATTACKS[1 - color][square] & bitboards[offset + Pawn.kind]:
+            return True
+        if KING_ATTACKS[square] & bitboards[offset + King.kind]:
+            return True
+
+        occupied = self.occupancy[0] | self.occupancy[1]
+        queens = bitboards[offset + Queen.kind]
+        sliders = bitboards[offset + Bishop.kind] | queens
+        if sliders and bishop_attacks(square, occupied) & sliders:
+            return True
+        sliders = bitboards[offset + Rook.kind] | queens
+        if sliders and rook_attacks(square, occupied) & sliders:
+            return True
+        return False
+
+    def __apply_move(self, figure, fro, to):
         """
-        Makes the move on the board object and sets the been_moved
-        flag to true for a figure being moved
+        Makes the move on the board object
 
             Parameters:
 
                 figure (Figure): figure that needs to be moved
 
-                _from (tuple): tuple of two integers describing
-                from which place the piece is being moved
+                fro (int): square index the piece is being moved from
 
-                _to (tuple): tuple of two integers describing to
-                which place the piece is being moved
+                to (int): square index the piece is being moved to
         """
+        self.__set_square(fro, None)
+        self.__set_square(to, figure)
 
-        figure.been_moved = True
-        _from = Vector2(_from)
-        to = Vector2(to)
-
-        self.set_piece_at((_from.x, _from.y), None)
-        self.set_piece_at((to.x, to.y), figure)
-
-    def __apply_castling(self, figure, _from, to, type):
+    def __apply_castling(self, figure, fro, to, type):
         """
-        Makes the castling move on the board object and sets the
-        been_moved flag to true for a figure being moved
+        Makes the castling move on the board object
 
             Parameters:
 
                 figure (Figure): figure that needs to be moved
 
-                _from (tuple): tuple of two integers describing
-                from which place the piece is being moved
+                fro (int): square index the king is being moved from
 
-                _to (tuple): tuple of two integers describing to
-                which place the piece is being moved
+                to (int): square index the king is being moved to
 
                 type (str): "long" or "short" depending which type
                 of castling is being applied
         """
-        figure.been_moved = True
-        _from = Vector2(_from)
-        to = Vector2(to)
-
-        if figure.color == Figure.Color.WHITE:
-            self.white_king_pos = to
-        else:
-            self.black_king_pos = to
-
-        self.set_piece_at((_from.x, _from.y), None)
-        self.set_piece_at((to.x, to.y), figure)
+        self.__set_square(fro, None)
+        self.__set_square(to, figure)
 
+        # the rook stands 4 squares left or 3 squares right of the king
         if type == "long":
-            self.set_piece_at((_from.x, 3), self.get_piece_at((_from.x, 0)))
-            self.set_piece_at((_from.x, 0), None)
+            self.__set_square(fro - 1, self.board[fro - 4])
+            self.__set_square(fro - 4, None)
         if type == "short":
-            self.set_piece_at((_from.x, 5), self.get_piece_at((_from.x, 7)))
-            self.set_piece_at((_from.x, 7), None)
+            self.__set_square(fro + 1, self.board[fro + 3])
+            self.__set_square(fro + 3, None)
         self.change_turn()
 
-    def __apply_pawn_promotion(self, pawn, _from, to, figure):
+    def __apply_pawn_promotion(self, pawn, fro, to, figure_class):
         """
         Applies the promotion rule to the given pawn with
         the chosen figure
@@ -453,30 +1665,15 @@ class ChessBoard:
 
                 pawn (Figure): pawn that needs to be moved
 
-                _from (tuple): tuple of two integers describing
-                from which place the piece is being moved
+                fro (int): square index the pawn is being moved from
 
-                _to (tuple): tuple of two integers describing to
-                which place the piece is being moved
+                to (int): square index the pawn is being moved to
 
-                figure (figure): "long" or "short" depending which
-                type of castling is being applied
-        """
-        _from = Vector2(_from)
-        to = Vector2(to)
-
-        if figure == "q":
-            self.set_piece_at((_from.x, _from.y), None)
-            self.set_piece_at((to.x, to.y), Queen(pawn.color))
-        if figure == "b":
-            self.set_piece_at((_from.x, _from.y), None)
-            self.set_piece_at((to.x, to.y), Bishop(pawn.color))
-        if figure == "r":
-            self.set_piece_at((_from.x, _from.y), None)
-            self.set_piece_at((to.x, to.y), Rook(pawn.color))
-        if figure == "n":
-            self.set_piece_at((_from.x, _from.y), None)
-            self.set_piece_at((to.x, to.y), Knight(pawn.color))
+                figure_class (type): Queen, Rook, Bishop or Knight, the
+                figure the pawn is promoted to
+        """
+        self.__set_square(fro, None)
+        self.__set_square(to, figure_class(pawn.color))
         self.change_turn()
 
     def __kill(self, fro, to):
@@ -486,101 +1683,304 @@ class ChessBoard:
 
             Parameters:
 
-                fro (tuple): tuple of two integers -
-                coordinates of the killer
+                fro (int): square index of the killer
 
-                to (tuple): tuple of two integers -
-                coordinates of the killee
+                to (int): square index of the killee
         """
-        killer = self.get_piece_at((fro[0], fro[1]))
-        killee = self.get_piece_at((to[0], to[1]))
+        killer = self.board[fro]
+        killee = self.board[to]
 
         if killer is None or killee is None or killer.color == killee.color:
             raise RuntimeError()
 
-        self.set_piece_at((fro[0], fro[1]), None)
-        self.set_piece_at((to[0], to[1]), killer)
-
-        self.dead_figures.append(killee)
-
-    def maximize(self, alpha, beta, board, depth, original_board):
-        """
-       Returns the value of the maximum utility and
-       the corresponding move
-           Parameters:
-               alpha (float): maximizing functions best
-               utility value for the current depth or above
-               beta (float): minimizing functions best
-               utility value for the current depth or above
-               board (ChessBoard): board to be copied
-               depth (str): the depth limit for the
-               recursive call of the function
-               original_board (ChessBoard): the original Chessboard object
-           Returns:
-               maximum_utility (float): value of the
-               maximum utility generated
-               move_with_max_utility (tuple): tuple of
-               two tuples each with two integers describing the move
-        """
-        if depth == 0:
-            return board.evaluate_board(), None
-        maximum_utility = float('-inf')
-        move_with_max_utility = None
-        pos_moves = board.__get_all_legal_moves() if self.max_depth != depth else board.get_all_legal_moves()
-        for move in pos_moves:
-            cb = ChessBoard(board)
-            cb.move(move[0], move[1])
-            utility, mv = self.minimize(alpha, beta, cb, depth - 1, original_board)
-            if utility is not None:
-                if utility > maximum_utility:
-                    maximum_utility = utility
-                    move_with_max_utility = move
-                alpha = max(alpha, utility)
-                if alpha >= beta:
-                    return None, move_with_max_utility
-        if pos_moves == []:
-            return board.evaluate_board(), None
-        return maximum_utility, move_with_max_utility
+        self.__set_square(fro, None)
+        self.__set_square(to, killer)
 
-    def minimize(self, alpha, beta, board, depth, original_board):
+    def negamax(self, alpha, beta, depth):
         """
-        Returns the value of the minimum utility and
-        the corresponding move
+        Returns the utility of the position for the player on turn and
+        the best move, searched with principal variation search: the
+        first move gets the whole window, the other moves are only
+        proven to be worse with a zero window and searched again if
+        they are not
+
             Parameters:
-                alpha (float): maximizing functions best
-                utility value for the current depth or above
-                beta (float): minimizing functions best
-                utility value for the current depth or above
-                board (ChessBoard): board to be copied
-                depth (str): the depth limit for the
-                recursive call of the function
-                original_board (ChessBoard): the
-                original Chessboard object
+
+                alpha (float): utility the player on turn is already sure of
+
+                beta (float): utility the opponent is already sure of,
+                the position is cut off when it is reached
+
+                depth (int): remaining depth of the search
+
             Returns:
-                minimum_utility (float): value of the minimum utility
-                generated
-                move_with_min_utility (tuple): tuple of two
-                tuples each with two integers describing the move
-        """
-        if depth == 0:
-            return board.evaluate_board(), None
-        minimum_utility = float('inf')
-        move_with_min_utility = None
-        pos_moves = board.__get_all_legal_moves()
-        for move in pos_moves:
-            cb = ChessBoard(board)
-            cb.move(move[0], move[1])
-            utility, mv = self.maximize(alpha, beta, cb, depth - 1, original_board)
-            if utility is not None:
-                if utility < minimum_utility:
-                    minimum_utility = utility
-                    move_with_min_utility = move
-                beta = min(beta, utility)
+
+                utility (float): value of the best move for the player
+                on turn, fail-soft outside of the window
+
+                best_move (int): packed move, see libs.moves
+        """
+        self.__count_node()
+        if depth <= 0:
+            return self.quiescence(alpha, beta), None
+        alpha_original, beta_original = alpha, beta
+        # the reductions lower the depth without playing a move, the ply is counted on the board
+        ply = len(self.undo_stack) - self.root_ply
+        pv = self.pv_table[ply]
+        del pv[:]
+        # a repeated position is not searched again
+        if self.halfmove_clock >= 4 and depth != self.search_depth and self.is_draw(self.root_ply):
+            return 0, None
+        if depth != self.search_depth:
+            entry = self.transposition_table.probe(self.hash)
+            if entry is not None and entry[1] >= depth:
+                alpha, beta, utility = self.__apply_table_entry(entry, alpha, beta)
+                if utility is not None:
+                    return utility, entry[4]
+            if self.tablebases is not None and self.tablebases.can_probe(self):
+                result = self.tablebases.probe(self)
+                if result is not None:
+                    return self.__get_tablebase_utility(result), None
+            hash_move = entry[4] if entry is not None else None
+            pos_moves = self.__pick_moves(hash_move, ply)
+        else:
+            # the best move of the previous iteration is searched first
+            pos_moves = self.__order_moves(self.get_all_legal_moves(), self.best_move, ply)
+            if not pos_moves:
+                return self.__get_utility_without_moves(ply), None
+
+        # null move pruning, if the position is still too good after passing the turn it is cut off
+        if beta != float('inf') and self.__can_make_null_move(depth):
+            self.make_null_move()
+            utility = -self.negamax(-beta, 1 - beta, depth - 1 - NULL_MOVE_REDUCTION)[0]
+            self.unmake_move()
+            if utility >= beta:
+                return utility, None
+
+        best_utility = float('-inf')
+        best_move = None
+        cutoff = False
+        searched = 0
+        in_check = self.late_move_reductions and self.is_player_in_check()
+        for searched, move in enumerate(pos_moves, 1):
+            if not ply and self.display_current_move and self.send_info is not None \
+                    and self.time_manager.elapsed() >= INFO_INTERVAL:
+                self.send_info(format_info(depth, currmove=move, currmovenumber=searched))
+            if searched == 1:
+                self.play_move(move)
+                utility = -self.negamax(-beta, -alpha, depth - 1)[0]
+            else:
+                reduction = self.__get_reduction(move, depth, searched, in_check)
+                self.play_move(move)
+                if reduction and self.is_player_in_check():
+                    reduction = 0
+                utility = -self.negamax(-alpha - 1, -alpha, depth - 1 - reduction)[0]
+                # a reduced move that beats alpha is searched again to the full depth
+                if reduction and utility > alpha:
+                    utility = -self.negamax(-alpha - 1, -alpha, depth - 1)[0]
+                if alpha < utility < beta:
+                    utility = -self.negamax(-beta, -alpha, depth - 1)[0]
+            self.unmake_move()
+            if utility > best_utility:
+                best_utility = utility
+                best_move = move
+            if utility > alpha:
+                alpha = utility
+                # the principal variation of the child follows the move
+                del pv[:]
+                pv.append(move)
+                if depth > 1:
+                    pv.extend(self.pv_table[ply + 1])
                 if alpha >= beta:
-                    return None, move_with_min_utility
-        if pos_moves == []:
-            return board.evaluate_board(), None
-        return minimum_utility, move_with_min_utility
+                    cutoff = True
+                    break
+                if not ply and searched > 1 and self.display_pv_tips:
+                    self.__send_pv(depth, utility)
+        # every pseudo legal move lost the king, without a legal move it is a mate or a stalemate
+        if (best_move is None or best_utility < -TABLEBASE_WIN) and self.bitboards[King.kind + 6 * self.turn] \
+                and not self.get_all_legal_moves():
+            return self.__get_utility_without_moves(ply), None
+        if best_move is None:
+            return self.__evaluate_for_turn(), None
+
+        # moves of the stages that were not generated are not counted
+        if isinstance(pos_moves, list):
+            move_count = len(pos_moves)
+        else:
+            move_count = max(searched, len(self.move_lists[ply]) + len(self.quiet_move_lists[ply]))
+        self.number_possible_moves += move_count
+        if cutoff:
+            self.__record_cutoff(best_move, depth, ply, searched, move_count)
+        self.__store_table_entry(depth, best_utility, best_move, alpha_original, beta_original)
+        return best_utility, best_move
+
+    def __get_utility_without_moves(self, ply):
+        """
+        Returns the utility of a position without legal moves for the
+        player on turn, a mate is lost, the sooner the worse, and a
+        stalemate is a draw
+
+            Parameters:
+
+                ply (int): distance of the position from the root
+
+            Returns:
+
+                (int): utility of the position
+        """
+        return ply - CHECKMATE if self.is_player_in_check() else 0
+
+    def __evaluate_for_turn(self):
+        """Returns evaluate_board from the point of view of the player on turn"""
+        return self.evaluate_board() if self.turn == Figure.Color.BLACK else -self.evaluate_board()
+
+    def __can_make_null_move(self, depth):
+        """
+        Returns true if the null move may be tried in the position. It
+        is not tried in check, after another null move and without
+        figures other than pawns and the king, where passing the turn
+        could be better than any move (zugzwang)
+        """
+        if not self.null_move_pruning or depth <= NULL_MOVE_REDUCTION or depth == self.search_depth:
+            return False
+        if self.undo_stack and self.undo_stack[-1][1] is None:
+            return False
+        offset = 6 * self.turn
+        if not (self.bitboards[offset + Knight.kind] | self.bitboards[offset + Bishop.kind]
+                | self.bitboards[offset + Rook.kind] | self.bitboards[offset + Queen.kind]):
+            return False
+        return not self.is_player_in_check()
+
+    def __get_reduction(self, move, depth, searched, in_check):
+        """
+        Returns the number of plies the move is searched shallower,
+        late quiet moves that do not give check are reduced by one
+
+            Parameters:
+
+                move (int): move to be searched, not played yet
+
+                depth (int): remaining depth of the position
+
+                searched (int): number of the move in the ordered moves
+
+                in_check (bool): true if the player on turn is in check
+
+            Returns:
+
+                (int): 0 or 1
+        """
+        if not self.late_move_reductions or in_check or depth < REDUCTION_DEPTH or searched <= LATE_MOVE_COUNT:
+            return 0
+        if move & FLAGS in (PROMOTION, EN_PASSANT) or self.board[move >> 6 & 63] is not None:
+            return 0
+        return 1
+
+    def quiescence(self, alpha, beta):
+        """
+        Returns the utility of the position for the player on turn
+        searching only the captures and promotions, so a leaf of the
+        search is never evaluated in the middle of an exchange. The
+        player may also stand pat and keep the evaluation of the position
+
+            Parameters:
+
+                alpha (float): utility the player on turn is already sure of
+
+                beta (float): utility the opponent is already sure of
+
+            Returns:
+
+                utility (float): value of the position, fail-soft
+        """
+        self.__count_node()
+        stand_pat = self.__evaluate_for_turn()
+        if stand_pat >= beta:
+            return stand_pat
+        best_utility = stand_pat
+        alpha = max(alpha, stand_pat)
+        for value, move in self.__get_ordered_captures():
+            # delta pruning, even winning the figure does not reach alpha
+            if stand_pat + value + DELTA_MARGIN <= alpha:
+                break
+            self.play_move(move)
+            utility = -self.quiescence(-beta, -alpha)
+            self.unmake_move()
+            if utility > best_utility:
+                best_utility = utility
+                if utility > alpha:
+                    alpha = utility
+                    if alpha >= beta:
+                        break
+        return best_utility
+
+    def __get_ordered_captures(self):
+        """
+        Returns the captures and promotions of the position with the
+        material they win, the most valuable victim first and the
+        least valuable attacker first among equal victims
+
+            Returns:
+
+                captures (list): tuples of the material won and the move
+        """
+        board = self.board
+        captures = []
+        for move in self.__get_all_legal_moves(captures_only=True):
+            attacker = board[move & 63].kind
+            captured = board[move >> 6 & 63]
+            victim = captured.kind if captured is not None else Pawn.kind
+            promotion = move & FLAGS == PROMOTION
+            value = FIGURE_VALUES[victim] if captured is not None or not promotion else 0
+            if promotion:
+                value += FIGURE_VALUES[Queen.kind] - FIGURE_VALUES[Pawn.kind]
+            captures.append((value * 8 + 5 - attacker, value, move))
+        captures.sort(reverse=True)
+        return [(value, move) for order, value, move in captures]
+
+    def __apply_table_entry(self, entry, alpha, beta):
+        """
+        Narrows the alpha-beta window with the score stored in the
+        transposition table
+
+            Parameters:
+
+                entry (tuple): entry of the transposition table
+
+                alpha (float): utility the player on turn is already sure of
+
+                beta (float): utility the opponent is already sure of
+
+            Returns:
+
+                alpha (float), beta (float), utility (float): the new
+                window and the utility of the position if the stored
+                score is enough to end the search of the position,
+                else None
+        """
+        bound, utility = entry[2], entry[3]
+        if bound == TranspositionTable.EXACT:
+            return alpha, beta, utility
+        if bound == TranspositionTable.LOWER:
+            alpha = max(alpha, utility)
+        else:
+            beta = min(beta, utility)
+        if alpha >= beta:
+            return alpha, beta, utility
+        return alpha, beta, None
+
+    def __store_table_entry(self, depth, utility, move, alpha, beta):
+        """
+        Stores the searched utility of the position in the transposition
+        table, bounded by the alpha-beta window it was searched with
+        """
+        if utility <= alpha:
+            bound = TranspositionTable.UPPER
+        elif utility >= beta:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.transposition_table.store(self.hash, depth, bound, utility, move)
 
     def evaluate_board(self):
         """
@@ -588,29 +1988,35 @@ class ChessBoard:
         using simple shannon function
 
         to evaluate relative value of the board - the material
-        part plus the positional values
+        part plus the positional values. The value is updated with
+        every change of the board, so this is only a lookup
 
             Returns:
 
                 (int): value of the evaluated board
         """
-        figure_count = self.get_figure_count()
-        position_value = 20000 * (figure_count.get("White King", 0) - figure_count.get("Black King", 0)) + 900 * (
-                figure_count.get("White Queen", 0) - figure_count.get("Black Queen", 0)) + 500 * (
-                                 figure_count.get("White Rook", 0) - figure_count.get("Black Rook", 0)) + 330 * (
-                                 figure_count.get("White Knight", 0) - figure_count.get("Black Knight", 0) +
-                                 figure_count.get("White Bishop", 0) - figure_count.get("Black Bishop", 0)) + 100 * (
-                                 figure_count.get("White Pawn", 0) - figure_count.get("Black Pawn", 0))
-        position_value *= -1
-        white_st_sum = 0
-        black_st_sum = 0
-        for x, y, figure in self.get_all_figures():
-            if figure is not None:
-                if figure.color:
-                    black_st_sum += figure.get_square_table()[x][y]
-                else:
-                    white_st_sum += figure.get_square_table()[x][y]
-        return (position_value + black_st_sum - white_st_sum)
+        if self.debug_evaluation and self.evaluation != self.compute_evaluation():
+            raise RuntimeError("Updated evaluation %d differs from the computed evaluation %d"
+                               % (self.evaluation, self.compute_evaluation()))
+        return self.evaluation
+
+    def compute_evaluation(self):
+        """
+        Computes the value of evaluate_board from scratch, walking
+        the figures of every bitboard
+
+            Returns:
+
+                (int): value of the evaluated board
+        """
+        evaluation = 0
+        for index, bitboard in enumerate(self.bitboards):
+            evaluation_table = EVALUATION_TABLES[index]
+            while bitboard:
+                low = bitboard & -bitboard
+                bitboard ^= low
+                evaluation += evaluation_table[low.bit_length() - 1]
+        return evaluation
 
     def get_figure_count(self):
         """
@@ -635,3 +2041,4 @@ class ChessBoard:
     def change_turn(self):
         """Flips the turn attribute (when the current player makes the move)"""
         self.turn = Figure.Color.WHITE if self.turn == Figure.Color.BLACK else Figure.Color.BLACK
+        self.hash ^= TURN_KEY
@@ -1,3 +1,6 @@
+from libs.exceptions import InvalidOptionException
+
+
 class EngineOptions:
     """
         This is a class containing the information about the Engine
@@ -23,7 +26,7 @@ class EngineOptions:
         self.id = "AIEngline"
         self.name = "Ika$Shota Engine"
         self.allOptions = {"Hash": {"type": "spin", "min": "1", "max": "4096", "default": "32", "value": "32"},
-                           "Max CPUs": {"type": "spin", "min": "1", "max": "2048", "default": "2048", "value": "2048"},
+                           "Max CPUs": {"type": "spin", "min": "1", "max": "2048", "default": "1", "value": "1"},
                            "Display PV Tips": {"type": "check", "default": "false", "value": "false"},
                            "CPU Usage": {"type": "spin", "min": "1", "max": "100", "default": "100", "value": "100"},
                            "Win Percentage to Hash Usage": {"type": "check", "default": "false", "value": "false"},
@@ -31,23 +34,79 @@ class EngineOptions:
                            "NalimovPath": {"type": "string", "default": "<empty>", "value": "<empty>"},
                            "NalimovCache": {"type": "spin", "min": "1", "max": "256", "default": "1", "value": "1"},
                            "Ponder": {"type": "check", "default": "true", "value": "true"},
-                           "UCI_AnalyseMode": {"type": "check", "default": "false", "value": "false"}}
+                           "UCI_AnalyseMode": {"type": "check", "default": "false", "value": "false"},
+                           "Null Move Pruning": {"type": "check", "default": "true", "value": "true"},
+                           "Late Move Reductions": {"type": "check", "default": "true", "value": "true"},
+                           "Book File": {"type": "string", "default": "<empty>", "value": "<empty>"},
+                           "Best Book Move": {"type": "check", "default": "false", "value": "false"},
+                           "Book Max Ply": {"type": "spin", "min": "0", "max": "1000", "default": "30",
+                                            "value": "30"},
+                           "Analysis Cache": {"type": "string", "default": "<empty>", "value": "<empty>"},
+                           "Analysis Cache Size": {"type": "spin", "min": "1000", "max": "100000000",
+                                                   "default": "1000000", "value": "1000000"}}
+
+    def send_available_options(self, send=print):
+        """
+        Sends available options to the Arena GUI one by one
+
+            Parameters:
 
-    def send_available_options(self):
-        """Sends available options to the Arena GUI one by one """
+                send (function): sends one line to the GUI
+        """
         for name, options in self.allOptions.items():
             ops = ""
             for key, value in options.items():
                 ops += " " + key + " " + value
-            print("option name " + name + ops)
+            send("option name " + name + ops)
 
     def set_option(self, option):
         """
-        Set option of the engine
+        Set option of the engine. A spin value outside of the range of
+        the option is set to the nearest bound
 
             Parameters:
 
                 option (str): option name and value
+
+            Returns:
+
+                (str): name of the option, None if its value did not change
+
+            Raises:
+
+                InvalidOptionException: the option is unknown or the
+                value is not valid for the type of the option
+        """
+        # the value can contain spaces, for example a path
+        name, separator, value = option.partition(" value ")
+        optionName = " ".join(name.split()[2:])
+        if optionName not in self.allOptions:
+            raise InvalidOptionException("unknown option " + optionName)
+        settings = self.allOptions[optionName]
+        value = value.strip()
+        if settings["type"] == "spin":
+            try:
+                number = int(value)
+            except ValueError:
+                raise InvalidOptionException("%s is not a number: %s" % (optionName, value))
+            value = str(min(max(number, int(settings["min"])), int(settings["max"])))
+        elif settings["type"] == "check" and value not in ("true", "false"):
+            raise InvalidOptionException("%s is not true or false: %s" % (optionName, value))
+        if settings["value"] == value:
+            return None
+        settings["value"] = value
+        return optionName
+
+    def get_value(self, name):
+        """
+        Returns the current value of the option
+
+            Parameters:
+
+                name (str): option name
+
+            Returns:
+
+                (str): value of the option
         """
-        optionName = " ".join(option.split()[2:-2])
-        self.allOptions[optionName]["value"] = option.split()[-1]
+        return self.allOptions[name]["value"]
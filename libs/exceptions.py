@@ -9,4 +9,20 @@ class CheckMateException(AIChess):
     pass
 
 class StalemateException(AIChess):
-    pass
\ No newline at end of file
+    pass
+
+
+class SearchStoppedException(AIChess):
+    pass
+
+
+class InvalidFenException(AIChess):
+    pass
+
+
+class InvalidBookException(AIChess):
+    pass
+
+
+class InvalidOptionException(AIChess):
+    pass
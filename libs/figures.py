@@ -1,3 +1,4 @@
+from libs.bitboard import DIRECTIONS, KING_ATTACKS, KNIGHT_ATTACKS
 from libs.exceptions import InvalidMoveException
 
 
@@ -6,23 +7,42 @@ class Figure:
         This is a class for figures on the board. It stores the color of the figure
         and returns its possible moves and paths it needs to take.
 
+        There is only one immutable figure of every kind and color, creating
+        a figure returns it, so the boards can share the figures. Whether a
+        figure has moved is kept by the board, in its castling rights.
+
         Attributes:
 
             color (Color): if white it is 0, else it is 1.
 
-            been_moved (bool): True if figure has been moved before, else False
+            index (int): index of the figure kind and color, from 0 to 11,
+            used for hashing the figure positions
+
+        Class attributes:
 
-            square_table_reversed (list): list of integer lists (reversed)
+            square_table (list): list of integer lists, positional values
+            for every square of the board as seen by black
+
+            square_values (tuple): for every color the positional values
+            flattened to 64 entries, indexed by row * 8 + column
 
         """
 
+    __slots__ = ("color", "index")
+
     class Color:
         WHITE = 0
         BLACK = 1
 
-    def __init__(self, color):
+    # position of the figure class in Pawn, Knight, Bishop, Rook, Queen, King
+    kind = None
+
+    # the only figure of every class and color
+    _instances = dict()
+
+    def __new__(cls, color):
         """
-        Constructs a figure with give color
+        Returns the figure of the class with the given color
 
         Parameters
         ----------
@@ -31,9 +51,20 @@ class Figure:
 
                 color of the figure
         """
-        self.color = color
-        self.been_moved = False
-        self.square_table_reversed = self.square_table[::-1]
+        figure = Figure._instances.get((cls, color))
+        if figure is None:
+            figure = super().__new__(cls)
+            object.__setattr__(figure, "color", color)
+            object.__setattr__(figure, "index", cls.kind + 6 * color)
+            Figure._instances[(cls, color)] = figure
+        return figure
+
+    def __setattr__(self, name, value):
+        raise AttributeError("figures are immutable")
+
+    def __reduce__(self):
+        """Unpickles to the figure of the process"""
+        return self.__class__, (self.color,)
 
     def __str__(self):
         """
@@ -57,32 +88,21 @@ class Figure:
 
         """
         if self.color == Figure.Color.WHITE:
-            return self.square_table_reversed
+            return self.square_table[::-1]
         return self.square_table
 
     def _return_path(self, fro, to):
         """
         Returns a list of squares on the board that a figure needs to pass
-        to get to its destination
+        to get to its destination on the same rank, file or diagonal
 
             Returns:
 
-                path (list): list of tuples of two integers
+                path (list): list of square indexes, row * 8 + column
 
         """
-        diff = to - fro
-
-        # abs to make sure we don't change the sign
-        normal_vector = diff // max(abs(diff.x), abs(diff.y))
-
-        path = []
-        fro += normal_vector
-
-        while fro != to:
-            path.append(fro)
-            fro += normal_vector
-
-        return path
+        step = DIRECTIONS[fro][to]
+        return list(range(fro + step, to, step))
 
     def path(self, fro, to):
         raise NotImplementedError()
@@ -144,16 +164,18 @@ class Pawn(Figure):
            of the board for the evaluation algorithm
     """
 
-    def __init__(self, color):
-        self.square_table = [[0, 0, 0, 0, 0, 0, 0, 0],
-                             [50, 50, 50, 50, 50, 50, 50, 50],
-                             [10, 10, 20, 30, 30, 20, 10, 10],
-                             [5, 5, 10, 25, 25, 10, 5, 5],
-                             [0, 0, 0, 20, 20, 0, 0, 0],
-                             [5, -5, -10, 0, 0, -10, -5, 5],
-                             [5, 10, 10, -20, -20, 10, 10, 5],
-                             [0, 0, 0, 0, 0, 0, 0, 0]]
-        super().__init__(color)
+    __slots__ = ()
+
+    kind = 0
+
+    square_table = [[0, 0, 0, 0, 0, 0, 0, 0],
+                    [50, 50, 50, 50, 50, 50, 50, 50],
+                    [10, 10, 20, 30, 30, 20, 10, 10],
+                    [5, 5, 10, 25, 25, 10, 5, 5],
+                    [0, 0, 0, 20, 20, 0, 0, 0],
+                    [5, -5, -10, 0, 0, -10, -5, 5],
+                    [5, 10, 10, -20, -20, 10, 10, 5],
+                    [0, 0, 0, 0, 0, 0, 0, 0]]
 
     def get_all_moves(self, pos):
         """
@@ -192,9 +214,9 @@ class Pawn(Figure):
 
             Returns:
 
-                (list): list of tuples containing two integers describing the path
+                (list): list of square indexes, row * 8 + column
         """
-        diff = to - fro
+        diff = ((to >> 3) - (fro >> 3), (to & 7) - (fro & 7))
 
         if self.color == Figure.Color.WHITE:
             valid_moves = ((1, 0), (2, 0), (1, 1), (1, -1))
@@ -202,18 +224,18 @@ class Pawn(Figure):
         else:
             valid_moves = ((-1, 0), (-2, 0), (-1, 1), (-1, -1))
 
-        if tuple(diff) not in valid_moves:
+        if diff not in valid_moves:
             raise InvalidMoveException()
 
         if diff == (2, 0) or diff == (-2, 0):
             # check the inital positions if pawn moves over two squares
-            if self.color == Figure.Color.WHITE and fro.x != 1:
+            if self.color == Figure.Color.WHITE and fro >> 3 != 1:
                 raise InvalidMoveException()
 
-            elif self.color == Figure.Color.BLACK and fro.x != 6:
+            elif self.color == Figure.Color.BLACK and fro >> 3 != 6:
                 raise InvalidMoveException()
 
-            return [fro + (diff // 2)]
+            return [(fro + to) // 2]
         # else there is no square in the path
         return []
 
@@ -231,16 +253,18 @@ class Knight(Figure):
            of the board for the evaluation algorithm
     """
 
-    def __init__(self, color):
-        self.square_table = [[-50, -40, -30, -30, -30, -30, -40, -50],
-                             [-40, -20, 0, 0, 0, 0, -20, -40],
-                             [-30, 0, 10, 15, 15, 10, 0, -30],
-                             [-30, 5, 15, 20, 20, 15, 5, -30],
-                             [-30, 0, 15, 20, 20, 15, 0, -30],
-                             [-30, 5, 10, 15, 15, 10, 5, -30],
-                             [-40, -20, 0, 5, 5, 0, -20, -40],
-                             [-50, -40, -30, -30, -30, -30, -40, -50]]
-        super().__init__(color)
+    __slots__ = ()
+
+    kind = 1
+
+    square_table = [[-50, -40, -30, -30, -30, -30, -40, -50],
+                    [-40, -20, 0, 0, 0, 0, -20, -40],
+                    [-30, 0, 10, 15, 15, 10, 0, -30],
+                    [-30, 5, 15, 20, 20, 15, 5, -30],
+                    [-30, 0, 15, 20, 20, 15, 0, -30],
+                    [-30, 5, 10, 15, 15, 10, 5, -30],
+                    [-40, -20, 0, 5, 5, 0, -20, -40],
+                    [-50, -40, -30, -30, -30, -30, -40, -50]]
 
     def get_all_moves(self, pos):
         """
@@ -260,11 +284,9 @@ class Knight(Figure):
 
             Returns:
 
-                (list): list of tuples containing two integers describing the path
+                (list): list of square indexes, row * 8 + column
         """
-        abs_diff = abs(fro - to)
-
-        if abs_diff != (2, 1) and abs_diff != (1, 2):
+        if not KNIGHT_ATTACKS[fro] >> to & 1:
             raise InvalidMoveException()
 
         return []
@@ -283,16 +305,18 @@ class Bishop(Figure):
            of the board for the evaluation algorithm
     """
 
-    def __init__(self, color):
-        self.square_table = [[-20, -10, -10, -10, -10, -10, -10, -20],
-                             [-10, 0, 0, 0, 0, 0, 0, -10],
-                             [-10, 0, 5, 10, 10, 5, 0, -10],
-                             [-10, 5, 5, 10, 10, 5, 5, -10],
-                             [-10, 0, 10, 10, 10, 10, 0, -10],
-                             [-10, 10, 10, 10, 10, 10, 10, -10],
-                             [-10, 5, 0, 0, 0, 0, 5, -10],
-                             [-20, -10, -10, -10, -10, -10, -10, -20]]
-        super().__init__(color)
+    __slots__ = ()
+
+    kind = 2
+
+    square_table = [[-20, -10, -10, -10, -10, -10, -10, -20],
+                    [-10, 0, 0, 0, 0, 0, 0, -10],
+                    [-10, 0, 5, 10, 10, 5, 0, -10],
+                    [-10, 5, 5, 10, 10, 5, 5, -10],
+                    [-10, 0, 10, 10, 10, 10, 0, -10],
+                    [-10, 10, 10, 10, 10, 10, 10, -10],
+                    [-10, 5, 0, 0, 0, 0, 5, -10],
+                    [-20, -10, -10, -10, -10, -10, -10, -20]]
 
     def get_all_moves(self, pos):
         """
@@ -311,13 +335,10 @@ class Bishop(Figure):
 
             Returns:
 
-                (list): list of tuples containing two integers describing the path
+                (list): list of square indexes, row * 8 + column
         """
-        diff = to - fro
-
-        # if absolute values of diff don't equal  each other
-        # it's not a valid bishop move.
-        if abs(diff.x) != abs(diff.y):
+        # one step on a diagonal changes the square by 7 or 9
+        if abs(DIRECTIONS[fro][to]) not in (7, 9):
             raise InvalidMoveException()
 
         return self._return_path(fro, to)
@@ -336,16 +357,18 @@ class Rook(Figure):
            of the board for the evaluation algorithm
     """
 
-    def __init__(self, color):
-        self.square_table = [[0, 0, 0, 0, 0, 0, 0, 0],
-                             [5, 10, 10, 10, 10, 10, 10, 5],
-                             [-5, 0, 0, 0, 0, 0, 0, -5],
-                             [-5, 0, 0, 0, 0, 0, 0, -5],
-                             [-5, 0, 0, 0, 0, 0, 0, -5],
-                             [-5, 0, 0, 0, 0, 0, 0, -5],
-                             [-5, 0, 0, 0, 0, 0, 0, -5],
-                             [0, 0, 0, 5, 5, 0, 0, 0]]
-        super().__init__(color)
+    __slots__ = ()
+
+    kind = 3
+
+    square_table = [[0, 0, 0, 0, 0, 0, 0, 0],
+                    [5, 10, 10, 10, 10, 10, 10, 5],
+                    [-5, 0, 0, 0, 0, 0, 0, -5],
+                    [-5, 0, 0, 0, 0, 0, 0, -5],
+                    [-5, 0, 0, 0, 0, 0, 0, -5],
+                    [-5, 0, 0, 0, 0, 0, 0, -5],
+                    [-5, 0, 0, 0, 0, 0, 0, -5],
+                    [0, 0, 0, 5, 5, 0, 0, 0]]
 
     def get_all_moves(self, pos):
         """
@@ -364,13 +387,10 @@ class Rook(Figure):
 
             Returns:
 
-                (list): list of tuples containing two integers describing the path
+                (list): list of square indexes, row * 8 + column
         """
-        diff = to - fro
-
-        # if absolute values of diff equal each other
-        # it's a valid move for bishop
-        if 0 not in diff:
+        # one step on a rank or file changes the square by 1 or 8
+        if abs(DIRECTIONS[fro][to]) not in (1, 8):
             raise InvalidMoveException()
 
         return self._return_path(fro, to)
@@ -389,16 +409,18 @@ class Queen(Figure):
            of the board for the evaluation algorithm
     """
 
-    def __init__(self, color):
-        self.square_table = [[-20, -10, -10, -5, -5, -10, -10, -20],
-                             [-10, 0, 0, 0, 0, 0, 0, -10],
-                             [-10, 0, 5, 5, 5, 5, 0, -10],
-                             [-5, 0, 5, 5, 5, 5, 0, -5],
-                             [0, 0, 5, 5, 5, 5, 0, -5],
-                             [-10, 5, 5, 5, 5, 5, 0, -10],
-                             [-10, 0, 5, 0, 0, 0, 0, -10],
-                             [-20, -10, -10, -5, -5, -10, -10, -20]]
-        super().__init__(color)
+    __slots__ = ()
+
+    kind = 4
+
+    square_table = [[-20, -10, -10, -5, -5, -10, -10, -20],
+                    [-10, 0, 0, 0, 0, 0, 0, -10],
+                    [-10, 0, 5, 5, 5, 5, 0, -10],
+                    [-5, 0, 5, 5, 5, 5, 0, -5],
+                    [0, 0, 5, 5, 5, 5, 0, -5],
+                    [-10, 5, 5, 5, 5, 5, 0, -10],
+                    [-10, 0, 5, 0, 0, 0, 0, -10],
+                    [-20, -10, -10, -5, -5, -10, -10, -20]]
 
     def get_all_moves(self, pos):
         """
@@ -417,12 +439,10 @@ class Queen(Figure):
 
             Returns:
 
-                (list): list of tuples containing two integers describing the path
+                (list): list of square indexes, row * 8 + column
         """
-        diff = to - fro
-
         # check for diagonal and (horizontal,vertical)
-        if abs(diff.x) != abs(diff.y) and 0 not in diff:
+        if not DIRECTIONS[fro][to]:
             raise InvalidMoveException()
 
         return self._return_path(fro, to)
@@ -441,16 +461,18 @@ class King(Figure):
            of the board for the evaluation algorithm
     """
 
-    def __init__(self, color):
-        self.square_table = [[-30, -40, -40, -50, -50, -40, -40, -30],
-                             [-30, -40, -40, -50, -50, -40, -40, -30],
-                             [-30, -40, -40, -50, -50, -40, -40, -30],
-                             [-30, -40, -40, -50, -50, -40, -40, -30],
-                             [-20, -30, -30, -40, -40, -30, -30, -20],
-                             [-10, -20, -20, -20, -20, -20, -20, -10],
-                             [20, 20, 0, 0, 0, 0, 20, 20],
-                             [20, 30, 10, 0, 0, 10, 30, 20]]
-        super().__init__(color)
+    __slots__ = ()
+
+    kind = 5
+
+    square_table = [[-30, -40, -40, -50, -50, -40, -40, -30],
+                    [-30, -40, -40, -50, -50, -40, -40, -30],
+                    [-30, -40, -40, -50, -50, -40, -40, -30],
+                    [-30, -40, -40, -50, -50, -40, -40, -30],
+                    [-20, -30, -30, -40, -40, -30, -30, -20],
+                    [-10, -20, -20, -20, -20, -20, -20, -10],
+                    [20, 20, 0, 0, 0, 0, 20, 20],
+                    [20, 30, 10, 0, 0, 10, 30, 20]]
 
     def get_all_moves(self, pos):
         """
@@ -469,11 +491,14 @@ class King(Figure):
 
             Returns:
 
-                (list): list of tuples containing two integers describing the path
+                (list): list of square indexes, row * 8 + column
         """
-        abs_diff = abs(to - fro)
-
-        if abs_diff != (1, 1) and abs_diff != (1, 0) and abs_diff != (0, 1):
+        if not KING_ATTACKS[fro] >> to & 1:
             raise InvalidMoveException()
 
         return []
+
+
+for _figure_class in (Pawn, Knight, Bishop, Rook, Queen, King):
+    _figure_class.square_values = (tuple(value for row in _figure_class.square_table[::-1] for value in row),
+                                   tuple(value for row in _figure_class.square_table for value in row))
@@ -0,0 +1,103 @@
+# Moves are packed into 16 bit integers, so the search keeps them in
+# arrays of unsigned shorts instead of nested tuples. The bits from the
+# lowest are: the square the figure moves from (6 bits), the square it
+# moves to (6 bits), the promotion figure (2 bits) and the flag telling
+# the kind of the move (2 bits). A square is row * 8 + column, the same
+# as the index of the square in ChessBoard.board
+from array import array
+
+# typecode of the arrays holding moves
+MOVE_TYPECODE = "H"
+
+NORMAL = 0
+PROMOTION = 1 << 14
+EN_PASSANT = 2 << 14
+CASTLING = 3 << 14
+FLAGS = 3 << 14
+
+# promotion figure letters in the order of the promotion bits, the bits
+# are the kind of the figure (see Figure.kind) minus one
+PROMOTION_LETTERS = "nbrq"
+
+
+def new_move_list():
+    """Returns an empty array for moves"""
+    return array(MOVE_TYPECODE)
+
+
+def encode_move(fro, to, flag=NORMAL, promotion=""):
+    """
+    Packs a move into an integer
+
+        Parameters:
+
+            fro (int): square index the figure moves from
+
+            to (int): square index the figure moves to
+
+            flag (int): NORMAL, PROMOTION, EN_PASSANT or CASTLING
+
+            promotion (str): "q", "r", "b" or "n" for promotions
+
+        Returns:
+
+            move (int): the packed move
+    """
+    move = fro | to << 6 | flag
+    if flag == PROMOTION:
+        move |= PROMOTION_LETTERS.index(promotion) << 12
+    return move
+
+
+def get_from(move):
+    """Returns the square index the move is played from"""
+    return move & 63
+
+
+def get_to(move):
+    """Returns the square index the move is played to"""
+    return move >> 6 & 63
+
+
+def get_promotion(move):
+    """Returns the letter of the promotion figure, an empty string if the move is not a promotion"""
+    if move & FLAGS != PROMOTION:
+        return ""
+    return PROMOTION_LETTERS[move >> 12 & 3]
+
+
+def move_to_uci(move):
+    """
+    Returns the move in long algebraic notation
+
+        Parameters:
+
+            move (int): packed move
+
+        Returns:
+
+            str: move in long algebraic notation. Example: c7c5, e7e8q
+    """
+    fro, to = move & 63, move >> 6 & 63
+    return (chr(ord('a') + (fro & 7)) + str((fro >> 3) + 1) + chr(ord('a') + (to & 7)) + str((to >> 3) + 1)
+            + get_promotion(move))
+
+
+def uci_to_squares(uci):
+    """
+    Returns the squares and the promotion of a move in long algebraic
+    notation, the board decides the kind of the move (see
+    ChessBoard.encode_move)
+
+        Parameters:
+
+            uci (str): move in long algebraic notation. Example: e7e8q
+
+        Returns:
+
+            (tuple): from and to as tuples of row and column and the
+            promotion letter, an empty string if there is none
+    """
+    fro = (int(uci[1]) - 1, ord(uci[0].lower()) - ord('a'))
+    to = (int(uci[3]) - 1, ord(uci[2].lower()) - ord('a'))
+    return fro, to, uci[4:5].lower()
@@ -0,0 +1,337 @@
+import multiprocessing
+import os
+import time
+from libs.chessboard import INFO_INTERVAL, MAX_DEPTH
+from libs.transpositionTable import TranspositionTable
+from libs.tablebase import Tablebases
+from libs.exceptions import SearchStoppedException
+from libs.uciOutput import format_info
+
+# state of a worker process, set up by _init_worker
+_shared_alpha = None
+_stopped = None
+_transposition_table = None
+_tablebases = None
+
+
+class _WorkerTimeManager:
+    """
+        Time manager of a worker process, it stops the search when the
+        main process sets the shared stop event or the deadline passes
+        """
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def should_stop(self, nodes):
+        return _stopped.is_set() or (self.deadline is not None and time.time() >= self.deadline)
+
+
+def _init_worker(shared_alpha, stopped, hash_size, tablebase_path, tablebase_cache):
+    """Sets up the state every worker process keeps between the tasks"""
+    global _shared_alpha, _stopped, _transposition_table, _tablebases
+    _shared_alpha = shared_alpha
+    _stopped = stopped
+    _transposition_table = TranspositionTable(hash_size)
+    # the tables are mapped again in every process
+    if tablebase_path is not None:
+        _tablebases = Tablebases(tablebase_path, tablebase_cache)
+
+
+def _search_root_move(task):
+    """
+    Searches one root move in a worker process
+
+        Parameters:
+
+            task (tuple): (index, board, move, depth, deadline, age),
+            the board is the position before the move
+
+        Returns:
+
+            (tuple): (index, utility, exact, nodes, pv, seldepth,
+            hashfull), utility is None if the search was stopped, exact
+            is false if the utility is only an upper bound because the
+            move was cut off against the shared alpha, pv is the
+            principal variation after the move, starting with the best
+            answer, hashfull is the permille of the worker's
+            transposition table in use
+    """
+    index, board, move, depth, deadline, age = task
+    if _stopped.is_set():
+        return index, None, False, 0, (), 0, 0
+    if _transposition_table.age != age:
+        _transposition_table.new_search()
+        _transposition_table.age = age
+
+    board.transposition_table = _transposition_table
+    board.tablebases = _tablebases
+    board.time_manager = _WorkerTimeManager(deadline)
+    board.search_depth = depth
+    board.best_move = move
+    board.nodes = 0
+    board.seldepth = 0
+    board.root_ply = len(board.undo_stack)
+
+    alpha = _shared_alpha.value
+    board.play_move(move)
+    try:
+        if alpha == float("-inf"):
+            utility, reply = board.negamax(float("-inf"), float("inf"), depth - 1)
+            utility = -utility
+        else:
+            # the move is first only proven to be worse than alpha with a zero window
+            utility, reply = board.negamax(-alpha - 1, -alpha, depth - 1)
+            utility = -utility
+            if utility > alpha:
+                utility, reply = board.negamax(float("-inf"), -alpha, depth - 1)
+                utility = -utility
+    except SearchStoppedException:
+        return index, None, False, board.nodes, (), board.seldepth, _transposition_table.get_hashfull()
+
+    with _shared_alpha.get_lock():
+        if utility > _shared_alpha.value:
+            _shared_alpha.value = utility
+    # the answer is searched on the second ply of the principal variation table
+    pv = tuple(board.pv_table[1]) if depth > 1 else ()
+    if not pv and reply is not None:
+        pv = (reply,)
+    return index, utility, utility > alpha, board.nodes, pv, board.seldepth, _transposition_table.get_hashfull()
+
+
+class ParallelSearch:
+    """
+        This is a class splitting the root moves of the search between
+        worker processes. The best utility found at the root is shared
+        between the workers as alpha, so moves searched later are still
+        cut off against it
+
+        Attributes
+        ----------
+
+        workers : int
+
+            number of worker processes
+
+        tablebase_path : str
+
+            directories of the tablebases of the workers, None if there
+            are none
+
+        nodes : int
+
+            number of nodes visited by the last search
+
+        seldepth : int
+
+            deepest ply reached by the workers in the last search
+
+        hashfull : int
+
+            permille in use of the transposition table of the worker
+            that reported last
+
+        best_move : int
+
+            best move of the last completed iteration, packed as
+            described in libs.moves
+
+        ponder_move : int
+
+            best reply to best_move found by the workers
+        """
+
+    # seconds between two checks of the time manager while waiting for the workers
+    POLL_INTERVAL = 0.005
+
+    def __init__(self, workers, hash_size=32, tablebase_path=None, tablebase_cache=1):
+        """
+        Starts the worker processes
+
+        Parameters
+        ----------
+
+            workers (int):
+
+                number of worker processes
+
+            hash_size (int):
+
+                size of the transposition table of every worker in megabytes
+
+            tablebase_path (str):
+
+                directories of the tablebases probed by the workers, the
+                "NalimovPath" option, None if there are none
+
+            tablebase_cache (int):
+
+                size of the block cache of every worker in megabytes
+        """
+        self.workers = workers
+        self.tablebase_path = tablebase_path
+        self.nodes = 0
+        self.seldepth = 0
+        self.hashfull = 0
+        self.next_info_time = INFO_INTERVAL
+        self.best_move = None
+        self.ponder_move = None
+        self.age = 0
+        self.shared_alpha = multiprocessing.Value('d', float("-inf"))
+        self.stopped = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(workers, initializer=_init_worker,
+                                         initargs=(self.shared_alpha, self.stopped, hash_size, tablebase_path,
+                                                   tablebase_cache))
+
+    @staticmethod
+    def get_worker_count(max_cpus, cpu_usage):
+        """
+        Returns the number of worker processes for the engine options
+
+            Parameters:
+
+                max_cpus (int): value of the "Max CPUs" option
+
+                cpu_usage (int): value of the "CPU Usage" option, percent
+
+            Returns:
+
+                (int): number of workers, at least one
+        """
+        cpus = min(max_cpus, os.cpu_count() or 1)
+        return max(1, cpus * cpu_usage // 100)
+
+    def close(self):
+        """Stops the worker processes"""
+        self.pool.terminate()
+        self.pool.join()
+
+    def get_minmax_move(self, board, time_manager, default_depth):
+        """
+        Returns next move calculated with minmax algorithm by the worker
+        processes, the search goes one ply deeper on every iteration
+        until a limit of the time manager is reached
+
+            Parameters:
+
+                board (ChessBoard): position to search, it is not changed
+
+                time_manager (TimeManager): limits of the search
+
+                default_depth (int): depth to search to if the search
+                is not limited otherwise
+
+            Returns:
+
+                move (int): best move, see libs.moves
+        """
+        depth_limit = time_manager.depth
+        limited = depth_limit is None and time_manager.is_limited()
+        if depth_limit is None:
+            depth_limit = MAX_DEPTH if limited else default_depth
+
+        self.nodes = 0
+        self.seldepth = 0
+        self.hashfull = 0
+        self.next_info_time = INFO_INTERVAL
+        self.best_move = None
+        self.ponder_move = None
+        if board.get_tablebase_move() is not None:
+            self.best_move = board.best_move
+            return self.best_move
+        completed_depth, score = 0, None
+        # a search limited by time goes on deeper from any result of the analysis cache
+        if board.get_cached_move(1 if limited else depth_limit) is not None:
+            self.best_move, score, completed_depth = board.best_move, board.score, board.completed_depth
+            self.__send_pv(board, completed_depth, score, (self.best_move,), time_manager)
+        cached_depth = completed_depth
+        self.age += 1
+        self.stopped.clear()
+        moves = list(board.get_all_legal_moves())
+
+        for depth in range(cached_depth + 1, depth_limit + 1):
+            if self.best_move in moves:
+                moves.remove(self.best_move)
+                moves.insert(0, self.best_move)
+            result = self.__search_iteration(board, moves, depth, time_manager)
+            if result is None:
+                break
+            self.best_move, score, pv = result
+            completed_depth = depth
+            self.ponder_move = pv[0] if pv else None
+            self.__send_pv(board, depth, score, (self.best_move,) + pv, time_manager)
+            if not time_manager.can_start_iteration():
+                break
+
+        board.best_move = self.best_move
+        if board.analysis_cache is not None:
+            if completed_depth > cached_depth:
+                board.analysis_cache.store(board.hash, completed_depth, self.best_move, score, self.nodes)
+            board.analysis_cache.flush()
+        return self.best_move
+
+    def __search_iteration(self, board, moves, depth, time_manager):
+        """
+        Searches every root move to the given depth
+
+            Returns:
+
+                (tuple): best move, its utility and the principal
+                variation after it, None if the iteration was stopped
+                before it completed
+        """
+        self.shared_alpha.value = float("-inf")
+        deadline = None
+        # the first iteration always completes, so there is a move to play
+        if self.best_move is not None and time_manager.hard_limit is not None and not time_manager.ponder:
+            deadline = time_manager.start_time + time_manager.hard_limit
+
+        tasks = [(index, board, move, depth, deadline, self.age) for index, move in enumerate(moves)]
+        results = self.pool.imap_unordered(_search_root_move, tasks)
+
+        best_index, best_utility, best_pv = None, float("-inf"), ()
+        searched = [False] * len(tasks)
+        for _ in tasks:
+            while True:
+                if self.best_move is not None and time_manager.should_stop(self.nodes):
+                    self.stopped.set()
+                try:
+                    index, utility, exact, nodes, pv, seldepth, hashfull = results.next(self.POLL_INTERVAL)
+                    break
+                except multiprocessing.TimeoutError:
+                    self.__send_progress(board, depth, time_manager)
+                    continue
+            self.nodes += nodes
+            self.seldepth = max(self.seldepth, seldepth)
+            self.hashfull = hashfull
+            searched[index] = True
+            # a move cut off against the shared alpha is worse than the move that set it
+            if utility is not None and exact and utility > best_utility:
+                if best_index is not None and board.display_pv_tips:
+                    self.__send_pv(board, depth, utility, (moves[index],) + pv, time_manager)
+                best_index, best_utility, best_pv = index, utility, pv
+            # the tasks are handed out in order, the first one not done is searched now
+            if board.display_current_move and board.send_info is not None and not all(searched) \
+                    and time_manager.elapsed() >= INFO_INTERVAL:
+                current = searched.index(False)
+                board.send_info(format_info(depth, currmove=moves[current], currmovenumber=current + 1))
+
+        if self.stopped.is_set() or best_index is None:
+            return None
+        return moves[best_index], best_utility, best_pv
+
+    def __send_pv(self, board, depth, score, pv, time_manager):
+        """Sends the info line of the principal variation, the same as the search of the board"""
+        if board.send_info is None:
+            return
+        pv, score = board.get_legal_pv(pv, score)
+        board.send_info(format_info(depth, self.seldepth, score, "", self.nodes, time_manager.elapsed(),
+                                    self.hashfull, pv))
+
+    def __send_progress(self, board, depth, time_manager):
+        """Sends the nodes searched so far, at most once every INFO_INTERVAL"""
+        elapsed = time_manager.elapsed()
+        if board.send_info is None or elapsed < self.next_info_time:
+            return
+        self.next_info_time = elapsed + INFO_INTERVAL
+        board.send_info(format_info(depth, self.seldepth, nodes=self.nodes, elapsed=elapsed, hashfull=self.hashfull))
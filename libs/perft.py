@@ -0,0 +1,108 @@
+import sys
+import time
+from libs.chessboard import ChessBoard, START_FEN
+
+# positions with known move path enumeration counts, (name, fen, nodes per depth starting at depth 1)
+PERFT_POSITIONS = [
+    ("startpos", START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def perft(board, depth):
+    """
+    Counts the leaf nodes of the legal move tree of the position
+
+        Parameters:
+
+            board (ChessBoard): position to count from, it is restored
+            before the function returns
+
+            depth (int): number of plies to play
+
+        Returns:
+
+            nodes (int): number of move sequences of the given length
+    """
+    moves = board.get_all_legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.play_move(move)
+        nodes += perft(board, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth):
+    """
+    Counts the leaf nodes below every legal move of the position,
+    used to find the move a wrong perft count comes from
+
+        Parameters:
+
+            board (ChessBoard): position to count from
+
+            depth (int): number of plies to play, at least one
+
+        Returns:
+
+            (list): tuples of the packed move (see libs.moves) and its
+            number of nodes, in the order the moves are generated
+    """
+    result = []
+    for move in board.get_all_legal_moves():
+        board.play_move(move)
+        result.append((move, perft(board, depth - 1)))
+        board.unmake_move()
+    return result
+
+
+def benchmark(max_depth=3, output=sys.stdout):
+    """
+    Runs perft on the bundled positions and prints the speed of the
+    move generator
+
+        Parameters:
+
+            max_depth (int): deepest depth counted for every position
+
+            output (file): where the results are written
+
+        Returns:
+
+            (bool): true if every count matched the expected one
+    """
+    correct = True
+    total_nodes, total_time = 0, 0.0
+    for name, fen, expected in PERFT_POSITIONS:
+        board = ChessBoard()
+        board.set_fen(fen)
+        for depth in range(1, min(max_depth, len(expected)) + 1):
+            start = time.perf_counter()
+            nodes = perft(board, depth)
+            elapsed = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += elapsed
+            status = "ok" if nodes == expected[depth - 1] else "expected {}".format(expected[depth - 1])
+            correct = correct and nodes == expected[depth - 1]
+            output.write("{} depth {}: {} nodes {:.3f}s {} nps {}\n".format(
+                name, depth, nodes, elapsed, int(nodes / elapsed) if elapsed else 0, status))
+    output.write("total: {} nodes {:.3f}s {} nps\n".format(
+        total_nodes, total_time, int(total_nodes / total_time) if total_time else 0))
+    return correct
+
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3) else 1)
@@ -0,0 +1,549 @@
+import mmap
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from itertools import product
+from libs.chessboard import ChessBoard
+from libs.figures import Figure, Pawn, Knight, Bishop, Rook, Queen, King
+from libs.bitboard import KNIGHT_ATTACKS, KING_ATTACKS, rook_attacks, bishop_attacks, popcount
+from libs.moves import FLAGS, PROMOTION, move_to_uci
+
+# Endgame tablebases. Every material signature has its own file named
+# after it, the white figures, "v" and the black figures, strongest
+# first, for example KQvK.tb or KRPvKR.tb. A position of the black
+# side of a signature is looked up in the mirrored table with the colors
+# swapped and the board flipped.
+#
+# The file holds one signed byte for every position. The position index
+# is the turn (0 white, 1 black) followed by the squares (row * 8 +
+# column) of the figures in the order of the signature, as digits of a
+# number in base 64. Figures of the same kind are stored in ascending
+# order of their squares. The byte is the result for the player on turn:
+#   0       draw, or a position that can not occur
+#   d > 0   win, mate in d plies
+#   d < 0   loss, mated in -d - 1 plies
+# Castling and en passant are not part of the tables.
+
+TABLE_EXTENSION = ".tb"
+
+# results of a probe
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# bytes read from a table at once and kept in the block cache
+BLOCK_SIZE = 4096
+
+# longest mate distance in plies that fits in a byte
+MAX_DISTANCE = 126
+
+# letters of the figure kinds, Pawn, Knight, Bishop, Rook, Queen, King
+LETTERS = "PNBRQK"
+
+# letters in the order they appear in a signature
+SIGNATURE_ORDER = "KQRBNP"
+
+# figure classes of the kinds, in the order of LETTERS
+FIGURE_CLASSES = [Pawn, Knight, Bishop, Rook, Queen, King]
+
+SLIDER_ATTACKS = {Bishop.kind: bishop_attacks, Rook.kind: rook_attacks,
+                  Queen.kind: lambda square, occupancy: rook_attacks(square, occupancy)
+                  | bishop_attacks(square, occupancy)}
+
+
+def get_signature(board, color):
+    """
+    Returns the letters of the figures of one color in signature order
+
+        Parameters:
+
+            board (ChessBoard): position
+
+            color (Color): color of the figures
+
+        Returns:
+
+            (str): example: KRP
+    """
+    letters = ""
+    for letter in SIGNATURE_ORDER:
+        letters += letter * popcount(board.bitboards[LETTERS.index(letter) + 6 * color])
+    return letters
+
+
+def is_insufficient_material(signature):
+    """
+    Returns true if the signature can not be won by either side: only
+    the kings and at most one knight or bishop on each side
+    """
+    return all(side in ("K", "KB", "KN") for side in signature.split("v"))
+
+
+class Table:
+    """
+        This is a class describing the layout of one table
+
+        Attributes
+        ----------
+
+        signature : str
+
+            material signature, example: KQvK
+
+        figures : list
+
+            kind and color of every figure in index order
+
+        groups : list
+
+            start and end of every run of figures of the same kind and
+            color in figures, their squares are sorted in the index
+        """
+
+    def __init__(self, signature):
+        self.signature = signature
+        white, black = signature.split("v")
+        self.figures = ([(LETTERS.index(letter), Figure.Color.WHITE) for letter in white]
+                        + [(LETTERS.index(letter), Figure.Color.BLACK) for letter in black])
+        self.groups = []
+        start = 0
+        for end in range(1, len(self.figures) + 1):
+            if end == len(self.figures) or self.figures[end] != self.figures[start]:
+                if end - start > 1:
+                    self.groups.append((start, end))
+                start = end
+        self.size = 2 * 64 ** len(self.figures)
+
+    def get_index(self, turn, squares):
+        """
+        Returns the index of the position in the table
+
+            Parameters:
+
+                turn (Color): player on turn
+
+                squares (list): square of every figure in index order
+
+            Returns:
+
+                (int): index of the byte of the position
+        """
+        if self.groups:
+            squares = list(squares)
+            for start, end in self.groups:
+                squares[start:end] = sorted(squares[start:end])
+        index = turn
+        for square in squares:
+            index = index * 64 + square
+        return index
+
+    def get_position(self, index):
+        """Returns the turn and the squares of the figures of the index, see get_index"""
+        squares = []
+        for figure in self.figures:
+            index, square = divmod(index, 64)
+            squares.append(square)
+        squares.reverse()
+        return index, squares
+
+    def is_canonical(self, squares):
+        """Returns true if the squares are different and sorted in every group"""
+        if len(set(squares)) != len(squares):
+            return False
+        return all(squares[i] < squares[i + 1] for start, end in self.groups for i in range(start, end - 1))
+
+
+class Tablebases:
+    """
+        This is a class probing the endgame tables found in the
+        "NalimovPath" directories. The tables are memory mapped, the
+        blocks read from them are kept in a least recently used cache
+        of "NalimovCache" megabytes
+
+        Attributes
+        ----------
+
+        paths : list
+
+            directories searched for tables
+
+        tables : dict
+
+            signature as key and the path of the table file as value
+
+        max_pieces : int
+
+            number of figures of the largest table, including the kings
+
+        cache_size : int
+
+            number of blocks the cache holds
+
+        hits : int
+
+            number of reads served by the cache
+
+        misses : int
+
+            number of reads of blocks not in the cache
+        """
+
+    def __init__(self, path, cache_mb=1):
+        """
+        Finds the tables in the directories
+
+        Parameters
+        ----------
+
+            path (str):
+
+                directories separated by ";", the "NalimovPath" option
+
+            cache_mb (int):
+
+                size of the block cache in megabytes, the "NalimovCache" option
+        """
+        self.paths = [directory for directory in path.split(";") if directory]
+        self.cache_size = max(1, cache_mb * 1024 * 1024 // BLOCK_SIZE)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__files = dict()
+        self.refresh()
+
+    def refresh(self):
+        """Looks for the tables in the directories again"""
+        self.tables = dict()
+        for directory in self.paths:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                signature, extension = os.path.splitext(name)
+                if extension == TABLE_EXTENSION and "v" in signature:
+                    table_path = os.path.join(directory, name)
+                    if os.path.getsize(table_path) == Table(signature).size:
+                        self.tables[signature] = table_path
+        self.max_pieces = max([len(signature) - 1 for signature in self.tables], default=0)
+
+    def close(self):
+        """Unmaps the tables and drops the cache"""
+        for file, data, table in self.__files.values():
+            data.close()
+            file.close()
+        self.__files = dict()
+        self.cache.clear()
+
+    def resize_cache(self, cache_mb):
+        """Changes the size of the block cache to cache_mb megabytes"""
+        self.cache_size = max(1, cache_mb * 1024 * 1024 // BLOCK_SIZE)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def can_probe(self, board):
+        """Returns true if the position has few enough figures and no castling rights"""
+        return (not board.castling_rights
+                and popcount(board.occupancy[0] | board.occupancy[1]) <= self.max_pieces)
+
+    def probe(self, board):
+        """
+        Looks up the position
+
+            Parameters:
+
+                board (ChessBoard): position, castling rights and the en
+                passant square are ignored
+
+            Returns:
+
+                (tuple): result for the player on turn (WIN, DRAW or LOSS)
+                and the distance to mate in plies, None if there is no
+                table for the position or the position is illegal
+        """
+        # the search reaches positions after pseudo legal moves, where the
+        # king of the player not on turn is in check, the tables have no
+        # result for them
+        king = board.bitboards[King.kind + 6 * (1 - board.turn)]
+        if king and board.is_square_attacked(king.bit_length() - 1, board.turn):
+            return None
+        white = get_signature(board, Figure.Color.WHITE)
+        black = get_signature(board, Figure.Color.BLACK)
+        signature = white + "v" + black
+        if is_insufficient_material(signature):
+            return DRAW, 0
+        mirrored = signature not in self.tables
+        if mirrored:
+            signature = black + "v" + white
+            if signature not in self.tables:
+                return None
+
+        table = self.__get_table(signature)
+        squares = []
+        for kind, color in table.figures:
+            if mirrored:
+                color = 1 - color
+            squares.append(kind + 6 * color)
+        # the squares of a bitboard come in ascending order, as the index needs them
+        bitboards = dict()
+        figure_squares = []
+        for index in squares:
+            if index not in bitboards:
+                bitboard = board.bitboards[index]
+                bitboards[index] = []
+                while bitboard:
+                    low = bitboard & -bitboard
+                    bitboard ^= low
+                    bitboards[index].append(low.bit_length() - 1)
+            figure_squares.append(bitboards[index].pop(0))
+        turn = board.turn
+        if mirrored:
+            figure_squares = [square ^ 56 for square in figure_squares]
+            turn = 1 - turn
+        return self.__decode(self.__read(signature, table.get_index(turn, figure_squares)))
+
+    def get_best_move(self, board):
+        """
+        Returns the move keeping the best result, the shortest mate if
+        the position is won and the longest defence if it is lost
+
+            Parameters:
+
+                board (ChessBoard): position
+
+            Returns:
+
+                (tuple): the packed move, the result and the distance to mate in
+                plies, None if a position after a move can not be probed
+        """
+        best = None
+        for move in board.get_all_legal_moves():
+            board.play_move(move)
+            result = self.probe(board)
+            board.unmake_move()
+            if result is None:
+                return None
+            # the result of the position after the move is the opponent's
+            result, distance = -result[0], result[1] + 1
+            if result == DRAW:
+                distance = 0
+            order = (result, -distance if result == WIN else distance)
+            if best is None or order > best[0]:
+                best = (order, move, result, distance)
+        if best is None:
+            return None
+        return best[1], best[2], best[3]
+
+    def __get_table(self, signature):
+        """Returns the layout of the table, mapping the file the first time"""
+        if signature not in self.__files:
+            file = open(self.tables[signature], "rb")
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__files[signature] = (file, data, Table(signature))
+        return self.__files[signature][2]
+
+    def __read(self, signature, index):
+        """Returns the byte of the table at the index, through the block cache"""
+        block, offset = divmod(index, BLOCK_SIZE)
+        key = (signature, block)
+        data = self.cache.get(key)
+        if data is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        else:
+            self.misses += 1
+            data = self.__files[signature][1][block * BLOCK_SIZE:(block + 1) * BLOCK_SIZE]
+            self.cache[key] = data
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        value = data[offset]
+        return value - 256 if value > 127 else value
+
+    @staticmethod
+    def __decode(value):
+        """Returns the result and the distance of a byte of a table"""
+        if value > 0:
+            return WIN, value
+        if value < 0:
+            return LOSS, -value - 1
+        return DRAW, 0
+
+
+def get_dependencies(signature):
+    """
+    Returns the signatures the positions of the signature can turn into
+    with one capture or promotion, in signature form or mirrored
+    """
+    dependencies = set()
+    sides = signature.split("v")
+    for side in range(2):
+        for i, letter in enumerate(sides[side]):
+            changed = list(sides)
+            if letter == "K":
+                continue
+            # captured by the other side
+            changed[side] = sides[side][:i] + sides[side][i + 1:]
+            dependencies.add(changed[0] + "v" + changed[1])
+            if letter == "P":
+                for promotion in "QRBN":
+                    letters = sides[side][:i] + promotion + sides[side][i + 1:]
+                    letters = "".join(sorted(letters, key=SIGNATURE_ORDER.index))
+                    changed[side] = letters
+                    dependencies.add(changed[0] + "v" + changed[1])
+                    # the pawn can also capture while promoting
+                    for j, captured in enumerate(sides[1 - side]):
+                        if captured not in "KP":
+                            both = list(changed)
+                            both[1 - side] = sides[1 - side][:j] + sides[1 - side][j + 1:]
+                            dependencies.add(both[0] + "v" + both[1])
+    return dependencies
+
+
+def generate(directory, signature, output=sys.stdout):
+    """
+    Generates the table of the signature with retrograde analysis and
+    writes it to the directory, the tables it depends on are generated
+    first if they are missing
+
+        Parameters:
+
+            directory (str): directory of the tables
+
+            signature (str): material signature, example: KQvK
+
+            output (file): where the progress is written
+    """
+    tablebases = Tablebases(directory)
+    for dependency in sorted(get_dependencies(signature)):
+        mirrored = "v".join(reversed(dependency.split("v")))
+        if not is_insufficient_material(dependency) and dependency not in tablebases.tables \
+                and mirrored not in tablebases.tables:
+            generate(directory, dependency, output)
+            tablebases.refresh()
+
+    start_time = time.time()
+    table = Table(signature)
+    figures = table.figures
+    count = array('B', bytes(table.size))
+    # 0 not a position, 1 not resolved yet, 2 resolved
+    state = array('B', bytes(table.size))
+    values = array('b', bytes(table.size))
+    events = [[] for distance in range(MAX_DISTANCE + 2)]
+
+    # the figures of every position are placed on an empty board
+    board = ChessBoard()
+    board.set_fen("k7/8/8/8/8/8/8/K7 w - - 0 1")
+    board.set_piece_at((0, 0), None)
+    board.set_piece_at((7, 0), None)
+    placed = []
+    for squares in product(range(64), repeat=len(figures)):
+        if not table.is_canonical(squares):
+            continue
+        if any(kind == Pawn.kind and square >> 3 in (0, 7) for (kind, color), square in zip(figures, squares)):
+            continue
+        for square in placed:
+            board.set_piece_at(divmod(square, 8), None)
+        for (kind, color), square in zip(figures, squares):
+            board.set_piece_at(divmod(square, 8), FIGURE_CLASSES[kind](color))
+        placed = squares
+
+        for turn in (Figure.Color.WHITE, Figure.Color.BLACK):
+            board.turn = turn
+            opponent_king = board.bitboards[King.kind + 6 * (1 - turn)].bit_length() - 1
+            if board.is_square_attacked(opponent_king, turn):
+                continue
+            index = table.get_index(turn, squares)
+            state[index] = 1
+            moves = board.get_all_legal_moves()
+            count[index] = len(moves)
+            if not moves:
+                if board.is_player_in_check():
+                    events[0].append((LOSS, index))
+                continue
+            for move in moves:
+                if move & FLAGS != PROMOTION and board.board[move >> 6 & 63] is None:
+                    continue
+                # captures and promotions lead to other tables
+                board.play_move(move)
+                result = tablebases.probe(board)
+                board.unmake_move()
+                if result is None:
+                    raise ValueError("missing table for a position after " + move_to_uci(move))
+                if result[0] == LOSS:
+                    events[result[1] + 1].append((WIN, index))
+                elif result[0] == WIN:
+                    events[result[1] + 1].append((DRAW, index))
+        board.turn = Figure.Color.WHITE
+
+    # the positions are resolved in the order of their distance to mate,
+    # a DRAW event is a move to a position won by the opponent
+    for distance, distance_events in enumerate(events):
+        if distance > MAX_DISTANCE:
+            if distance_events:
+                raise ValueError("mate distance of %s does not fit in a byte" % signature)
+            break
+        for result, index in distance_events:
+            if state[index] != 1:
+                continue
+            if result == DRAW:
+                count[index] -= 1
+                if count[index]:
+                    continue
+                result = LOSS
+            state[index] = 2
+            values[index] = distance if result == WIN else -distance - 1
+            for predecessor in _get_predecessors(table, index):
+                if state[predecessor] == 1:
+                    events[distance + 1].append((WIN if result == LOSS else DRAW, predecessor))
+
+    with open(os.path.join(directory, signature + TABLE_EXTENSION), "wb") as file:
+        values.tofile(file)
+    output.write("%s: %d positions, %.1fs\n" % (signature, state.count(1) + state.count(2), time.time() - start_time))
+
+
+def _get_predecessors(table, index):
+    """
+    Returns the indexes of the positions of the table the position can
+    be reached from with a move that is not a capture or a promotion
+    """
+    turn, squares = table.get_position(index)
+    mover = 1 - turn
+    occupancy = 0
+    for square in squares:
+        occupancy |= 1 << square
+    predecessors = []
+    for i, (kind, color) in enumerate(table.figures):
+        if color != mover:
+            continue
+        square = squares[i]
+        if kind == Pawn.kind:
+            back = -8 if mover == Figure.Color.WHITE else 8
+            origins = 0
+            if square >> 3 != (1 if mover == Figure.Color.WHITE else 6):
+                previous = square + back
+                if not occupancy >> previous & 1:
+                    origins |= 1 << previous
+                    # a double step from the second row
+                    if square >> 3 == (3 if mover == Figure.Color.WHITE else 4) \
+                            and not occupancy >> (previous + back) & 1:
+                        origins |= 1 << (previous + back)
+        elif kind == Knight.kind:
+            origins = KNIGHT_ATTACKS[square] & ~occupancy
+        elif kind == King.kind:
+            origins = KING_ATTACKS[square] & ~occupancy
+        else:
+            origins = SLIDER_ATTACKS[kind](square, occupancy) & ~occupancy
+        while origins:
+            low = origins & -origins
+            origins ^= low
+            moved = list(squares)
+            moved[i] = low.bit_length() - 1
+            predecessors.append(table.get_index(mover, moved))
+    return predecessors
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "generate":
+        sys.exit("usage: python -m libs.tablebase generate DIRECTORY SIGNATURE...")
+    for name in sys.argv[3:]:
+        generate(sys.argv[2], name)
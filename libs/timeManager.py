@@ -0,0 +1,202 @@
+import threading
+import time
+from libs.figures import Figure
+
+
+class TimeManager:
+    """
+        This is a class holding the limits of one search, parsed from
+        the parameters of the UCI "go" command, and deciding how much
+        of the clock the search may use
+
+        Attributes
+        ----------
+
+        depth : int
+
+            maximum depth to search to, None if not limited
+
+        nodes : int
+
+            maximum number of nodes to search, None if not limited
+
+        infinite : bool
+
+            true if the search runs until it is stopped
+
+        ponder : bool
+
+            true while the search runs on the opponent's time, the
+            limits apply only after ponderhit
+
+        stopped : threading.Event
+
+            set when the search has to stop at once
+
+        soft_limit : float
+
+            seconds after which no new iteration is started, None if
+            the time is not limited
+
+        hard_limit : float
+
+            seconds after which the running iteration is aborted, None
+            if the time is not limited
+
+        start_time : float
+
+            time the search started at
+        """
+
+    # seconds kept in reserve for the communication with the GUI
+    MOVE_OVERHEAD = 0.05
+
+    # number of moves the remaining time is split into if movestogo is not given
+    DEFAULT_MOVES_TO_GO = 30
+
+    def __init__(self, go="go", turn=Figure.Color.WHITE):
+        """
+        Constructs the limits from the "go" command
+
+        Parameters
+        ----------
+
+            go (str):
+
+                go command, example: go wtime 60000 btime 60000 winc 1000 binc 1000
+
+            turn (Color):
+
+                color of the player to move, to pick the right clock
+        """
+        parameters = self.__parse(go)
+        self.depth = parameters.get("depth")
+        self.nodes = parameters.get("nodes")
+        self.infinite = "infinite" in parameters
+        self.ponder = "ponder" in parameters
+        self.stopped = threading.Event()
+        self.released = threading.Event()
+        self.soft_limit = None
+        self.hard_limit = None
+
+        if "movetime" in parameters:
+            self.soft_limit = self.hard_limit = max(0.0, parameters["movetime"] / 1000 - self.MOVE_OVERHEAD)
+        else:
+            time_left = parameters.get("wtime" if turn == Figure.Color.WHITE else "btime")
+            if time_left is not None:
+                self.__allocate(time_left / 1000,
+                                parameters.get("winc" if turn == Figure.Color.WHITE else "binc", 0) / 1000,
+                                parameters.get("movestogo", self.DEFAULT_MOVES_TO_GO))
+        self.start()
+
+    def __parse(self, go):
+        """
+        Returns the parameters of the go command as a dictionary
+
+            Parameters:
+
+                go (str): go command
+
+            Returns:
+
+                parameters (dict): parameter names as keys and integer
+                values, None for parameters without value
+        """
+        flags = ("infinite", "ponder")
+        parameters = dict()
+        tokens = go.split()[1:]
+        i = 0
+        while i < len(tokens):
+            if tokens[i] in flags:
+                parameters[tokens[i]] = None
+                i += 1
+            elif i + 1 < len(tokens):
+                try:
+                    parameters[tokens[i]] = int(tokens[i + 1])
+                except ValueError:
+                    pass
+                i += 2
+            else:
+                i += 1
+        return parameters
+
+    def __allocate(self, time_left, increment, moves_to_go):
+        """
+        Splits the remaining time between the remaining moves
+
+            Parameters:
+
+                time_left (float): seconds left on the clock
+
+                increment (float): seconds added after every move
+
+                moves_to_go (int): number of moves until the next
+                time control
+        """
+        moves_to_go = max(1, moves_to_go)
+        optimum = time_left / moves_to_go + increment * 0.75
+        # never plan to use more than half of the clock on one move
+        maximum = max(0.0, time_left / 2 - self.MOVE_OVERHEAD)
+        # the next iteration takes several times longer than the last one,
+        # so none is started after half of the optimum time
+        self.soft_limit = min(optimum / 2, maximum)
+        self.hard_limit = min(optimum * 2, maximum)
+
+    def start(self):
+        """Starts the clock of the search"""
+        self.start_time = time.time()
+
+    def elapsed(self):
+        """Returns the seconds passed since the start of the search"""
+        return time.time() - self.start_time
+
+    def stop(self):
+        """Stops the search, called from the thread reading the GUI commands"""
+        self.stopped.set()
+        self.released.set()
+
+    def ponderhit(self):
+        """The opponent played the expected move, the limits apply from now on"""
+        self.start()
+        self.ponder = False
+        self.released.set()
+
+    def wait_for_release(self):
+        """
+        Blocks until the result of the search may be sent to the GUI,
+        a pondering or infinite search must not report before it is
+        stopped
+        """
+        while (self.infinite or self.ponder) and not self.stopped.is_set():
+            self.released.wait()
+            self.released.clear()
+
+    def is_limited(self):
+        """Returns true if the search is bounded by time, nodes or runs until stopped"""
+        return self.infinite or self.ponder or self.nodes is not None or self.hard_limit is not None
+
+    def can_start_iteration(self):
+        """Returns true if there is enough time left to search one ply deeper"""
+        if self.stopped.is_set():
+            return False
+        return self.ponder or self.soft_limit is None or self.elapsed() < self.soft_limit
+
+    def should_stop(self, nodes):
+        """
+        Returns true if the running iteration has to be aborted
+
+            Parameters:
+
+                nodes (int): number of nodes searched so far
+
+            Returns:
+
+                (bool)
+        """
+        if self.stopped.is_set():
+            return True
+        if self.ponder:
+            return False
+        if self.nodes is not None and nodes >= self.nodes:
+            return True
+        return self.hard_limit is not None and self.elapsed() >= self.hard_limit
@@ -0,0 +1,131 @@
+class TranspositionTable:
+    """
+        This is a fixed size table of already searched positions,
+        indexed by the zobrist key of the position
+
+        Attributes
+        ----------
+
+        size_mb : int
+
+            size of the table in megabytes
+
+        size : int
+
+            number of entries the table can hold
+
+        entries : list
+
+            stored entries, tuples of (key, depth, bound, score, move, age)
+
+        age : int
+
+            number of the current search, entries of older searches
+            are replaced first
+
+        hits : int
+
+            number of probes that found the position
+
+        misses : int
+
+            number of probes that did not find the position
+        """
+
+    # type of the stored score
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+    # approximate memory taken by one stored entry in bytes
+    ENTRY_SIZE = 128
+
+    def __init__(self, size_mb=32):
+        """
+        Constructs an empty table taking about size_mb megabytes
+
+        Parameters
+        ----------
+
+            size_mb (int):
+
+                size of the table in megabytes, the "Hash" option
+        """
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        """Drops all entries and reallocates the table for size_mb megabytes"""
+        self.size_mb = size_mb
+        self.size = max(1, size_mb * 1024 * 1024 // self.ENTRY_SIZE)
+        self.clear()
+
+    def clear(self):
+        """Drops all entries and resets the counters"""
+        self.entries = [None] * self.size
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+
+    def new_search(self):
+        """Marks the start of a new search, so the old entries get replaced first"""
+        self.age += 1
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, key):
+        """
+        Returns the entry stored for the position
+
+            Parameters:
+
+                key (int): zobrist key of the position
+
+            Returns:
+
+                entry (tuple): (key, depth, bound, score, move, age) or None
+                if the position is not stored
+        """
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        """
+        Stores the search result for the position. An entry of the
+        current search is only replaced by the same position or by a
+        search that was at least as deep
+
+            Parameters:
+
+                key (int): zobrist key of the position
+
+                depth (int): remaining depth the position was searched to
+
+                bound (int): EXACT, LOWER or UPPER
+
+                score (float): score of the position
+
+                move (int): best move found in the position, see libs.moves
+        """
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or entry[5] != self.age or depth >= entry[1]:
+            if move is None and entry is not None and entry[0] == key:
+                move = entry[4]
+            self.entries[index] = (key, depth, bound, score, move, self.age)
+
+    def get_hashfull(self):
+        """
+        Returns the permille of the table used by the current search,
+        counted on the first thousand entries
+
+            Returns:
+
+                (int): 0 to 1000, the hashfull of the UCI info
+        """
+        sample = self.entries[:1000]
+        used = sum(1 for entry in sample if entry is not None and entry[5] == self.age)
+        return used * 1000 // len(sample)
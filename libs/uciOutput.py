@@ -0,0 +1,135 @@
+import queue
+import sys
+import threading
+from libs.moves import move_to_uci
+
+# scores this close to a tablebase win are sent as a mate, the same as
+# TABLEBASE_WIN of libs.chessboard less the longest distance to mate in
+# plies (MAX_DISTANCE of libs.tablebase)
+MATE_SCORE = 10000
+MATE_DISTANCE = 127
+
+
+class UciWriter:
+    """
+        This is a buffered writer of the lines sent to the GUI. The
+        lines are put in a queue and written by a thread of their own,
+        so the search never waits for the GUI reading its output
+
+        Attributes
+        ----------
+
+        stream : file
+
+            stream the lines are written to, the standard output
+
+        lines : queue.Queue
+
+            lines waiting to be written
+        """
+
+    def __init__(self, stream=None):
+        """
+        Constructs the writer and starts its thread
+
+        Parameters
+        ----------
+
+            stream (file):
+
+                stream the lines are written to, the standard output
+                if it is not given
+        """
+        self.stream = stream if stream is not None else sys.stdout
+        self.lines = queue.Queue()
+        threading.Thread(target=self.__write_lines, daemon=True).start()
+
+    def send(self, line):
+        """Queues one line, callable from every thread"""
+        self.lines.put(line)
+
+    def flush(self):
+        """Blocks until all queued lines are written"""
+        self.lines.join()
+
+    def __write_lines(self):
+        """Writes the queued lines, the stream is flushed once the queue is empty"""
+        while True:
+            line = self.lines.get()
+            self.stream.write(line + "\n")
+            if self.lines.empty():
+                self.stream.flush()
+            self.lines.task_done()
+
+
+def format_score(score):
+    """
+    Returns the score in the UCI notation
+
+        Parameters:
+
+            score (int): utility for the player on turn
+
+        Returns:
+
+            (str): example: cp 35, mate -3
+    """
+    score = int(score)
+    if MATE_SCORE - MATE_DISTANCE <= abs(score) <= MATE_SCORE:
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return "mate %d" % (moves if score > 0 else -moves)
+    return "cp %d" % score
+
+
+def format_info(depth=None, seldepth=None, score=None, bound="", nodes=None, elapsed=None, hashfull=None,
+                pv=None, currmove=None, currmovenumber=None):
+    """
+    Returns an info line, the values that are None are left out
+
+        Parameters:
+
+            depth (int): depth of the iteration
+
+            seldepth (int): deepest ply reached
+
+            score (int): utility of the best move for the player on turn
+
+            bound (str): "lowerbound" or "upperbound" if the score is
+            outside of the search window
+
+            nodes (int): number of nodes searched
+
+            elapsed (float): seconds since the start of the search
+
+            hashfull (int): permille of the transposition table in use
+
+            pv (iterable): packed moves of the principal variation
+
+            currmove (int): root move searched
+
+            currmovenumber (int): number of the root move searched
+
+        Returns:
+
+            (str): example: info depth 5 score cp 20 nodes 3000 nps 6000 time 500 pv e2e4 e7e5
+    """
+    fields = ["info"]
+    if depth is not None:
+        fields += ["depth", str(depth)]
+    if seldepth is not None:
+        fields += ["seldepth", str(seldepth)]
+    if score is not None:
+        fields += ["score", format_score(score)]
+        if bound:
+            fields.append(bound)
+    if currmove is not None:
+        fields += ["currmove", move_to_uci(currmove), "currmovenumber", str(currmovenumber)]
+    if nodes is not None:
+        fields += ["nodes", str(nodes)]
+        if elapsed is not None:
+            fields += ["nps", str(int(nodes / elapsed) if elapsed > 0 else 0), "time", str(int(elapsed * 1000))]
+    if hashfull is not None:
+        fields += ["hashfull", str(hashfull)]
+    if pv:
+        fields += ["pv"] + [move_to_uci(move) for move in pv]
+    return " ".join(fields)
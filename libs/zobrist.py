@@ -0,0 +1,45 @@
+import random
+
+# fixed seed, so the same position gets the same key in every run
+_random = random.Random(0x1B5A4E)
+
+# key for every figure index (see Figure.index) on every square
+PIECE_KEYS = [[_random.getrandbits(64) for square in range(64)] for index in range(12)]
+
+# xor-ed in when it is black's turn
+TURN_KEY = _random.getrandbits(64)
+
+# one key per castling right, combined for every castling rights mask
+_CASTLING_RIGHT_KEYS = [_random.getrandbits(64) for right in range(4)]
+CASTLING_KEYS = [0] * 16
+for rights in range(16):
+    for bit in range(4):
+        if rights & (1 << bit):
+            CASTLING_KEYS[rights] ^= _CASTLING_RIGHT_KEYS[bit]
+
+# key for the file of the en passant square
+EN_PASSANT_KEYS = [_random.getrandbits(64) for file in range(8)]
+
+
+def hash_board(board):
+    """
+    Computes the zobrist key of the board from scratch
+
+        Parameters:
+
+            board (ChessBoard): board to be hashed
+
+        Returns:
+
+            key (int): 64 bit zobrist key of the position
+    """
+    key = 0
+    for square, figure in enumerate(board.board):
+        if figure is not None:
+            key ^= PIECE_KEYS[figure.index][square]
+    if board.turn:
+        key ^= TURN_KEY
+    key ^= CASTLING_KEYS[board.castling_rights]
+    if board.en_passant is not None:
+        key ^= EN_PASSANT_KEYS[board.en_passant[1]]
+    return key
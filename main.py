@@ -1,28 +1,59 @@
 import queue
+import sqlite3
 import sys
-from libs.chessboard import ChessBoard
-from libs.exceptions import InvalidMoveException
+import threading
+import time
+from libs.chessboard import ChessBoard, START_FEN
+from libs.exceptions import InvalidMoveException, InvalidBookException, InvalidFenException, InvalidOptionException
 from libs.engineOptions import EngineOptions
+from libs.transpositionTable import TranspositionTable
+from libs.timeManager import TimeManager
+from libs.parallelSearch import ParallelSearch
+from libs.perft import divide
+from libs.moves import move_to_uci, uci_to_squares
+from libs.polyglot import OpeningBook
+from libs.tablebase import Tablebases
+from libs.analysisCache import AnalysisCache
+from libs.uciOutput import UciWriter
 
 
 class GameEngine:
     def __init__(self):
         self.board = None
+        # fen and moves of the last position command, the board is
+        # updated with the new moves only while the game goes on
+        self.position = None
         self.options = EngineOptions()
+        self.transposition_table = TranspositionTable(int(self.options.get_value("Hash")))
+
+        # commands from the GUI, filled by the input thread
+        self.commands = queue.Queue()
+        # lines to the GUI are written by a thread of their own
+        self.writer = UciWriter()
+        self.search_thread = None
+        self.time_manager = None
+        self.parallel_search = None
+        self.opening_book = None
+        self.tablebases = None
+        self.analysis_cache = None
 
     def engine_loop(self):
+        threading.Thread(target=self.read_input, daemon=True).start()
 
         while True:
             # Check input from GUI
-            _input = input()
+            _input = self.commands.get()
             if _input == "uci":
                 self.initialize()
 
             elif _input == "isready":
-                print("readyok")
+                self.send("readyok")
 
             elif _input.startswith("setoption"):
-                self.options.set_option(_input)
+                self.handle_setoption(_input)
+
+            elif _input == "ucinewgame":
+                self.handle_newgame()
 
             elif _input.startswith("position"):
                 self.handle_position(_input)
@@ -33,34 +64,248 @@ class GameEngine:
             elif _input == "stop":
                 self.handle_stop()
 
+            elif _input == "ponderhit":
+                self.handle_ponderhit()
+
             elif _input == "quit":
-                exit()
+                self.handle_stop()
+                if self.parallel_search is not None:
+                    self.parallel_search.close()
+                if self.analysis_cache is not None:
+                    self.analysis_cache.close()
+                self.writer.flush()
+                sys.exit()
+
+    def read_input(self):
+        """Reads the GUI commands, so they are received while the search runs"""
+        while True:
+            try:
+                _input = input().strip()
+            except EOFError:
+                _input = "quit"
+            self.commands.put(_input)
+            if _input == "quit":
+                return
+
+    def send(self, message):
+        """Sends one line to the GUI, from the main or the search thread"""
+        self.writer.send(message)
+
+    def handle_setoption(self, option):
+        """Sets the option and applies it if its value changed, an invalid option is reported to the GUI"""
+        try:
+            name = self.options.set_option(option)
+        except InvalidOptionException as error:
+            self.send("info string " + str(error))
+            return
+        if name is None:
+            return
+        # the search must not use the table, the book or the tablebases while they are replaced
+        self.handle_stop()
+        if name == "Hash":
+            self.transposition_table.resize(int(self.options.get_value("Hash")))
+        elif name == "Book File":
+            self.open_opening_book(self.options.get_value("Book File"))
+        elif name in ("NalimovPath", "NalimovCache"):
+            self.open_tablebases(self.options.get_value("NalimovPath"), int(self.options.get_value("NalimovCache")))
+        elif name in ("Analysis Cache", "Analysis Cache Size"):
+            self.open_analysis_cache(self.options.get_value("Analysis Cache"),
+                                     int(self.options.get_value("Analysis Cache Size")))
+
+    def open_opening_book(self, path):
+        """Opens the opening book if the "Book File" option changed, "<empty>" closes it"""
+        current = self.opening_book.path if self.opening_book is not None else "<empty>"
+        if path == current:
+            return
+        if self.opening_book is not None:
+            self.opening_book.close()
+            self.opening_book = None
+        if path not in ("<empty>", ""):
+            try:
+                self.opening_book = OpeningBook(path)
+            except (OSError, InvalidBookException) as error:
+                self.send("info string can not open book " + str(error))
+
+    def open_tablebases(self, path, cache_mb):
+        """Finds the tables if the "NalimovPath" option changed and resizes the block cache"""
+        current = ";".join(self.tablebases.paths) if self.tablebases is not None else "<empty>"
+        if path != current:
+            if self.tablebases is not None:
+                self.tablebases.close()
+                self.tablebases = None
+            if path not in ("<empty>", ""):
+                self.tablebases = Tablebases(path, cache_mb)
+                self.send("info string found %d tablebases" % len(self.tablebases.tables))
+        if self.tablebases is not None:
+            self.tablebases.resize_cache(cache_mb)
+
+    def open_analysis_cache(self, path, max_entries):
+        """Opens the database if the "Analysis Cache" option changed, "<empty>" closes it"""
+        current = self.analysis_cache.path if self.analysis_cache is not None else "<empty>"
+        if path != current:
+            if self.analysis_cache is not None:
+                self.analysis_cache.close()
+                self.analysis_cache = None
+            if path not in ("<empty>", ""):
+                try:
+                    self.analysis_cache = AnalysisCache(path, max_entries)
+                except sqlite3.Error as error:
+                    self.send("info string can not open analysis cache " + str(error))
+        if self.analysis_cache is not None:
+            self.analysis_cache.max_entries = max_entries
 
     def handle_position(self, position):
-        self.board = ChessBoard()
-        self.board.evaluate_board()
-        moves = position.split()[3:]
-        for move in moves:
-            fro = (int(move[:2][1]) - 1, ord(move[:2][0].lower()) - ord('a'))
-            to = (int(move[2:4][1]) - 1, ord(move[2:4][0].lower()) - ord('a'))
-            self.board.move(fro, to)
-        # all_moves = self.board.get_all_possible_moves()
-        # for _from, to in all_moves:
-        #    print(str(self.board.board[_from[0]][_from[1]]), to)
+        """
+        Sets up the position, examples: position startpos moves e2e4
+        position fen <fen> moves e7e5. If the fen is the same as
+        before, the moves the position shares with the previous one
+        are kept on the board and only the rest are unmade or played
+        """
+        self.handle_stop()
+        fields = position.split()
+        end = fields.index("moves") if "moves" in fields else len(fields)
+        fen = " ".join(fields[2:end]) if fields[1:2] == ["fen"] else START_FEN
+        moves = fields[end + 1:]
+
+        played = []
+        if self.board is None:
+            self.board = ChessBoard()
+            self.board.transposition_table = self.transposition_table
+        elif self.position is not None and self.position[0] == fen:
+            played = self.position[1]
+        self.board.tablebases = self.tablebases
+        self.board.analysis_cache = self.analysis_cache
+
+        common = 0
+        while common < min(len(played), len(moves)) and played[common] == moves[common]:
+            common += 1
+        # the position is unknown until all moves are played
+        self.position = None
+        try:
+            if played:
+                for move in played[common:]:
+                    self.board.unmake_move()
+            else:
+                self.board.set_fen(fen)
+            for move in moves[common:]:
+                fro, to, promotion = uci_to_squares(move)
+                self.board.move(fro, to, promotion or "q")
+        except (InvalidFenException, InvalidMoveException, ValueError, IndexError):
+            self.send("info string invalid position " + " ".join(fields[1:]))
+            # the board can be left half set up, the next position starts over
+            self.board = None
+            return
+        self.position = (fen, moves)
+
+    def handle_newgame(self):
+        """Forgets the position and clears the caches of the previous game"""
+        self.handle_stop()
+        self.board = None
+        self.position = None
+        self.transposition_table.clear()
+        if self.analysis_cache is not None:
+            self.analysis_cache.flush()
+        if self.parallel_search is not None:
+            self.parallel_search.close()
+            self.parallel_search = None
 
     def handle_go(self, go):
         if self.board is not None:
-            print('bestmove ' + self.board.get_minmax_move())
+            self.handle_stop()
+            if go.split()[1:2] == ["perft"]:
+                self.handle_perft(go)
+                return
+            self.board.null_move_pruning = self.options.get_value("Null Move Pruning") == "true"
+            self.board.late_move_reductions = self.options.get_value("Late Move Reductions") == "true"
+            self.board.display_current_move = self.options.get_value("Display Current Move") == "true"
+            self.board.display_pv_tips = self.options.get_value("Display PV Tips") == "true"
+            self.board.send_info = self.send
+            self.time_manager = TimeManager(go, self.board.turn)
+            book_move = self.get_book_move(self.board, self.time_manager)
+            if book_move is not None:
+                self.send('bestmove ' + book_move)
+                return
+            self.search_thread = threading.Thread(target=self.search, args=(self.board, self.time_manager),
+                                                  daemon=True)
+            self.search_thread.start()
+
+    def handle_perft(self, go):
+        """Counts the moves below every root move, example: go perft 4"""
+        try:
+            depth = max(1, int(go.split()[2]))
+        except (IndexError, ValueError):
+            depth = 1
+        start = time.perf_counter()
+        result = divide(self.board, depth)
+        elapsed = time.perf_counter() - start
+        nodes = sum(count for move, count in result)
+        for move, count in result:
+            self.send(move_to_uci(move) + ": " + str(count))
+        self.send("")
+        self.send("Nodes searched: " + str(nodes))
+        self.send("info nodes {} time {} nps {}".format(nodes, int(elapsed * 1000),
+                                                        int(nodes / elapsed) if elapsed else 0))
+
+    def get_book_move(self, board, time_manager):
+        """Returns the move of the opening book in long algebraic notation or None to search"""
+        if self.opening_book is None or time_manager.infinite or time_manager.ponder:
+            return None
+        if board.get_game_ply() >= int(self.options.get_value("Book Max Ply")):
+            return None
+        move = self.opening_book.get_move(board, self.options.get_value("Best Book Move") == "true")
+        return move_to_uci(move) if move is not None else None
+
+    def search(self, board, time_manager):
+        """Runs on the search thread and sends the best move when the search may report"""
+        workers = ParallelSearch.get_worker_count(int(self.options.get_value("Max CPUs")),
+                                                  int(self.options.get_value("CPU Usage")))
+        if workers > 1:
+            parallel_search = self.get_parallel_search(workers)
+            best_move = parallel_search.get_minmax_move(board, time_manager, board.max_depth)
+            reply = parallel_search.ponder_move
+        else:
+            best_move = board.get_minmax_move(time_manager)
+            reply = None
+        time_manager.wait_for_release()
+        # mated or stalemated, there is no move to play
+        if best_move is None:
+            self.send('bestmove 0000')
+            return
+        ponder_move = board.get_ponder_move(reply) if self.options.get_value("Ponder") == "true" else None
+        if ponder_move is not None:
+            self.send('bestmove ' + move_to_uci(best_move) + ' ponder ' + move_to_uci(ponder_move))
+        else:
+            self.send('bestmove ' + move_to_uci(best_move))
+
+    def get_parallel_search(self, workers):
+        """Returns the pool of search processes, restarted if the number of workers or the tablebases changed"""
+        tablebase_path = ";".join(self.tablebases.paths) if self.tablebases is not None else None
+        if self.parallel_search is not None and (self.parallel_search.workers != workers
+                                                 or self.parallel_search.tablebase_path != tablebase_path):
+            self.parallel_search.close()
+            self.parallel_search = None
+        if self.parallel_search is None:
+            hash_size = max(1, int(self.options.get_value("Hash")) // workers)
+            self.parallel_search = ParallelSearch(workers, hash_size, tablebase_path,
+                                                  int(self.options.get_value("NalimovCache")))
+        return self.parallel_search
 
     def handle_stop(self):
-        raise NotImplementedError
+        """Stops the running search and waits until it sent its best move"""
+        if self.search_thread is not None:
+            self.time_manager.stop()
+            self.search_thread.join()
+            self.search_thread = None
+
+    def handle_ponderhit(self):
+        if self.time_manager is not None:
+            self.time_manager.ponderhit()
 
     def initialize(self):
-        print("id name AIengine")
-        print("id author ika&shota")
-        self.options.send_available_options()
-        print("uciok")
-        sys.stdout.flush()
+        self.send("id name AIengine")
+        self.send("id author ika&shota")
+        self.options.send_available_options(self.send)
+        self.send("uciok")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from libs.analysisCache import AnalysisCache
+from libs.batch import run
+from libs.chessboard import ChessBoard
+from libs.timeManager import TimeManager
+
+
+class test_analysis_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "analysis.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_results_by_key_and_depth(self):
+        cache = AnalysisCache(self.path, batch_size=2)
+        key = (1 << 64) - 5
+        cache.store(key, 4, 796, 35, 1000)
+        self.assertEqual(cache.get(key, 3), (4, 796, 35, 1000))
+        self.assertIsNone(cache.get(key, 5))
+        self.assertIsNone(cache.get(7, 1))
+        cache.store(key, 6, 1234, -20, 9000)
+        self.assertEqual(cache.get(key, 4), (6, 1234, -20, 9000))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        cache.close()
+
+        # the results are written when the cache is closed
+        cache = AnalysisCache(self.path)
+        self.assertEqual(cache.get(key, 5), (6, 1234, -20, 9000))
+        cache.close()
+
+    def test_least_recently_used_results_are_dropped(self):
+        cache = AnalysisCache(self.path, max_entries=2, batch_size=1)
+        cache.store(1, 1, 0, 0, 0)
+        cache.store(2, 1, 0, 0, 0)
+        cache.get(1, 1)
+        cache.store(3, 1, 0, 0, 0)
+        self.assertIsNotNone(cache.get(1, 1))
+        self.assertIsNone(cache.get(2, 1))
+        self.assertIsNotNone(cache.get(3, 1))
+        cache.close()
+
+    def test_rows_are_counted_in_memory(self):
+        cache = AnalysisCache(self.path, max_entries=2, batch_size=1)
+        cache.store(1, 1, 0, 0, 0)
+        cache.store(1, 1, 5, 10, 0)
+        self.assertEqual(cache.count, 1)
+        self.assertEqual(cache.get(1, 1), (1, 5, 10, 0))
+        cache.store(2, 1, 0, 0, 0)
+        cache.store(3, 1, 0, 0, 0)
+        self.assertEqual(cache.count, 2)
+        cache.close()
+        cache = AnalysisCache(self.path)
+        self.assertEqual(cache.count, 2)
+        cache.close()
+
+    def test_search_commits_its_result(self):
+        cache = AnalysisCache(self.path)
+        board = ChessBoard()
+        board.analysis_cache = cache
+        move = board.get_minmax_move(TimeManager("go depth 2"))
+
+        # another process finds the result while the engine still runs
+        reader = AnalysisCache(self.path)
+        self.assertEqual(reader.get(board.hash, 2)[1], move)
+        reader.close()
+        cache.close()
+
+    def test_search_takes_cached_move(self):
+        cache = AnalysisCache(self.path)
+        board = ChessBoard()
+        board.analysis_cache = cache
+        move = board.get_minmax_move(TimeManager("go depth 3"))
+        self.assertGreater(board.nodes, 0)
+        score = board.score
+
+        board.transposition_table.clear()
+        self.assertEqual(board.get_minmax_move(TimeManager("go depth 2")), move)
+        self.assertEqual((board.nodes, board.score), (0, score))
+        # a deeper search is not answered by the cache
+        board.get_minmax_move(TimeManager("go depth 4"))
+        self.assertGreater(board.nodes, 0)
+        cache.close()
+
+    def test_search_limited_by_time_starts_from_cached_move(self):
+        cache = AnalysisCache(self.path)
+        board = ChessBoard()
+        board.analysis_cache = cache
+        board.get_minmax_move(TimeManager("go depth 3"))
+        score = board.score
+
+        # the stored depth and score are sent, not the depth asked for
+        lines = []
+        board.send_info = lines.append
+        board.get_minmax_move(TimeManager("go depth 2"))
+        self.assertTrue(lines[0].startswith("info depth 3 seldepth 0 score cp %d " % score))
+
+        del lines[:]
+        board.get_minmax_move(TimeManager("go nodes 20000"))
+        self.assertTrue(lines[0].startswith("info depth 3 "))
+        self.assertEqual([int(line.split()[2]) for line in lines if " pv " in line][1:2], [4])
+        self.assertGreater(board.nodes, 0)
+        self.assertEqual(cache.get(board.hash, 4)[1], board.best_move)
+        cache.close()
+
+    def test_batch_runs_share_the_cache(self):
+        positions = os.path.join(self.directory, "positions.epd")
+        with open(positions, "w") as file:
+            file.write("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq -\n"
+                       "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1\n")
+        first, second = os.path.join(self.directory, "first.jsonl"), os.path.join(self.directory, "second.jsonl")
+        run(positions, first, "go depth 2", workers=2, hash_size=1, cache_path=self.path)
+        run(positions, second, "go depth 2", workers=2, hash_size=1, cache_path=self.path)
+
+        with open(first) as file:
+            first_results = [json.loads(line) for line in file]
+        with open(second) as file:
+            second_results = [json.loads(line) for line in file]
+        self.assertEqual([(result["bestmove"], result["score"]) for result in first_results],
+                         [(result["bestmove"], result["score"]) for result in second_results])
+        self.assertEqual([result["nodes"] for result in second_results], [0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from libs.batch import read_positions, run
+
+POSITIONS = """# positions of the test
+rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
+
+r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - bm Qxf7#; id "scholar";
+8/8/8/8/8/8/8/8 x - -
+rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3
+"""
+
+
+class test_batch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, "positions.epd")
+        self.output = os.path.join(self.directory, "results.jsonl")
+        with open(self.input, "w") as file:
+            file.write(POSITIONS)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_results(self):
+        with open(self.output) as file:
+            return [json.loads(line) for line in file]
+
+    def test_read_positions(self):
+        positions = list(read_positions(POSITIONS.splitlines()))
+        self.assertEqual([index for index, fen, position_id in positions], [0, 1, 2, 3])
+        self.assertEqual(positions[1], (1, "r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq -",
+                                        "scholar"))
+        self.assertEqual(positions[3][1], "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq -")
+
+    def test_results_in_input_order(self):
+        self.assertEqual(run(self.input, self.output, "go depth 2", workers=2, hash_size=1), 4)
+        results = self.read_results()
+        self.assertEqual([result["index"] for result in results], [0, 1, 2, 3])
+        self.assertEqual((results[1]["id"], results[1]["bestmove"]), ("scholar", "h5f7"))
+        self.assertEqual(results[2]["error"], "invalid fen")
+        self.assertIsNone(results[3]["bestmove"])
+        self.assertGreater(results[0]["nodes"], 0)
+
+    def test_resume(self):
+        run(self.input, self.output, "go depth 1")
+        with open(self.output) as file:
+            first = file.readline()
+        # the run was interrupted while the second result was written
+        with open(self.output, "w") as file:
+            file.write(first + '{"index": 1, "fen"')
+
+        self.assertEqual(run(self.input, self.output, "go depth 1"), 3)
+        results = self.read_results()
+        self.assertEqual([result["index"] for result in results], [0, 1, 2, 3])
+        self.assertEqual(json.dumps(results[0]) + "\n", first)
+
+
+if __name__ == '__main__':
+    unittest.main()
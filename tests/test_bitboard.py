@@ -0,0 +1,42 @@
+import unittest
+
+from libs.bitboard import (
+    KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, rook_attacks, bishop_attacks, queen_attacks, popcount
+)
+
+
+def square(name):
+    return (int(name[1]) - 1) * 8 + ord(name[0]) - ord('a')
+
+
+def bitboard(*names):
+    return sum(1 << square(name) for name in names)
+
+
+class test_bitboard(unittest.TestCase):
+
+    def test_jumper_attacks(self):
+        self.assertEqual(KNIGHT_ATTACKS[square("a1")], bitboard("b3", "c2"))
+        self.assertEqual(popcount(KNIGHT_ATTACKS[square("d4")]), 8)
+        self.assertEqual(KING_ATTACKS[square("h8")], bitboard("g8", "g7", "h7"))
+
+    def test_pawn_attacks(self):
+        self.assertEqual(PAWN_ATTACKS[0][square("e4")], bitboard("d5", "f5"))
+        self.assertEqual(PAWN_ATTACKS[1][square("a7")], bitboard("b6"))
+
+    def test_slider_attacks_stop_at_blockers(self):
+        occupancy = bitboard("d6", "f4", "b2")
+        self.assertEqual(rook_attacks(square("d4"), occupancy),
+                         bitboard("d5", "d6", "d3", "d2", "d1", "e4", "f4", "c4", "b4", "a4"))
+        self.assertEqual(bishop_attacks(square("d4"), occupancy),
+                         bitboard("e5", "f6", "g7", "h8", "c5", "b6", "a7", "e3", "f2", "g1", "c3", "b2"))
+        self.assertEqual(queen_attacks(square("d4"), occupancy),
+                         rook_attacks(square("d4"), occupancy) | bishop_attacks(square("d4"), occupancy))
+
+    def test_popcount(self):
+        self.assertEqual(popcount(bitboard("h8", "a1", "e4")), 3)
+        self.assertEqual(popcount(0), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import threading
+import time
 import unittest
 
 from libs.chessboard import ChessBoard
+from libs.moves import move_to_uci
+from libs.zobrist import hash_board
+from libs.timeManager import TimeManager
 
 class test_chessboard(unittest.TestCase):
     
@@ -24,6 +29,26 @@ class test_chessboard(unittest.TestCase):
 
         self.assertEqual(board.evaluate_board(), 895)
 
+    def test_incremental_evaluation_matches_computed(self):
+        board = ChessBoard()
+        for fro, to in [((1, 4), (3, 4)), ((6, 3), (4, 3)), ((3, 4), (4, 3)), ((7, 3), (4, 3))]:
+            board.move(fro, to)
+            self.assertEqual(board.compute_evaluation(), board.evaluate_board())
+        for move in board.get_all_legal_moves():
+            board.play_move(move)
+            self.assertEqual(board.compute_evaluation(), board.evaluate_board())
+            board.unmake_move()
+
+    def test_debug_evaluation_detects_mismatch(self):
+        board = ChessBoard()
+        board.evaluation += 1
+        self.assertEqual(board.evaluate_board(), 1)
+        try:
+            ChessBoard.debug_evaluation = True
+            self.assertRaises(RuntimeError, board.evaluate_board)
+        finally:
+            ChessBoard.debug_evaluation = False
+
     def test_minmax_move(self):
         position = "position startpos moves e2e4"
         board = ChessBoard()
@@ -34,7 +59,311 @@ class test_chessboard(unittest.TestCase):
             to = (int(move[2:4][1]) - 1, ord(move[2:4][0].lower()) - ord('a'))
             board.move(fro, to)
 
-        self.assertEqual("b8c6", board.get_minmax_move())
+        self.assertEqual("g8f6", move_to_uci(board.get_minmax_move()))
+
+    def test_make_unmake_move_restores_board(self):
+        board = ChessBoard()
+        for fro, to in [((1, 4), (3, 4)), ((6, 3), (4, 3)), ((3, 4), (4, 3))]:
+            board.move(fro, to)
+        figures = list(board.board)
+        castling_rights = board.castling_rights
+        for move in board.get_all_legal_moves():
+            board.play_move(move)
+            for reply in board.get_all_legal_moves():
+                board.play_move(reply)
+                board.unmake_move()
+            board.unmake_move()
+            self.assertEqual(figures, board.board)
+            self.assertEqual(castling_rights, board.castling_rights)
+            self.assertEqual((0, 4), tuple(board.white_king_pos))
+            self.assertEqual(len(board.dead_figures), 1)
+        self.assertEqual(len(board.undo_stack), 3)
+
+    def test_make_unmake_castling_and_promotion(self):
+        board = ChessBoard()
+        for square in [(0, 5), (0, 6), (6, 0)]:
+            board.set_piece_at(square, None)
+        board.set_piece_at((6, 0), board.get_piece_at((1, 0)))
+        board.set_piece_at((1, 0), None)
+        figures = list(board.board)
+        castling_rights = board.castling_rights
+
+        board.make_move((0, 4), (0, 6))
+        self.assertEqual("White Rook", str(board.get_piece_at((0, 5))))
+        self.assertEqual((0, 6), tuple(board.white_king_pos))
+        board.make_move((6, 1), (5, 1))
+        board.make_move((6, 0), (7, 1), "n")
+        self.assertEqual("White Knight", str(board.get_piece_at((7, 1))))
+
+        for _ in range(3):
+            board.unmake_move()
+        self.assertEqual(figures, board.board)
+        self.assertEqual((0, 4), tuple(board.white_king_pos))
+        self.assertEqual(castling_rights, board.castling_rights)
+
+    def test_zobrist_hash_follows_moves(self):
+        board = ChessBoard()
+        start = board.hash
+        for fro, to in [((0, 6), (2, 5)), ((7, 6), (5, 5)), ((2, 5), (0, 6)), ((5, 5), (7, 6))]:
+            board.move(fro, to)
+            self.assertEqual(hash_board(board), board.hash)
+        self.assertEqual(start, board.hash)
+
+        for move in board.get_all_legal_moves():
+            board.play_move(move)
+            self.assertEqual(hash_board(board), board.hash)
+            board.unmake_move()
+        self.assertEqual(start, board.hash)
+
+    def test_zobrist_hash_castling_and_en_passant(self):
+        board = ChessBoard()
+        for fro, to in [((1, 4), (3, 4)), ((6, 0), (4, 0)), ((3, 4), (4, 4)), ((6, 3), (4, 3))]:
+            board.move(fro, to)
+        self.assertEqual((5, 3), board.en_passant)
+        self.assertEqual(hash_board(board), board.hash)
+
+        board.move((0, 4), (1, 4))
+        self.assertIsNone(board.en_passant)
+        self.assertEqual(12, board.castling_rights)
+        self.assertEqual(hash_board(board), board.hash)
+
+    def test_bitboards_follow_moves(self):
+        board = ChessBoard()
+        for fro, to in [((1, 4), (3, 4)), ((6, 3), (4, 3)), ((3, 4), (4, 3)), ((7, 3), (4, 3))]:
+            board.move(fro, to)
+        for move in board.get_all_legal_moves():
+            board.play_move(move)
+            for index in range(12):
+                squares = [square for square, figure in enumerate(board.board)
+                           if figure is not None and figure.index == index]
+                self.assertEqual(sum(1 << square for square in squares), board.bitboards[index])
+            board.unmake_move()
+
+    def test_kings_can_not_stand_next_to_each_other(self):
+        board = ChessBoard()
+        for x, y, figure in list(board.get_all_figures()):
+            if figure is not None and not str(figure).endswith("King"):
+                board.set_piece_at((x, y), None)
+        board.set_piece_at((5, 4), board.get_piece_at((0, 4)))
+        board.set_piece_at((0, 4), None)
+
+        self.assertEqual(sorted(move_to_uci(move) for move in board.get_all_legal_moves()),
+                         ["e6d5", "e6d6", "e6e5", "e6f5", "e6f6"])
+
+    def test_iterative_deepening_limits(self):
+        board = ChessBoard()
+        board.move((1, 4), (3, 4))
+
+        board.get_minmax_move(TimeManager("go depth 2", board.turn))
+        self.assertEqual(board.search_depth, 2)
+        self.assertIn(board.best_move, board.get_all_legal_moves())
+
+        board.get_minmax_move(TimeManager("go nodes 2000", board.turn))
+        self.assertLess(board.nodes, 2000 + 256)
+        self.assertIn(board.best_move, board.get_all_legal_moves())
+        self.assertEqual(len(board.undo_stack), 1)
+
+    def test_search_is_stopped_from_another_thread(self):
+        board = ChessBoard()
+        time_manager = TimeManager("go infinite", board.turn)
+        search = threading.Thread(target=board.get_minmax_move, args=(time_manager,))
+        search.start()
+        time.sleep(0.2)
+        time_manager.stop()
+        search.join(1)
+
+        self.assertFalse(search.is_alive())
+        self.assertIn(board.best_move, board.get_all_legal_moves())
+        self.assertEqual(board.undo_stack, [])
+
+    def test_move_ordering_statistics(self):
+        board = ChessBoard()
+        board.set_fen("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 1")
+        board.get_minmax_move(TimeManager("go depth 3"))
+
+        self.assertGreater(board.number_cutoffs, 0)
+        self.assertLessEqual(board.number_first_move_cutoffs, board.number_cutoffs)
+        self.assertLess(board.number_prunned_moves, board.number_possible_moves)
+        self.assertTrue(any(killers[0] is not None for killers in board.killer_moves))
+        self.assertTrue(any(any(history) for history in board.history))
+
+        board.clear_move_ordering()
+        self.assertEqual((board.number_cutoffs, board.number_prunned_moves), (0, 0))
+        self.assertFalse(any(any(history) for history in board.history))
+
+    def test_quiescence_search_sees_recapture(self):
+        board = ChessBoard()
+        board.set_fen("4k3/8/8/3q4/8/3P4/2P5/4K3 b - - 0 1")
+        self.assertNotEqual(move_to_uci(board.get_minmax_move(TimeManager("go depth 1"))), "d5d3")
+
+        board.set_fen("4k3/8/8/3q4/8/3P4/8/4K3 b - - 0 1")
+        self.assertEqual(move_to_uci(board.get_minmax_move(TimeManager("go depth 1"))), "d5d3")
+
+    def test_null_move_restores_position(self):
+        board = ChessBoard()
+        for fro, to in [((1, 4), (3, 4)), ((6, 0), (5, 0)), ((3, 4), (4, 4)), ((6, 3), (4, 3))]:
+            board.move(fro, to)
+        key, en_passant, turn = board.hash, board.en_passant, board.turn
+
+        board.make_null_move()
+        self.assertIsNone(board.en_passant)
+        self.assertNotEqual(board.turn, turn)
+        self.assertEqual(hash_board(board), board.hash)
+        board.unmake_move()
+        self.assertEqual((key, en_passant, turn), (board.hash, board.en_passant, board.turn))
+
+    def test_pruning_options_reduce_nodes(self):
+        nodes = []
+        for enabled in (False, True):
+            board = ChessBoard()
+            board.set_fen("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R b KQ - 0 1")
+            board.null_move_pruning = board.late_move_reductions = enabled
+            board.get_minmax_move(TimeManager("go depth 4"))
+            nodes.append(board.nodes)
+            self.assertEqual(board.undo_stack, [])
+        self.assertLess(nodes[1], nodes[0])
+
+    def test_search_plays_for_the_side_on_turn(self):
+        board = ChessBoard()
+        # white wins the black queen, black wins the white queen
+        board.set_fen("4k3/8/8/3q4/8/8/3R4/4K3 w - - 0 1")
+        self.assertEqual(move_to_uci(board.get_minmax_move(TimeManager("go depth 3"))), "d2d5")
+        self.assertGreater(board.score, 0)
+
+        board.set_fen("4k3/8/8/3r4/8/8/3Q4/4K3 b - - 0 1")
+        self.assertEqual(move_to_uci(board.get_minmax_move(TimeManager("go depth 3"))), "d5d2")
+        self.assertGreater(board.score, 0)
+
+    def test_aspiration_window_keeps_the_result(self):
+        board = ChessBoard()
+        board.set_fen("r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 1")
+        board.get_minmax_move(TimeManager("go depth 4"))
+        score = board.score
+
+        # the same iteration searched with the whole window gives the same score
+        board.transposition_table.clear()
+        board.search_depth = 4
+        board.best_move = None
+        self.assertEqual(board.negamax(float("-inf"), float("inf"), 4)[0], score)
+
+    def test_search_sends_principal_variation(self):
+        board = ChessBoard()
+        lines = []
+        board.send_info = lines.append
+        move = board.get_minmax_move(TimeManager("go depth 4"))
+
+        self.assertEqual([line.split()[2] for line in lines], ["1", "2", "3", "4"])
+        fields = lines[-1].split()
+        self.assertEqual(fields[fields.index("score") + 1:fields.index("score") + 3], ["cp", str(board.score)])
+        pv = fields[fields.index("pv") + 1:]
+        self.assertEqual(pv[0], move_to_uci(move))
+        # every move of the principal variation is legal in its position
+        for uci in pv:
+            legal = {move_to_uci(legal_move): legal_move for legal_move in board.get_all_legal_moves()}
+            board.play_move(legal[uci])
+        self.assertGreaterEqual(int(fields[fields.index("seldepth") + 1]), 4)
+
+    def test_tables_are_kept_by_the_ply_played(self):
+        board = ChessBoard()
+        board.move((1, 4), (3, 4))
+        board.root_ply = len(board.undo_stack)
+        # a subtree searched with less depth than the iteration left, as after a reduction
+        board.search_depth = 5
+        utility, move = board.negamax(float("-inf"), float("inf"), 2)
+        self.assertEqual(board.pv_table[0][0], move)
+        self.assertEqual(len(board.pv_table[0]), 2)
+
+    def test_search_tells_stalemate_from_mate(self):
+        board = ChessBoard()
+        board.set_fen("7k/8/5KQ1/8/8/8/8/8 b - - 1 1")
+        board.search_depth = 4
+        self.assertEqual(board.negamax(float("-inf"), float("inf"), 3), (0, None))
+        board.set_fen("7k/6Q1/5K2/8/8/8/8/8 b - - 1 1")
+        self.assertEqual(board.negamax(float("-inf"), float("inf"), 3), (-20000, None))
+
+        # Qf4 would stalemate the king
+        board.set_fen("k7/8/1K6/8/8/8/8/2Q5 w - - 0 1")
+        self.assertEqual(move_to_uci(board.get_minmax_move(TimeManager("go depth 4"))), "c1c8")
+        self.assertEqual(board.score, 20000 - 1)
+
+    def test_mate_is_sent_as_mate(self):
+        board = ChessBoard()
+        board.set_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        lines = []
+        board.send_info = lines.append
+        board.get_minmax_move(TimeManager("go depth 4"))
+
+        # the search wins the king, the line ends at the mate
+        self.assertGreater(board.score, 10000)
+        fields = lines[-1].split()
+        self.assertEqual(fields[fields.index("score") + 1:fields.index("score") + 3], ["mate", "1"])
+        self.assertEqual(fields[fields.index("pv") + 1:], ["a1a8"])
+
+    def test_search_does_not_stalemate(self):
+        board = ChessBoard()
+        board.set_fen("7k/8/5K2/8/8/8/8/6Q1 w - - 0 1")
+        lines = []
+        board.send_info = lines.append
+        move = board.get_minmax_move(TimeManager("go depth 5"))
+
+        # Qg6 stalemates, Qg7 mates
+        self.assertNotEqual(move_to_uci(move), "g1g6")
+        self.assertEqual(move_to_uci(move), "g1g7")
+        self.assertIn("score mate 1 ", lines[-1])
+
+    def test_legal_principal_variation(self):
+        board = ChessBoard()
+        board.set_fen("7k/8/5K2/8/8/8/8/6R1 w - - 0 1")
+        # the king cannot take the defended rook
+        pv = [board.encode_move((0, 6), (6, 6)), board.encode_move((7, 7), (6, 6)),
+              board.encode_move((5, 5), (6, 6))]
+        self.assertEqual(board.get_legal_pv(pv, 450), (pv[:1], 450))
+        mate = [board.encode_move((5, 5), (6, 5)), board.encode_move((7, 7), (6, 7)),
+                board.encode_move((0, 6), (0, 7))]
+        self.assertEqual(board.get_legal_pv(mate, 19997), (mate, 9997))
+        # a mate beyond the line is sent as the first one possible after it
+        self.assertEqual(board.get_legal_pv([], 20000), ([], 9999))
+        self.assertEqual(board.get_legal_pv([], -20000), ([], -9998))
+
+    def test_repetition_and_fifty_move_rule(self):
+        board = ChessBoard()
+        knight_moves = [((0, 6), (2, 5)), ((7, 6), (5, 5)), ((2, 5), (0, 6)), ((5, 5), (7, 6))]
+        for fro, to in knight_moves:
+            board.move(fro, to)
+        # the start position is on the board the second time
+        self.assertFalse(board.is_draw())
+        self.assertTrue(board.is_draw(root_ply=0))
+        self.assertFalse(board.is_draw(root_ply=1))
+        for fro, to in knight_moves:
+            board.move(fro, to)
+        self.assertTrue(board.is_draw())
+        board.unmake_move()
+        self.assertFalse(board.is_draw())
+        self.assertEqual(board.halfmove_clock, 7)
+        board.move((6, 4), (4, 4))
+        self.assertEqual(board.halfmove_clock, 0)
+
+        board.set_fen("7k/8/8/8/8/8/8/1Q5K w - - 99 80")
+        self.assertFalse(board.is_draw())
+        board.make_move((0, 1), (1, 1))
+        self.assertTrue(board.is_draw())
+        board.unmake_move()
+        self.assertEqual(board.halfmove_clock, 99)
+        # a mate with the hundredth ply wins
+        board.set_fen("7k/8/6K1/8/8/8/8/Q7 w - - 99 80")
+        board.make_move((0, 0), (7, 0))
+        self.assertEqual(board.halfmove_clock, 100)
+        self.assertFalse(board.is_draw())
+
+    def test_search_scores_draws(self):
+        board = ChessBoard()
+        board.set_fen("7k/8/8/8/8/8/8/1Q5K w - - 99 80")
+        board.get_minmax_move(TimeManager("go depth 3"))
+        self.assertEqual(board.score, 0)
+
+        board.set_fen("7k/8/8/8/8/8/8/1Q5K w - - 0 80")
+        board.get_minmax_move(TimeManager("go depth 3"))
+        self.assertGreater(board.score, 800)
 
     def test_get_all_figures_basic(self):
         figures = [(0, 0, 'White Rook'), (0, 1, 'White Knight'), (0, 2, 'White Bishop'), (0, 3, 'White Queen'),
@@ -0,0 +1,34 @@
+import unittest
+
+from libs.engineOptions import EngineOptions
+from libs.exceptions import InvalidOptionException
+
+
+class test_engine_options(unittest.TestCase):
+
+    def test_set_option(self):
+        options = EngineOptions()
+        self.assertEqual(options.set_option("setoption name Hash value 64"), "Hash")
+        self.assertEqual(options.get_value("Hash"), "64")
+        self.assertIsNone(options.set_option("setoption name Hash value 64"))
+        self.assertEqual(options.set_option("setoption name Book File value C:\\My Books\\book.bin"), "Book File")
+        self.assertEqual(options.get_value("Book File"), "C:\\My Books\\book.bin")
+
+    def test_spin_values_are_clamped(self):
+        options = EngineOptions()
+        options.set_option("setoption name Hash value 100000")
+        self.assertEqual(options.get_value("Hash"), "4096")
+        options.set_option("setoption name Hash value 0")
+        self.assertEqual(options.get_value("Hash"), "1")
+
+    def test_invalid_values_are_rejected(self):
+        options = EngineOptions()
+        for option in ("setoption name Hash value abc", "setoption name Ponder value yes",
+                       "setoption name Unknown value 1"):
+            with self.assertRaises(InvalidOptionException):
+                options.set_option(option)
+        self.assertEqual((options.get_value("Hash"), options.get_value("Ponder")), ("32", "true"))
+
+
+if __name__ == '__main__':
+    unittest.main()
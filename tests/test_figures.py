@@ -1,6 +1,7 @@
 import unittest
 
 from libs.utils import Vector2
+from libs.exceptions import InvalidMoveException
 from libs.figures import Figure, Queen, Knight, Bishop, Rook, Pawn, King
 
 """
@@ -118,5 +119,28 @@ class test_figures(unittest.TestCase):
             moves = pawn.get_all_moves(pos)
             self.assertEqual(moves, [])
 
+    def test_figures_are_shared_and_immutable(self):
+        self.assertIs(Pawn(Figure.Color.WHITE), Pawn(Figure.Color.WHITE))
+        self.assertIsNot(Pawn(Figure.Color.WHITE), Pawn(Figure.Color.BLACK))
+        self.assertRaises(AttributeError, setattr, Queen(Figure.Color.BLACK), "color", Figure.Color.WHITE)
+        self.assertEqual(len(King.square_values[Figure.Color.WHITE]), 64)
+        self.assertEqual(Pawn.square_values[Figure.Color.WHITE][6 * 8], 50)
+        self.assertEqual(Pawn.square_values[Figure.Color.BLACK][1 * 8], 50)
+
+
+    def test_paths_on_square_indexes(self):
+        # squares are row * 8 + column, a1 is 0 and h8 is 63
+        self.assertEqual(Rook(Figure.Color.WHITE).path(0, 24), [8, 16])
+        self.assertEqual(Bishop(Figure.Color.WHITE).path(2, 29), [11, 20])
+        self.assertEqual(Queen(Figure.Color.BLACK).path(59, 56), [58, 57])
+        self.assertEqual(Pawn(Figure.Color.WHITE).path(12, 28), [20])
+        self.assertEqual(Pawn(Figure.Color.BLACK).path(52, 43), [])
+        self.assertEqual(Knight(Figure.Color.WHITE).path(1, 18), [])
+        # a step from the h file must not wrap around to the a file
+        self.assertRaises(InvalidMoveException, Rook(Figure.Color.WHITE).path, 7, 8)
+        self.assertRaises(InvalidMoveException, Bishop(Figure.Color.WHITE).path, 7, 16)
+        self.assertRaises(InvalidMoveException, King(Figure.Color.WHITE).path, 7, 8)
+        self.assertRaises(InvalidMoveException, Pawn(Figure.Color.WHITE).path, 15, 24)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+
+from libs.chessboard import ChessBoard
+from libs.timeManager import TimeManager
+from main import GameEngine
+
+
+class test_main(unittest.TestCase):
+
+    def test_position_plays_new_moves_only(self):
+        engine = GameEngine()
+        engine.handle_position("position startpos moves e2e4 e7e5")
+        board = engine.board
+        engine.handle_position("position startpos moves e2e4 e7e5 g1f3 b8c6")
+        self.assertIs(engine.board, board)
+        self.assertEqual(len(board.undo_stack), 4)
+
+        # a different continuation takes back the moves that are not shared
+        engine.handle_position("position startpos moves e2e4 c7c5")
+        expected = ChessBoard()
+        expected.make_move((1, 4), (3, 4))
+        expected.make_move((6, 2), (4, 2))
+        self.assertEqual((board.board, board.hash, board.turn), (expected.board, expected.hash, expected.turn))
+        self.assertEqual(len(board.undo_stack), 2)
+
+    def test_position_fen(self):
+        engine = GameEngine()
+        engine.handle_position("position startpos moves e2e4")
+        engine.handle_position("position fen 7k/Q7/6K1/8/8/8/8/8 w - - 0 1 moves a7g7")
+        expected = ChessBoard()
+        expected.set_fen("7k/6Q1/6K1/8/8/8/8/8 b - - 1 1")
+        self.assertEqual((engine.board.board, engine.board.hash), (expected.board, expected.hash))
+        self.assertEqual(engine.position, ("7k/Q7/6K1/8/8/8/8/8 w - - 0 1", ["a7g7"]))
+
+    def test_invalid_position_drops_the_board(self):
+        engine = GameEngine()
+        lines = []
+        engine.send = lines.append
+        engine.handle_position("position startpos moves e2e4")
+        engine.handle_position("position fen rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w KQkq - 0 1")
+        self.assertEqual(lines, ["info string invalid position fen "
+                                 "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w KQkq - 0 1"])
+        self.assertIsNone(engine.board)
+        self.assertIsNone(engine.position)
+
+        engine.handle_position("position startpos moves e2e4")
+        expected = ChessBoard()
+        expected.make_move((1, 4), (3, 4))
+        self.assertEqual((engine.board.board, engine.board.hash), (expected.board, expected.hash))
+
+    def test_newgame_clears_caches(self):
+        engine = GameEngine()
+        engine.handle_position("position startpos moves d2d4")
+        key = engine.board.hash
+        engine.transposition_table.store(key, 1, engine.transposition_table.EXACT, 0, None)
+        engine.handle_position("position startpos moves d2d4")
+        self.assertIsNotNone(engine.transposition_table.probe(key))
+        engine.handle_newgame()
+        self.assertIsNone(engine.board)
+        self.assertIsNone(engine.transposition_table.probe(key))
+
+
+    def test_setoption_applies_the_changed_option(self):
+        engine = GameEngine()
+        lines = []
+        engine.send = lines.append
+        engine.handle_setoption("setoption name Hash value abc")
+        self.assertEqual(lines, ["info string Hash is not a number: abc"])
+        self.assertEqual(engine.transposition_table.size_mb, 32)
+
+        engine.handle_setoption("setoption name Hash value 8")
+        self.assertEqual(engine.transposition_table.size_mb, 8)
+        # setting another option keeps the table
+        key = 12345
+        engine.transposition_table.store(key, 1, engine.transposition_table.EXACT, 0, None)
+        engine.handle_setoption("setoption name Ponder value false")
+        engine.handle_setoption("setoption name Hash value 8")
+        self.assertIsNotNone(engine.transposition_table.probe(key))
+
+    def test_setoption_stops_the_search(self):
+        engine = GameEngine()
+        lines = []
+        engine.send = lines.append
+        engine.options.set_option("setoption name Max CPUs value 1")
+        engine.handle_position("position startpos")
+        engine.handle_go("go infinite")
+        engine.handle_setoption("setoption name Hash value 64")
+        self.assertIsNone(engine.search_thread)
+        self.assertTrue(lines[-1].startswith("bestmove "))
+        self.assertEqual(engine.transposition_table.size_mb, 64)
+
+    def test_search_without_legal_moves(self):
+        engine = GameEngine()
+        lines = []
+        engine.send = lines.append
+        engine.options.set_option("setoption name Max CPUs value 1")
+        engine.handle_position("position fen 7k/6Q1/6K1/8/8/8/8/8 b - - 0 1")
+        engine.search(engine.board, TimeManager("go depth 3", engine.board.turn))
+        self.assertEqual(lines, ["bestmove 0000"])
+
+if __name__ == '__main__':
+    unittest.main()
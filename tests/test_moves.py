@@ -0,0 +1,39 @@
+import unittest
+
+from libs.chessboard import ChessBoard
+from libs.moves import (
+    NORMAL, PROMOTION, EN_PASSANT, CASTLING, FLAGS, encode_move, get_from, get_to, get_promotion, move_to_uci,
+    uci_to_squares
+)
+
+
+class test_moves(unittest.TestCase):
+
+    def test_encoding(self):
+        move = encode_move(52, 60, PROMOTION, "n")
+        self.assertLess(move, 1 << 16)
+        self.assertEqual((get_from(move), get_to(move), get_promotion(move)), (52, 60, "n"))
+        self.assertEqual(move_to_uci(move), "e7e8n")
+        self.assertEqual(move_to_uci(encode_move(12, 28)), "e2e4")
+        self.assertEqual(uci_to_squares("e7e8q"), ((6, 4), (7, 4), "q"))
+        self.assertEqual(uci_to_squares("g1f3"), ((0, 6), (2, 5), ""))
+
+    def test_board_decides_the_flags(self):
+        board = ChessBoard()
+        board.set_fen("r3k2r/1P6/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1")
+        self.assertEqual(board.encode_move((0, 4), (0, 6)) & FLAGS, CASTLING)
+        self.assertEqual(board.encode_move((4, 4), (5, 3)) & FLAGS, EN_PASSANT)
+        self.assertEqual(board.encode_move((6, 1), (7, 1), "r") & FLAGS, PROMOTION)
+        self.assertEqual(board.encode_move((0, 0), (0, 3)) & FLAGS, NORMAL)
+        self.assertIn(board.encode_move((6, 1), (7, 0), "b"), board.get_all_legal_moves())
+
+    def test_search_reuses_move_lists(self):
+        board = ChessBoard()
+        move_lists = list(board.move_lists)
+        board.get_minmax_move()
+        self.assertTrue(all(a is b for a, b in zip(move_lists, board.move_lists)))
+        self.assertGreater(len(board.quiet_move_lists[1]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
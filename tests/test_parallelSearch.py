@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from libs.chessboard import ChessBoard
+from libs.moves import move_to_uci
+from libs.parallelSearch import ParallelSearch, _search_root_move
+from libs.tablebase import Table
+from libs.timeManager import TimeManager
+
+
+class test_parallel_search(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.parallel_search = ParallelSearch(2, 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.parallel_search.close()
+
+    def test_worker_count(self):
+        self.assertEqual(ParallelSearch.get_worker_count(1, 100), 1)
+        self.assertEqual(ParallelSearch.get_worker_count(2048, 1), 1)
+        self.assertGreaterEqual(ParallelSearch.get_worker_count(2048, 100), 1)
+
+    def test_finds_the_same_capture_as_the_serial_search(self):
+        board = ChessBoard()
+        for fro, to in [((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 3), (4, 7))]:
+            board.move(fro, to)
+        position = list(board.board)
+
+        move = self.parallel_search.get_minmax_move(board, TimeManager("go depth 3", board.turn), 4)
+
+        self.assertEqual(move_to_uci(move), "f6h5")
+        self.assertEqual(move, ChessBoard(board).get_minmax_move(TimeManager("go depth 3", board.turn)))
+        self.assertEqual(position, board.board)
+        self.assertGreater(self.parallel_search.nodes, 0)
+
+    def test_sends_the_info_of_the_serial_search(self):
+        board = ChessBoard()
+        board.set_fen("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        lines = []
+        board.send_info = lines.append
+        self.parallel_search.get_minmax_move(board, TimeManager("go depth 3", board.turn), 4)
+
+        fields = lines[-1].split()
+        for name in ("depth", "seldepth", "nodes", "hashfull"):
+            self.assertIn(name, fields)
+        self.assertEqual(fields[fields.index("score") + 1:fields.index("score") + 3], ["mate", "1"])
+        self.assertEqual(fields[fields.index("pv") + 1:], ["a1a8"])
+
+    def test_stops_at_node_limit(self):
+        board = ChessBoard()
+        move = self.parallel_search.get_minmax_move(board, TimeManager("go nodes 3000", board.turn), 4)
+        self.assertIn(board.best_move, board.get_all_legal_moves())
+        self.assertEqual(move, board.best_move)
+
+
+    def test_workers_probe_the_tablebases(self):
+        # an empty KQvK table scores every position as a draw
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, "KQvK.tb"), "wb") as file:
+            file.write(bytes(Table("KQvK").size))
+        board = ChessBoard()
+        board.set_fen("1r5k/Q7/6K1/8/8/8/8/8 w - - 0 1")
+        task = (0, board, board.encode_move((6, 0), (7, 1)), 2, None, 1)
+
+        parallel_search = ParallelSearch(1, 1, directory)
+        try:
+            self.assertEqual(parallel_search.pool.apply(_search_root_move, (task,))[1], 0)
+        finally:
+            parallel_search.close()
+            shutil.rmtree(directory)
+        # without the tables the capture mates
+        self.parallel_search.stopped.clear()
+        self.parallel_search.shared_alpha.value = float("-inf")
+        self.assertGreater(self.parallel_search.pool.apply(_search_root_move, (task,))[1], 1000)
+
+if __name__ == '__main__':
+    unittest.main()
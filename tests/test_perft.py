@@ -0,0 +1,75 @@
+import unittest
+
+from libs.chessboard import ChessBoard
+from libs.exceptions import InvalidFenException
+from libs.moves import move_to_uci
+from libs.perft import perft, divide, PERFT_POSITIONS
+
+
+class test_perft(unittest.TestCase):
+
+    def test_bundled_positions(self):
+        for name, fen, expected in PERFT_POSITIONS:
+            board = ChessBoard()
+            board.set_fen(fen)
+            key = board.hash
+            for depth, nodes in enumerate(expected[:2], 1):
+                self.assertEqual(perft(board, depth), nodes, name)
+            self.assertEqual(board.hash, key)
+
+    def test_divide_sums_to_perft(self):
+        board = ChessBoard()
+        result = divide(board, 2)
+
+        self.assertEqual(len(result), 20)
+        self.assertIn(("e2e4", 20), [(move_to_uci(move), count) for move, count in result])
+        self.assertEqual(sum(count for move, count in result), 400)
+
+    def test_en_passant_and_promotion(self):
+        board = ChessBoard()
+        board.set_fen("4k3/1P6/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        moves = [move_to_uci(move) for move in board.get_all_legal_moves()]
+
+        self.assertIn("e5d6", moves)
+        self.assertEqual([move for move in moves if move.startswith("b7")], ["b7b8q", "b7b8r", "b7b8b", "b7b8n"])
+
+        board.make_move((4, 4), (5, 3))
+        self.assertIsNone(board.get_piece_at((4, 3)))
+        board.unmake_move()
+        self.assertEqual(str(board.get_piece_at((4, 3))), "Black Pawn")
+
+    def test_castling_through_check(self):
+        board = ChessBoard()
+        board.set_fen("4k3/8/8/8/8/8/5r2/R3K2R w KQ - 0 1")
+        moves = [move_to_uci(move) for move in board.get_all_legal_moves()]
+
+        self.assertNotIn("e1g1", moves)
+        self.assertIn("e1c1", moves)
+
+    def test_pins_and_checks(self):
+        board = ChessBoard()
+        # the knight on d2 is pinned, the rook on e4 gives check
+        board.set_fen("4k3/8/8/b7/4r3/8/3N4/4K3 w - - 0 1")
+        moves = [move_to_uci(move) for move in board.get_all_legal_moves()]
+        self.assertEqual(sorted(moves), ["e1d1", "e1f1", "e1f2"])
+
+        # double check, only the king can move
+        board.set_fen("4k3/8/8/8/4r3/R2n4/8/4K3 w - - 0 1")
+        moves = [move_to_uci(move) for move in board.get_all_legal_moves()]
+        self.assertTrue(all(move.startswith("e1") for move in moves))
+
+    def test_invalid_fen(self):
+        board = ChessBoard()
+        with self.assertRaises(InvalidFenException):
+            board.set_fen("rnbqkbnr/pppppppp/8/8 w")
+        for fen in ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w KQkq - 0 1",
+                    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQQBNR w KQkq - 0 1",
+                    "4k3/8/8/8/8/8/8/K3K3 w - - 0 1",
+                    "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq i6 0 2",
+                    "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d9 0 2",
+                    "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d3 0 2",
+                    "rnbqkbnr/ppp1pppp/8/3p4/4P3/8/PPPP1PPP/RNBQKBNR w KQkq d 0 2"):
+            with self.assertRaises(InvalidFenException):
+                board.set_fen(fen)
+            # the start position is kept
+            self.assertEqual(board.hash, ChessBoard().hash)
@@ -0,0 +1,85 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from libs.chessboard import ChessBoard
+from libs.exceptions import InvalidBookException
+from libs.moves import move_to_uci
+from libs.polyglot import OpeningBook, polyglot_key
+from libs.timeManager import TimeManager
+from main import GameEngine
+
+
+def encode_move(fro, to, promotion=0):
+    return to[1] | to[0] << 3 | fro[1] << 6 | fro[0] << 9 | promotion << 12
+
+
+class test_polyglot(unittest.TestCase):
+
+    def setUp(self):
+        board = ChessBoard()
+        start = polyglot_key(board)
+        board.set_fen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        castling = polyglot_key(board)
+        entries = sorted([
+            (start, encode_move((1, 4), (3, 4)), 10),
+            (start, encode_move((1, 3), (3, 3)), 30),
+            # not legal, the knight can not go there
+            (start, encode_move((0, 1), (1, 3)), 100),
+            (castling, encode_move((0, 4), (0, 7)), 1),
+            (1, encode_move((1, 0), (2, 0)), 1),
+            (2 ** 64 - 1, encode_move((1, 0), (2, 0)), 1),
+        ])
+        handle, self.path = tempfile.mkstemp(suffix=".bin")
+        with os.fdopen(handle, "wb") as book:
+            for key, move, weight in entries:
+                book.write(struct.pack(">QHHI", key, move, weight, 0))
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_polyglot_keys(self):
+        board = ChessBoard()
+        self.assertEqual(polyglot_key(board), 0x463B96181691FC9C)
+        board.move((1, 4), (3, 4))
+        self.assertEqual(polyglot_key(board), 0x823C9B50FD114196)
+        board.set_fen("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3")
+        self.assertEqual(polyglot_key(board), 0x22A48B5A8E47FF78)
+
+    def test_book_moves(self):
+        book = OpeningBook(self.path)
+        board = ChessBoard()
+
+        self.assertEqual(book.size, 6)
+        entries = [(move_to_uci(move), weight) for move, weight in book.get_entries(board)]
+        self.assertEqual(sorted(entries), [("d2d4", 30), ("e2e4", 10)])
+        self.assertEqual(move_to_uci(book.get_move(board, best=True)), "d2d4")
+        self.assertIn(move_to_uci(book.get_move(board)), ["d2d4", "e2e4"])
+
+        board.move((1, 4), (3, 4))
+        self.assertIsNone(book.get_move(board))
+
+        board.set_fen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        self.assertEqual(move_to_uci(book.get_move(board)), "e1g1")
+        book.close()
+
+    def test_book_max_ply_counts_the_game(self):
+        engine = GameEngine()
+        engine.opening_book = OpeningBook(self.path)
+        engine.handle_position("position fen r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")
+        self.assertEqual(engine.board.get_game_ply(), 0)
+        self.assertEqual(engine.get_book_move(engine.board, TimeManager("go")), "e1g1")
+
+        # the position is reached on move 20, after the last book ply
+        engine.handle_position("position fen r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 20")
+        self.assertEqual(engine.board.get_game_ply(), 38)
+        self.assertIsNone(engine.get_book_move(engine.board, TimeManager("go")))
+        engine.handle_position("position fen r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 15 moves a1b1")
+        self.assertEqual(engine.board.get_game_ply(), 29)
+        engine.opening_book.close()
+
+    def test_invalid_book(self):
+        with open(self.path, "ab") as book:
+            book.write(b"\0")
+        self.assertRaises(InvalidBookException, OpeningBook, self.path)
@@ -0,0 +1,115 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from libs.chessboard import ChessBoard, TABLEBASE_WIN
+from libs.moves import move_to_uci
+from libs.tablebase import Tablebases, Table, WIN, DRAW, LOSS, generate, get_dependencies
+from libs.timeManager import TimeManager
+
+
+class test_tablebase(unittest.TestCase):
+
+    def setUp(self):
+        # KQvK table where only white Kg6 Qa7 black Kh8 is won, by Qg7 mate
+        self.directory = tempfile.mkdtemp()
+        table = Table("KQvK")
+        values = bytearray(table.size)
+        values[table.get_index(0, [46, 48, 63])] = 1
+        values[table.get_index(1, [46, 54, 63])] = 255
+        with open(os.path.join(self.directory, "KQvK.tb"), "wb") as file:
+            file.write(values)
+        self.tablebases = Tablebases(self.directory)
+
+    def tearDown(self):
+        self.tablebases.close()
+        shutil.rmtree(self.directory)
+
+    def test_probe(self):
+        board = ChessBoard()
+        board.set_fen("7k/Q7/6K1/8/8/8/8/8 w - - 0 1")
+
+        self.assertEqual(self.tablebases.max_pieces, 3)
+        self.assertEqual(self.tablebases.probe(board), (WIN, 1))
+        move, result, distance = self.tablebases.get_best_move(board)
+        self.assertEqual((move_to_uci(move), result, distance), ("a7g7", WIN, 1))
+        board.make_move((6, 0), (6, 6))
+        self.assertEqual(self.tablebases.probe(board), (LOSS, 0))
+
+        # the same position with the colors swapped is found in the mirrored table
+        board.set_fen("8/8/8/8/8/6k1/q7/7K b - - 0 1")
+        self.assertEqual(self.tablebases.probe(board), (WIN, 1))
+
+        board.set_fen("8/8/8/3k4/8/8/8/KR6 w - - 0 1")
+        self.assertIsNone(self.tablebases.probe(board))
+        board.set_fen("8/8/8/3k4/8/8/8/KB6 w - - 0 1")
+        self.assertEqual(self.tablebases.probe(board), (DRAW, 0))
+
+    def test_block_cache(self):
+        board = ChessBoard()
+        board.set_fen("7k/Q7/6K1/8/8/8/8/8 w - - 0 1")
+        self.tablebases.resize_cache(0)
+
+        self.tablebases.probe(board)
+        self.tablebases.probe(board)
+        self.assertEqual((self.tablebases.hits, self.tablebases.misses), (1, 1))
+
+        board.make_move((6, 0), (6, 6))
+        self.tablebases.probe(board)
+        board.unmake_move()
+        self.tablebases.probe(board)
+        self.assertEqual((self.tablebases.hits, self.tablebases.misses), (1, 3))
+        self.assertEqual(len(self.tablebases.cache), 1)
+
+    def test_search_plays_tablebase_move(self):
+        board = ChessBoard()
+        board.set_fen("7k/Q7/6K1/8/8/8/8/8 w - - 0 1")
+        board.tablebases = self.tablebases
+
+        self.assertEqual(move_to_uci(board.get_minmax_move(TimeManager("go depth 5"))), "a7g7")
+        self.assertEqual(board.score, TABLEBASE_WIN - 1)
+        self.assertEqual(board.nodes, 0)
+
+    def test_illegal_position_is_not_probed(self):
+        board = ChessBoard()
+        board.set_fen("8/8/8/4k3/3R4/8/8/K2Q4 b - - 0 1")
+        board.tablebases = self.tablebases
+
+        # after Kxd4 the black king stands next to the white queen
+        board.make_move((4, 4), (3, 3))
+        self.assertIsNone(self.tablebases.probe(board))
+        board.unmake_move()
+
+        utility, move = board.negamax(float("-inf"), float("inf"), 2)
+        self.assertNotEqual(move_to_uci(move), "e5d4")
+        self.assertLess(utility, 0)
+
+    def test_generate(self):
+        directory = tempfile.mkdtemp()
+        try:
+            generate(directory, "KQvK", io.StringIO())
+            self.assertEqual(os.listdir(directory), ["KQvK.tb"])
+            with open(os.path.join(directory, "KQvK.tb"), "rb") as file:
+                values = array("b", file.read())
+            # the longest mate with the queen takes 10 moves
+            self.assertEqual(max(values), 19)
+
+            tablebases = Tablebases(directory)
+            board = ChessBoard()
+            board.set_fen("7k/Q7/6K1/8/8/8/8/8 w - - 0 1")
+            self.assertEqual(tablebases.probe(board), (WIN, 1))
+            board.make_move((6, 0), (6, 6))
+            self.assertEqual(tablebases.probe(board), (LOSS, 0))
+            board.set_fen("7k/8/5KQ1/8/8/8/8/8 b - - 0 1")
+            self.assertEqual(tablebases.probe(board), (DRAW, 0))
+            tablebases.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_dependencies(self):
+        self.assertEqual(get_dependencies("KPvK"), {"KvK", "KQvK", "KRvK", "KBvK", "KNvK"})
+        self.assertEqual(get_dependencies("KRvKP"), {"KvKP", "KRvK", "KRvKQ", "KRvKR", "KRvKB", "KRvKN",
+                                                     "KvKQ", "KvKR", "KvKB", "KvKN"})
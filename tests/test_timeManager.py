@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from libs.figures import Figure
+from libs.timeManager import TimeManager
+
+
+class test_time_manager(unittest.TestCase):
+
+    def test_plain_go_is_not_limited(self):
+        time_manager = TimeManager("go")
+        self.assertFalse(time_manager.is_limited())
+        self.assertIsNone(time_manager.depth)
+        self.assertTrue(time_manager.can_start_iteration())
+        self.assertFalse(time_manager.should_stop(10 ** 9))
+
+    def test_depth_nodes_and_infinite(self):
+        time_manager = TimeManager("go depth 6 nodes 1000")
+        self.assertEqual(time_manager.depth, 6)
+        self.assertFalse(time_manager.should_stop(999))
+        self.assertTrue(time_manager.should_stop(1000))
+        self.assertTrue(TimeManager("go infinite").is_limited())
+
+    def test_movetime(self):
+        time_manager = TimeManager("go movetime 2000")
+        self.assertAlmostEqual(time_manager.hard_limit, 2 - TimeManager.MOVE_OVERHEAD)
+        self.assertEqual(time_manager.soft_limit, time_manager.hard_limit)
+
+    def test_clock_of_the_player_to_move_is_used(self):
+        go = "go wtime 60000 btime 6000 winc 1000 binc 0 movestogo 10"
+        white = TimeManager(go, Figure.Color.WHITE)
+        black = TimeManager(go, Figure.Color.BLACK)
+        self.assertAlmostEqual(white.soft_limit, (6 + 0.75) / 2)
+        self.assertAlmostEqual(black.soft_limit, 0.3)
+        self.assertLess(white.hard_limit, 30)
+        self.assertLessEqual(black.hard_limit, 3)
+
+    def test_stop(self):
+        time_manager = TimeManager("go infinite")
+        self.assertFalse(time_manager.should_stop(0))
+        time_manager.stop()
+        self.assertTrue(time_manager.should_stop(0))
+        self.assertFalse(time_manager.can_start_iteration())
+        time_manager.wait_for_release()
+
+    def test_ponder_limits_apply_after_ponderhit(self):
+        time_manager = TimeManager("go ponder movetime 1")
+        self.assertTrue(time_manager.is_limited())
+        self.assertFalse(time_manager.should_stop(0))
+        self.assertTrue(time_manager.can_start_iteration())
+
+        waiter = threading.Thread(target=time_manager.wait_for_release)
+        waiter.start()
+        time_manager.ponderhit()
+        waiter.join(1)
+        self.assertFalse(waiter.is_alive())
+        self.assertTrue(time_manager.should_stop(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
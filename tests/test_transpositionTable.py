@@ -0,0 +1,44 @@
+import unittest
+
+from libs.transpositionTable import TranspositionTable
+
+
+class test_transposition_table(unittest.TestCase):
+
+    def test_size_from_megabytes(self):
+        table = TranspositionTable(1)
+        self.assertEqual(table.size, 1024 * 1024 // TranspositionTable.ENTRY_SIZE)
+        table.resize(2)
+        self.assertEqual(table.size, 2 * 1024 * 1024 // TranspositionTable.ENTRY_SIZE)
+
+    def test_store_and_probe(self):
+        table = TranspositionTable(1)
+        table.store(12345, 3, TranspositionTable.EXACT, 40, ((1, 4), (3, 4)))
+
+        self.assertEqual(table.probe(12345)[1:5], (3, TranspositionTable.EXACT, 40, ((1, 4), (3, 4))))
+        self.assertIsNone(table.probe(54321))
+        self.assertEqual((table.hits, table.misses), (1, 1))
+
+    def test_replacement_prefers_deeper_entries(self):
+        table = TranspositionTable(1)
+        other_key = 12345 + table.size
+        table.store(12345, 3, TranspositionTable.EXACT, 40, None)
+        table.store(other_key, 2, TranspositionTable.LOWER, 10, None)
+        self.assertIsNotNone(table.probe(12345))
+
+        table.new_search()
+        table.store(other_key, 2, TranspositionTable.LOWER, 10, None)
+        self.assertIsNone(table.probe(12345))
+        self.assertIsNotNone(table.probe(other_key))
+
+    def test_hashfull(self):
+        table = TranspositionTable(1)
+        for key in range(100):
+            table.store(key, 1, TranspositionTable.EXACT, 0, None)
+        self.assertEqual(table.get_hashfull(), 100)
+        table.new_search()
+        self.assertEqual(table.get_hashfull(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import io
+import unittest
+
+from libs.moves import encode_move
+from libs.uciOutput import UciWriter, format_info, format_score
+
+
+class test_uci_output(unittest.TestCase):
+
+    def test_format_score(self):
+        self.assertEqual(format_score(35), "cp 35")
+        self.assertEqual(format_score(-120.0), "cp -120")
+        self.assertEqual(format_score(10000 - 1), "mate 1")
+        self.assertEqual(format_score(-(10000 - 4)), "mate -2")
+
+    def test_format_info(self):
+        pv = [encode_move(12, 28), encode_move(52, 36)]
+        self.assertEqual(format_info(2, 5, 20, nodes=300, elapsed=0.5, hashfull=3, pv=pv),
+                         "info depth 2 seldepth 5 score cp 20 nodes 300 nps 600 time 500 hashfull 3 pv e2e4 e7e5")
+        self.assertEqual(format_info(6, score=-15, bound="upperbound"), "info depth 6 score cp -15 upperbound")
+        self.assertEqual(format_info(6, currmove=pv[0], currmovenumber=1), "info depth 6 currmove e2e4 currmovenumber 1")
+
+    def test_writer_keeps_the_order(self):
+        stream = io.StringIO()
+        writer = UciWriter(stream)
+        for line in ("info depth 1", "info depth 2", "bestmove e2e4"):
+            writer.send(line)
+        writer.flush()
+        self.assertEqual(stream.getvalue(), "info depth 1\ninfo depth 2\nbestmove e2e4\n")
+
+
+if __name__ == '__main__':
+    unittest.main()